@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from atlas_utils.tools import get_server, get_session
+from utils import UPLOAD_MAX_WORKERS
+
+
+# logged in sessions are reused for this long before logging in again, a 401 before then logs in again straight away
+SESSION_MAX_AGE = float(os.environ.get("ATLAS_SESSION_MAX_AGE_S", 30 * 60))
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def atlas_login(server, username=None):
+    """Logs in through atlas_utils, returning a requests.Session holding the credentials"""
+    return get_session(server) if username is None else get_session(server, username=username)
+
+
+class ApiSession(requests.Session):
+    """A keep-alive session to a label API server that logs in lazily, logs in again once its credentials are older
+    than max_age, and retries a request once after logging in again if the server answers 401"""
+
+    def __init__(self, server, username=None, max_age=SESSION_MAX_AGE, pool_size=UPLOAD_MAX_WORKERS, login=atlas_login):
+        super().__init__()
+        self.server = server
+        self.username = username
+        self.max_age = max_age
+        self.login_func = login
+        self.pool_size = pool_size
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+        self.logged_in_at = None
+        self.logins = 0
+        self.unauthorized = 0
+        self.login_lock = threading.Lock()
+
+    def login(self, logins_seen=None):
+        """Copies fresh credentials onto this session. Threads that saw the same expired login only log in once"""
+        with self.login_lock:
+            if logins_seen is not None and self.logins != logins_seen:
+                return
+            fresh = self.login_func(self.server, self.username)
+            self.headers.update(fresh.headers)
+            self.cookies.update(fresh.cookies)
+            self.auth = fresh.auth
+            fresh.close()
+            self.logins += 1
+            self.logged_in_at = time.monotonic()
+
+    def request(self, method, url, *args, **kwargs):
+        logins_seen = self.logins
+        if self.logged_in_at is None or time.monotonic() - self.logged_in_at > self.max_age:
+            self.login(logins_seen)
+            logins_seen = self.logins
+
+        response = super().request(method, url, *args, **kwargs)
+        if response.status_code == 401:
+            self.unauthorized += 1
+            response.close()
+            self.login(logins_seen)
+            response = super().request(method, url, *args, **kwargs)
+        return response
+
+    def stats(self):
+        """Logins, requests sent and connections opened, summed over the session's connection pools"""
+        requests_sent = connections = 0
+        for adapter in set(self.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                if pool is not None:
+                    requests_sent += pool.num_requests
+                    connections += pool.num_connections
+        return {
+            "logins": self.logins,
+            "unauthorized": self.unauthorized,
+            "requests": requests_sent,
+            "connections": connections,
+            "reuse": 1 - connections / requests_sent if requests_sent else 0.0,
+        }
+
+
+def get_api_session(user_id, username=None):
+    """The process-wide session to the user's label API server as username, created the first time it is asked for"""
+    return get_api_session_for_server(get_server(user_id), username)
+
+
+def get_api_session_for_server(server, username=None, **kwargs):
+    with _sessions_lock:
+        session = _sessions.get((server, username))
+        if session is None:
+            session = _sessions[(server, username)] = ApiSession(server, username, **kwargs)
+        return session
+
+
+def close_api_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def format_api_session_stats():
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+    lines = []
+    for session in sessions:
+        stats = session.stats()
+        lines.append(
+            f"{session.server} as {session.username or 'default user'}: {stats['logins']} logins "
+            f"({stats['unauthorized']} after a 401), {stats['requests']} requests over {stats['connections']} "
+            f"connections ({stats['reuse']:.0%} reused)"
+        )
+    return "\n".join(lines)
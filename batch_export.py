@@ -0,0 +1,155 @@
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import glob
+import os
+import sys
+import time
+
+import pandas as pd
+
+from time_conversion import times_to_frame_nums
+from utils import add_labels_column, get_video_fps, sync_labels_to_api
+
+from atlas_utils.evaluation_framework.report_generation.utils import add_is_valid_values_to_df
+
+
+VIDEO_EXTENSIONS = [".mp4", ".mov", ".avi", ".mkv"]
+
+BatchJob = namedtuple("BatchJob", ["labels_path", "video_path", "fps", "user_id", "video_result_id"])
+
+
+def find_video(labels_path):
+    """The video next to a label CSV with the same name, if there is one"""
+    stem = os.path.splitext(labels_path)[0]
+    for extension in VIDEO_EXTENSIONS:
+        if os.path.isfile(stem + extension):
+            return stem + extension
+    return None
+
+
+def jobs_from_directory(directory, fps=None):
+    return [
+        BatchJob(labels_path, find_video(labels_path), fps, None, None)
+        for labels_path in sorted(glob.glob(os.path.join(directory, "*.csv")))
+    ]
+
+
+def _optional(row, name, convert):
+    value = row.get(name)
+    return None if pd.isna(value) or value == "" else convert(value)
+
+
+def jobs_from_manifest(manifest_path, fps=None):
+    """Reads a CSV with a labels_path column and optional video_path, fps, user_id and video_result_id columns. Paths
+    are relative to the manifest"""
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    for row in pd.read_csv(manifest_path, dtype=str).to_dict("records"):
+        labels_path = os.path.join(manifest_dir, row["labels_path"])
+        video_path = _optional(row, "video_path", lambda path: os.path.join(manifest_dir, path))
+        jobs.append(
+            BatchJob(
+                labels_path,
+                video_path or find_video(labels_path),
+                _optional(row, "fps", float) or fps,
+                _optional(row, "user_id", int),
+                _optional(row, "video_result_id", int),
+            )
+        )
+    return jobs
+
+
+def csv_to_labels_df(labels_path, fps=None):
+    """Reads a label CSV as saved from the label table and transforms it like saveToCsv. CSVs that already have frame
+    numbers are relabelled as they are"""
+    labels_df = pd.read_csv(labels_path)
+    if "start_time" in labels_df.columns:
+        if fps is None:
+            raise ValueError("needs its video or --fps to convert its times to frames")
+        labels_df["start_frame"] = times_to_frame_nums(labels_df["start_time"], fps)
+        labels_df["end_frame"] = times_to_frame_nums(labels_df["end_time"], fps)
+        labels_df = labels_df.drop(["start_time", "end_time"], axis=1)
+
+    labels_df = add_labels_column(labels_df)
+    return add_is_valid_values_to_df(labels_df)
+
+
+def output_path(job, output_dir):
+    return os.path.join(output_dir, os.path.basename(job.labels_path))
+
+
+def process_job(job, output_dir=None, upload=False, dry_run=False):
+    """Exports and uploads the labels of one job. Returns a line describing what was done, raises on failure"""
+    fps = job.fps
+    if fps is None and job.video_path is not None:
+        fps = get_video_fps(job.video_path)
+    labels_df = csv_to_labels_df(job.labels_path, fps)
+
+    done = [f"{len(labels_df)} labels"]
+    if output_dir is not None:
+        labels_df.to_csv(output_path(job, output_dir))
+        done.append(f"written to {output_path(job, output_dir)}")
+    if upload:
+        if job.user_id is None or job.video_result_id is None:
+            raise ValueError("needs a user_id and video_result_id in the manifest to be uploaded")
+        errors = sync_labels_to_api(job.user_id, job.video_result_id, labels_df, dry_run=dry_run)
+        if dry_run:
+            done.append(f"would change video result {job.video_result_id}:\n{errors}")
+        elif errors != "":
+            raise RuntimeError(errors)
+        else:
+            done.append(f"uploaded to video result {job.video_result_id}")
+    return ", ".join(done)
+
+
+def run_jobs(jobs, output_dir=None, upload=False, dry_run=False, workers=None):
+    """Processes the jobs across a pool of processes, printing each one as it finishes. Returns the failed jobs"""
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    failed = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_job, job, output_dir, upload, dry_run): job for job in jobs}
+        for i, future in enumerate(as_completed(futures), 1):
+            job = futures[future]
+            try:
+                print(f"[{i}/{len(jobs)}] {job.labels_path}: {future.result()}", flush=True)
+            except Exception as e:
+                failed.append(job)
+                print(f"[{i}/{len(jobs)}] {job.labels_path}: error: {e}", file=sys.stderr, flush=True)
+
+    print(f"{len(jobs) - len(failed)} of {len(jobs)} files processed in {time.perf_counter() - start:.1f}s", flush=True)
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and upload label CSVs without the GUI")
+    parser.add_argument("directories", nargs="*", help="Directories of label CSVs, each next to its video")
+    parser.add_argument("--manifest", action="append", default=[], help="CSV listing the label CSVs to process")
+    parser.add_argument("--fps", type=float, help="fps of the videos whose fps isn't known otherwise")
+    parser.add_argument("--output_dir", help="Where to write the exports, named like their label CSVs")
+    parser.add_argument("--upload", action="store_true", help="Upload the labels to their video results")
+    parser.add_argument("--dry_run", action="store_true", help="Print the label changes an upload would make")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of processes")
+    args = parser.parse_args()
+
+    if args.output_dir is None and not args.upload:
+        parser.error("nothing to do, give --output_dir and/or --upload")
+    jobs = [job for directory in args.directories for job in jobs_from_directory(directory, args.fps)]
+    jobs += [job for manifest in args.manifest for job in jobs_from_manifest(manifest, args.fps)]
+    if not jobs:
+        parser.error("no label CSVs found")
+    if args.output_dir is not None:
+        outputs = [output_path(job, args.output_dir) for job in jobs]
+        duplicates = sorted({path for path in outputs if outputs.count(path) > 1})
+        if duplicates:
+            parser.error(f"more than one label CSV would be written to {', '.join(duplicates)}")
+
+    failed = run_jobs(jobs, args.output_dir, args.upload, args.dry_run, args.workers)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,743 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import pandas as pd
+import requests
+from PyQt5.QtCore import QTime
+from PyQt5.QtWidgets import QApplication, QComboBox, QLabel, QSlider, QTableView, QTableWidget, QTableWidgetItem
+
+from api_sessions import ApiSession
+from batch_export import BatchJob, process_job, run_jobs
+from frame_extraction import extract_frame_ranges, extract_video_parallel
+from frame_server import FrameServer
+from label_journal import LabelJournal
+from label_table import LABEL_COLUMNS, csv_labels_to_table
+from label_table_model import LabelTableModel
+from position_updates import PositionUpdates
+from progressive_download import RangedDownload
+from rules_index import RulesIndex
+from proxy_video import transcode_proxy
+from seek_index import get_seek_index, load_seek_index
+from startup_timing import DEFERRED_MODULES
+from s3_cache import S3Cache
+from stub_server import RangeFileHandler, StubServer, stub_login
+from video_queue import PrefetchedVideo, VideoQueuePanel
+from utils import (
+    add_labels_column,
+    build_labels_df,
+    convert_frame_num_to_time,
+    convert_time_to_frame_num,
+    convert_time_to_frame_num_df,
+    fetch_labels,
+    upload_labels,
+)
+from atlas_utils.evaluation_framework.report_generation.utils import add_is_valid_values_to_df
+from time_conversion import frame_nums_to_times, times_to_frame_nums
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def print_result(name, rows, old_seconds, new_seconds):
+    print(f"{name:<24} rows={rows:<9} old={old_seconds:8.3f}s new={new_seconds:8.3f}s x{old_seconds / new_seconds:.1f}")
+
+
+def make_frames(rows, fps=30, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 3 * 3600 * fps, size=rows)
+
+
+def benchmark_conversion(rows, fps=30.0):
+    """Per-row apply/strptime against the columnar conversion engine"""
+    frames = make_frames(rows)
+
+    old_times, old_seconds = timed(lambda: pd.Series(frames).apply(lambda f: convert_frame_num_to_time(f, fps)))
+    new_times, new_seconds = timed(frame_nums_to_times, frames, fps)
+    print_result("frame -> time", rows, old_seconds, new_seconds)
+
+    _, old_seconds = timed(lambda: old_times.apply(lambda t: convert_time_to_frame_num(t, fps=fps)))
+    _, new_seconds = timed(times_to_frame_nums, new_times, fps)
+    print_result("time -> frame", rows, old_seconds, new_seconds)
+
+
+def add_labels_column_reference(df):
+    """The original per-exercise iterrows implementation of add_labels_column"""
+    unique_exercises = df["exercise"].unique()
+    for exercise in unique_exercises:
+        exercise_df = df[df["exercise"] == exercise]
+        start_time = ""
+        id = 0
+        for index, exercise_row in exercise_df.iterrows():
+            if start_time != exercise_row["start_frame"]:
+                start_time = exercise_row["start_frame"]
+                id += 1
+
+            df.loc[index, "label"] = exercise + "_" + str(id)
+
+    df = df.loc[:, ~df.columns.str.contains("^Unnamed")]
+    return df
+
+
+def make_labels_df(rows, exercises=8, seed=0):
+    rng = np.random.default_rng(seed)
+    names = np.array([f"exercise{i}" for i in range(exercises)])
+    # runs of a few rows share a start frame, as sets of reps do
+    start_frames = np.repeat(np.arange(rows), rng.integers(1, 4, size=rows))[:rows] * 30
+    return pd.DataFrame(
+        {
+            "exercise": names[rng.integers(0, exercises, size=rows)],
+            "start_frame": start_frames,
+            "end_frame": start_frames + 300,
+        }
+    )
+
+
+def benchmark_labels(rows):
+    """iterrows add_labels_column against the groupby implementation"""
+    labels_df = make_labels_df(rows)
+
+    _, old_seconds = timed(add_labels_column_reference, labels_df.copy())
+    _, new_seconds = timed(add_labels_column, labels_df.copy())
+    print_result("add_labels_column", rows, old_seconds, new_seconds)
+
+
+def benchmark_upload(rows, latency=0.02, concurrency_levels=(1, 4, 8, 16)):
+    """Labels per second uploaded to a stub API with injected latency"""
+    labels_df = add_labels_column(make_labels_df(rows))
+    for max_workers in concurrency_levels:
+        with StubServer(latency=latency) as server:
+            _, seconds = timed(upload_labels, server.url, requests.Session(), 1, labels_df, max_workers=max_workers)
+        print(f"{'upload':<24} rows={rows:<9} workers={max_workers:<3} {rows / seconds:8.1f} labels/s")
+
+
+def benchmark_s3_cache(megabytes, files=4):
+    """Cold and warm fetches through the S3 cache, with a local directory standing in for the bucket"""
+    root = tempfile.mkdtemp()
+    try:
+        bucket = os.path.join(root, "bucket")
+        os.makedirs(os.path.join(bucket, "1", "2"))
+        keys = [f"1/2/video_{i}.mp4" for i in range(files)]
+        for key in keys:
+            with open(os.path.join(bucket, key), "wb") as f:
+                f.write(os.urandom(megabytes * 1024**2))
+
+        # cap the cache below the total so the first file is evicted
+        cache = S3Cache(os.path.join(root, "cache"), max_bytes=(files - 1) * megabytes * 1024**2)
+        download = lambda key: lambda local_fp: shutil.copyfile(os.path.join(bucket, key), local_fp)
+
+        _, cold_seconds = timed(lambda: [cache.fetch(key, download(key)) for key in keys])
+        _, warm_seconds = timed(lambda: [cache.fetch(key, download(key)) for key in keys[1:]])
+        print(f"{'s3 cache':<24} files={files} size={megabytes}MB cold={cold_seconds:.3f}s warm={warm_seconds:.4f}s")
+    finally:
+        shutil.rmtree(root)
+
+
+def benchmark_progressive(megabytes, latency=0.05, chunk_size=1024**2):
+    """Time until a ranged download is playable against the full download, from a stub server serving byte ranges"""
+    root = tempfile.mkdtemp()
+    try:
+        # an mp4 with the moov atom at the end, as phones write them
+        size = megabytes * 1024**2
+        with open(os.path.join(root, "video.mp4"), "wb") as f:
+            f.write(b"\x00\x00\x00\x10ftypisom\x00\x00\x00\x00")
+            f.write((size - 16 - 1024 + 8).to_bytes(4, "big") + b"mdat" + os.urandom(size - 16 - 1024))
+            f.write((1024 - 8).to_bytes(4, "big") + b"moov" + os.urandom(1024 - 16))
+
+        with StubServer(RangeFileHandler, latency=latency, root=root) as server:
+            download = RangedDownload(f"{server.url}/video.mp4", os.path.join(root, "local.mp4"), chunk_size=chunk_size)
+            start = time.perf_counter()
+            download.start()
+            while not download.is_ready():
+                time.sleep(0.001)
+            ready_seconds = time.perf_counter() - start
+            download.wait()
+            complete_seconds = time.perf_counter() - start
+        print(f"{'progressive':<24} size={megabytes}MB playable={ready_seconds:.3f}s complete={complete_seconds:.3f}s")
+    finally:
+        shutil.rmtree(root)
+
+
+def make_video(path, frames, width=640, height=360, fps=30):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for i in range(frames):
+        writer.write(np.roll(noise, i * 4, axis=1))
+    writer.release()
+
+
+def directory_usage(path):
+    files = [os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+    return len(files), sum(os.path.getsize(file) for file in files)
+
+
+def benchmark_extraction(frames):
+    """Sequential per-file JPEG extraction against process-pool extraction to files"""
+    root = tempfile.mkdtemp()
+    try:
+        video_path = os.path.join(root, "video.mp4")
+        make_video(video_path, frames)
+
+        results = {
+            "sequential jpeg": lambda out: extract_frame_ranges(video_path, out, [(0, frames - 1)]),
+            "parallel jpeg": lambda out: extract_video_parallel(video_path, out),
+        }
+        for name, extract in results.items():
+            output_dir = os.path.join(root, name.replace(" ", "_"))
+            _, seconds = timed(extract, output_dir)
+            files, size = directory_usage(output_dir)
+            print(f"{name:<24} frames={frames:<7} {frames / seconds:8.1f} frames/s files={files:<7} {size / 1024**2:8.1f} MB")
+    finally:
+        shutil.rmtree(root)
+
+
+def benchmark_frame_server(frames, fps=30, steps=(1,) * 20 + (-1,) * 20 + (10,) * 3 + (-10,) * 3):
+    """Seeking and decoding each step with OpenCV against stepping through the frame server's prefetched frames"""
+    root = tempfile.mkdtemp()
+    try:
+        video_path = os.path.join(root, "video.mp4")
+        make_video(video_path, frames, width=1280, height=720, fps=fps)
+        start = frames // 2
+        targets = list(start + np.cumsum(steps))
+
+        capture = cv2.VideoCapture(video_path)
+        seek_seconds = []
+        for frame_num in targets:
+            _, seconds = timed(lambda: (capture.set(cv2.CAP_PROP_POS_FRAMES, frame_num), capture.read()))
+            seek_seconds.append(seconds)
+
+        server = FrameServer(video_path)
+        server.set_playhead(start)
+        deadline = time.time() + 30
+        while server.stats()["cached_frames"] < server.ahead + server.behind + 1 and time.time() < deadline:
+            time.sleep(0.01)
+
+        capture.release()
+
+        step_seconds = []
+        for frame_num in targets:
+            _, seconds = timed(server.get, frame_num)
+            server.set_playhead(frame_num)
+            step_seconds.append(seconds)
+            # a key press every 50ms gives the prefetch thread time to move its window
+            time.sleep(0.05)
+
+        frame_ms = 1000 / fps
+        for name, seconds in (("seek and decode", seek_seconds), ("frame server", step_seconds)):
+            ms = np.array(seconds) * 1000
+            print(f"{name:<24} steps={len(ms):<6} mean={ms.mean():7.2f}ms max={ms.max():7.2f}ms (frame interval {frame_ms:.1f}ms)")
+        print(f"{'frame server stats':<24} {server.format_stats()}")
+        server.close()
+    finally:
+        shutil.rmtree(root)
+
+
+def benchmark_seek_index(frames, fps=30, jumps=60, seed=0):
+    """Cold seeks to random frames and short hops, plain OpenCV seeking against seeking guided by the seek index"""
+    root = tempfile.mkdtemp()
+    try:
+        video_path = os.path.join(root, "video.mp4")
+        make_video(video_path, frames, width=1280, height=720, fps=fps)
+        rng = np.random.default_rng(seed)
+        # jumps anywhere in the video, each followed by a short hop forwards like a table click then a few steps
+        targets = [int(f) for jump in rng.integers(0, frames - 40, jumps) for f in (jump, jump + int(rng.integers(1, 40)))]
+
+        index, build_seconds = timed(get_seek_index, video_path)
+        _, load_seconds = timed(load_seek_index, video_path)
+        print(f"{'index':<24} frames={len(index):<7} keyframes={len(index.keyframes):<5} build={build_seconds:.3f}s load={load_seconds * 1000:.1f}ms")
+
+        for name, seek_index in (("without index", None), ("with index", index)):
+            # no prefetch window, so every get is a cold decode
+            server = FrameServer(video_path, ahead=0, behind=0, seek_index=seek_index)
+            seconds = []
+            for frame_num in targets:
+                _, elapsed = timed(server.get, frame_num)
+                seconds.append(elapsed)
+            server.close()
+            ms = np.array(seconds) * 1000
+            print(f"{name:<24} seeks={len(ms):<7} mean={ms.mean():7.2f}ms p95={np.percentile(ms, 95):7.2f}ms")
+    finally:
+        shutil.rmtree(root)
+
+
+def decode_fps(video_path):
+    capture = cv2.VideoCapture(video_path)
+    start = time.perf_counter()
+    frames = 0
+    while capture.grab() and capture.retrieve()[0]:
+        frames += 1
+    seconds = time.perf_counter() - start
+    capture.release()
+    return frames / seconds
+
+
+def benchmark_proxy(frames, fps=30):
+    """Transcoding a 4K source to its 540p proxy, and decoding the source against the proxy"""
+    root = tempfile.mkdtemp()
+    try:
+        video_path = os.path.join(root, "video.mp4")
+        proxy_path = os.path.join(root, "proxy.mp4")
+        make_video(video_path, frames, width=3840, height=2160, fps=fps)
+        _, transcode_seconds = timed(transcode_proxy, video_path, proxy_path)
+
+        print(f"{'transcode':<24} frames={frames:<7} {frames / transcode_seconds:8.1f} frames/s")
+        for name, path in (("source 2160p", video_path), ("proxy 540p", proxy_path)):
+            size = os.path.getsize(path) / 1024**2
+            print(f"{name:<24} frames={frames:<7} {decode_fps(path):8.1f} frames/s decoded {size:8.1f} MB")
+    finally:
+        shutil.rmtree(root)
+
+
+def make_export_df(rows, seed=0):
+    """Labels as saveToCsv exports them and importCSV reads them back"""
+    rng = np.random.default_rng(seed)
+    labels_df = make_labels_df(rows, seed=seed)
+    labels_df["orientation"] = np.array(["front", "side"])[rng.integers(0, 2, size=rows)]
+    labels_df["min_reps"] = rng.integers(1, 5, size=rows)
+    labels_df["reps"] = rng.integers(1, 12, size=rows)
+    labels_df["rule"] = "N/A"
+    labels_df["is_valid"] = rng.integers(0, 2, size=rows).astype(bool)
+    labels_df["reps_to_judge"] = rng.integers(0, 12, size=rows)
+    labels_df["notes"] = "note"
+    return labels_df
+
+
+def populate_table_widget_reference(table_widget, label_df, fps):
+    """The original importCSV: an iterrows loop setting one QTableWidgetItem per cell below the header row"""
+    start_times = frame_nums_to_times(label_df["start_frame"].astype(int), fps)
+    end_times = frame_nums_to_times(label_df["end_frame"].astype(int), fps)
+    for i, (_, label_row) in enumerate(label_df.iterrows()):
+        is_valid = (
+            str(label_row["is_valid"])
+            if "is_valid" in label_df.columns and label_row["is_valid"] in [True, False, "N/A"]
+            else "N/A"
+        )
+        values = [start_times[i], end_times[i]] + [str(label_row[name]) for name in LABEL_COLUMNS[2:7]]
+        values += [is_valid, str(label_row["reps_to_judge"]), str(label_row["notes"])]
+        for column, value in enumerate(values):
+            table_widget.setItem(i + 1, column, QTableWidgetItem(value))
+
+
+def qt_app():
+    """The QApplication the widget benchmarks need, created once and kept alive between runs"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    global _qt_app
+    _qt_app = QApplication.instance() or QApplication([])
+    return _qt_app
+
+
+def benchmark_table_load(rows, fps=30.0):
+    """Per-cell QTableWidgetItem population against a vectorised conversion and a single model reset"""
+    app = qt_app()
+    labels_df = make_export_df(rows)
+
+    table_widget = QTableWidget(rows + 1, len(LABEL_COLUMNS))
+    _, old_seconds = timed(populate_table_widget_reference, table_widget, labels_df, fps)
+
+    model = LabelTableModel()
+    view = QTableView()
+    view.setModel(model)
+    _, new_seconds = timed(lambda: model.setRows(csv_labels_to_table(labels_df, fps)))
+    app.processEvents()
+    print_result("table load", rows, old_seconds, new_seconds)
+
+
+def save_to_csv_reference(table_df, filepath, video_path):
+    """The original saveToCsv: write the table, read it back to type it, transform it and write it again"""
+    table_df[(table_df != "").any(axis=1)].to_csv(filepath, index=False)
+    labels_df = pd.read_csv(filepath)
+    labels_df = convert_time_to_frame_num_df(labels_df, video_path)
+    labels_df = labels_df.drop(["start_time", "end_time"], axis=1)
+    labels_df = add_labels_column(labels_df)
+    labels_df = add_is_valid_values_to_df(labels_df)
+    labels_df.to_csv(filepath)
+    return labels_df
+
+
+def benchmark_export(rows, fps=30):
+    """The write, read and rewrite CSV export against building the labels in memory, with and without the file"""
+    root = tempfile.mkdtemp()
+    try:
+        video_path = os.path.join(root, "video.mp4")
+        make_video(video_path, 10, width=64, height=64, fps=fps)
+        table_df = csv_labels_to_table(make_export_df(rows), fps)
+        # some unfilled cells and an empty row, as the table has while annotating
+        table_df.loc[::7, "notes"] = ""
+        table_df.loc[::11, "is_valid"] = "N/A"
+        table_df.loc[len(table_df)] = [""] * len(LABEL_COLUMNS)
+
+        _, old_seconds = timed(save_to_csv_reference, table_df, os.path.join(root, "old.csv"), video_path)
+        new_path = os.path.join(root, "new.csv")
+
+        def export_file():
+            labels_df = build_labels_df(table_df, video_path)
+            labels_df.to_csv(new_path)
+            return labels_df
+
+        _, file_seconds = timed(export_file)
+        _, memory_seconds = timed(build_labels_df, table_df, video_path)
+        print_result("export to file", rows, old_seconds, file_seconds)
+        print_result("export in memory", rows, old_seconds, memory_seconds)
+    finally:
+        shutil.rmtree(root)
+
+
+def make_edits(model, edits, seed=0):
+    """Edits as they come while annotating: mostly new and copied rows, some cell edits and deletes"""
+    rng = np.random.default_rng(seed)
+    for i in range(edits):
+        kind = rng.integers(0, 4) if model.rowCount() else 0
+        if kind == 0:
+            model.appendRow(["0:00:01.017", "0:00:02.050", "squat", "front", "1", str(i), "N/A", "True", "", "n"])
+        elif kind == 1:
+            model.appendRow(model.rowValues(model.rowCount() - 1))
+        elif kind == 2:
+            model.setData(model.index(int(rng.integers(0, model.rowCount())), int(rng.integers(0, 10))), f"edit {i}")
+        else:
+            model.removeRowsAt([int(rng.integers(0, model.rowCount()))])
+
+
+def benchmark_autosave(rows, fps=30, edits=200):
+    """Rewriting the whole export after every edit against appending each edit to the autosave journal"""
+    qt_app()
+    root = tempfile.mkdtemp()
+    try:
+        video_path = os.path.join(root, "video.mp4")
+        make_video(video_path, 10, width=64, height=64, fps=fps)
+        table_df = csv_labels_to_table(make_export_df(rows), fps)
+        model = LabelTableModel()
+        model.setRows(table_df)
+
+        # a full rewrite costs about the same for every edit, so time a few and scale them
+        rewrites = 3
+        _, old_seconds = timed(
+            lambda: [build_labels_df(model.toDataFrame(), video_path).to_csv(os.path.join(root, "labels.csv")) for _ in range(rewrites)]
+        )
+        old_seconds *= edits / rewrites
+
+        journal = LabelJournal(os.path.join(root, "autosave"))
+        journal.set_video(video_path)
+        journal.attach(model)
+        _, new_seconds = timed(make_edits, model, edits)
+        journal.release()
+        print_result(f"autosave {edits} edits", rows, old_seconds, new_seconds)
+
+        recovering = LabelJournal(os.path.join(root, "autosave"))
+        _, recover_seconds = timed(recovering.recover)
+        recovering.release()
+        print(f"{'recover':<24} rows={rows:<9} {recover_seconds:.3f}s")
+    finally:
+        shutil.rmtree(root)
+
+
+def benchmark_batch(files, rows=2000, fps=30):
+    """Exporting label CSVs one after another against the batch CLI's process pool"""
+    root = tempfile.mkdtemp()
+    try:
+        video_path = os.path.join(root, "video.mp4")
+        make_video(video_path, 10, width=64, height=64, fps=fps)
+        jobs = []
+        for i in range(files):
+            labels_path = os.path.join(root, "labels", f"video_{i}.csv")
+            os.makedirs(os.path.dirname(labels_path), exist_ok=True)
+            csv_labels_to_table(make_export_df(rows, seed=i), fps).to_csv(labels_path, index=False)
+            jobs.append(BatchJob(labels_path, video_path, None, None, None))
+
+        sequential_dir, parallel_dir = os.path.join(root, "sequential"), os.path.join(root, "parallel")
+        os.makedirs(sequential_dir)
+        _, old_seconds = timed(lambda: [process_job(job, sequential_dir) for job in jobs])
+        _, new_seconds = timed(run_jobs, jobs, parallel_dir)
+        print_result(f"batch x{os.cpu_count()} cores", files, old_seconds, new_seconds)
+    finally:
+        shutil.rmtree(root)
+
+
+STARTUP_SCRIPT = """
+import importlib, importlib.util, json, sys, time
+preload = json.loads(sys.argv[1])
+start = time.perf_counter()
+for name in preload:
+    if importlib.util.find_spec(name) is not None:
+        importlib.import_module(name)
+import pavs
+print(json.dumps([time.perf_counter() - start, [name for name in json.loads(sys.argv[2]) if name in sys.modules]]))
+"""
+
+
+def time_pavs_import(preload):
+    """Seconds to import pavs in a fresh interpreter after importing preload, and the deferred modules it loaded"""
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT, json.dumps(preload), json.dumps(DEFERRED_MODULES)],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "QT_QPA_PLATFORM": "offscreen"},
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def benchmark_startup(runs):
+    """Importing pavs with the report, AWS, pandas and OpenCV modules loaded up front, as it used to, against deferring
+    them to first use"""
+    old_seconds = min(time_pavs_import(DEFERRED_MODULES)[0] for _ in range(runs))
+    new_runs = [time_pavs_import([]) for _ in range(runs)]
+    new_seconds = min(seconds for seconds, _ in new_runs)
+    print_result("import pavs", runs, old_seconds, new_seconds)
+
+
+def update_rules_reference(rules, form_thresholds, exercise, orientation, slot):
+    """The original update_rules: refill the combo box and connect its activated signal again"""
+    rules.clear()
+    if exercise in form_thresholds and orientation in form_thresholds[exercise]:
+        for rule in form_thresholds[exercise][orientation].keys():
+            rules.addItem(rule.strip())
+    rules.addItem("N/A")
+    rules.activated[str].connect(slot)
+
+
+def benchmark_rules(changes, exercises=40, orientations=("front", "side", "diagonal"), rules_per_view=12):
+    """Refilling the rules combo box and connecting it again on every change against switching to prebuilt rules"""
+    qt_app()
+    exercise_names = [f"exercise_{i}" for i in range(exercises)]
+    form_thresholds = {
+        exercise: {orientation: {f"rule_{j} ": j for j in range(rules_per_view)} for orientation in orientations[:2]}
+        for exercise in exercise_names
+    }
+    views = [(exercise, orientation) for exercise in exercise_names for orientation in orientations]
+    views = [views[i % len(views)] for i in range(changes)]
+
+    old_calls, new_calls = [], []
+    old_rules = QComboBox()
+    _, old_seconds = timed(
+        lambda: [update_rules_reference(old_rules, form_thresholds, *view, old_calls.append) for view in views]
+    )
+
+    new_rules = QComboBox()
+    new_rules.activated[str].connect(new_calls.append)
+
+    def switch_roots():
+        index = RulesIndex(exercise_names, orientations, form_thresholds)
+        new_rules.setModel(index)
+        for view in views:
+            new_rules.setRootModelIndex(index.rulesRoot(*view))
+            new_rules.setCurrentIndex(0)
+        return index
+
+    _, new_seconds = timed(switch_roots)
+    print_result("rules combo changes", changes, old_seconds, new_seconds)
+
+
+def simulated_seek(seconds=0.002):
+    """Stands in for the player seeking, which decodes from a keyframe"""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def feed_position_events(app, handler, positions, interval=0.001):
+    """Calls handler with each position as the player or a drag would, letting the event loop run in between.
+    Returns the CPU seconds the UI thread spent"""
+    start = time.thread_time()
+    for position in positions:
+        handler(position)
+        time.sleep(interval)
+        app.processEvents()
+    time.sleep(0.1)
+    app.processEvents()
+    return time.thread_time() - start
+
+
+def benchmark_position_updates(updates, step_ms=10):
+    """Updating the slider and time label on every position change and seeking on every drag move, against coalescing
+    them at display rate with throttled drag seeks"""
+    app = qt_app()
+    positions = [i * step_ms for i in range(updates)]
+
+    def reference_ui(slider, label):
+        def positionChanged(position):
+            slider.setValue(position)
+            label.clear()
+            label.setText(QTime(0, 0, 0, 0).addMSecs(position).toString())
+
+        def sliderMoved(position):
+            simulated_seek()
+            positionChanged(position)
+
+        return positionChanged, sliderMoved
+
+    old_slider, old_label = QSlider(), QLabel()
+    old_slider.setRange(0, positions[-1])
+    old_position_changed, old_slider_moved = reference_ui(old_slider, old_label)
+    old_play = feed_position_events(app, old_position_changed, positions)
+    old_drag = feed_position_events(app, old_slider_moved, positions)
+
+    new_slider, new_label = QSlider(), QLabel()
+    new_slider.setRange(0, positions[-1])
+    seeks = []
+    position_updates = PositionUpdates(new_slider, new_label, lambda position: (simulated_seek(), seeks.append(position)))
+    new_play = feed_position_events(app, position_updates.positionChanged, positions)
+    new_slider.setSliderDown(True)
+    new_drag = feed_position_events(app, new_slider.setSliderPosition, positions)
+    new_slider.setSliderDown(False)
+
+    print_result("playback position", updates, old_play, new_play)
+    print_result("slider drag", updates, old_drag, new_drag)
+    print(f"{'position updates':<24} {position_updates.formatStats()}")
+
+
+def run_api_operations(server, operations, session_for, labels_df):
+    """Opens, with an export every fifth operation, expiring every token halfway through"""
+    for i in range(operations):
+        if i == operations // 2:
+            server.expire_tokens()
+        session = session_for(server.url)
+        if i % 5 == 4:
+            upload_labels(server.url, session, 1, labels_df)
+        else:
+            fetch_labels(server.url, session, 1)
+
+
+def benchmark_sessions(operations, latency=0.01, rows=4):
+    """A login and a cold connection per API operation against one shared session pool"""
+    labels_df = add_labels_column(make_labels_df(rows))
+    with StubServer(latency=latency, require_auth=True) as old_server:
+        _, old_seconds = timed(run_api_operations, old_server, operations, stub_login, labels_df)
+    with StubServer(latency=latency, require_auth=True) as new_server:
+        session = ApiSession(new_server.url, login=stub_login)
+        _, new_seconds = timed(run_api_operations, new_server, operations, lambda server: session, labels_df)
+        stats = session.stats()
+
+    print_result("api sessions", operations, old_seconds, new_seconds)
+    print(
+        f"{'':<24} logins old={old_server.logins} new={new_server.logins} "
+        f"connections old={old_server.connections} new={new_server.connections} "
+        f"({stats['requests']} requests, {stats['reuse']:.0%} over reused connections)"
+    )
+
+
+def benchmark_queue(videos, megabytes=4, download_seconds=0.2, export_seconds=0.05, annotate_seconds=0.3, depth=3):
+    """Waiting for each video of a queue to download and its labels to export against prefetching and exporting in
+    the background, with downloads and exports simulated by sleeps"""
+    qt_app()
+    root = tempfile.mkdtemp()
+    try:
+        bucket, cache = os.path.join(root, "bucket"), os.path.join(root, "cache")
+        os.makedirs(bucket)
+        os.makedirs(cache)
+        for i in range(videos):
+            with open(os.path.join(bucket, f"{i}.mp4"), "wb") as f:
+                f.write(os.urandom(megabytes * 1024**2))
+        video_bytes = megabytes * 1024**2
+
+        def download(user_id, video_result_id, full_video=False):
+            time.sleep(download_seconds)
+            path = os.path.join(cache, f"{video_result_id}.mp4")
+            shutil.copyfile(os.path.join(bucket, f"{video_result_id}.mp4"), path)
+            return PrefetchedVideo(path, 30.0, [{"video_result_id": video_result_id}], os.path.getsize(path))
+
+        def export(user_id, video_result_id, labels):
+            time.sleep(export_seconds)
+            return ""
+
+        def annotate(seconds):
+            end = time.perf_counter() + seconds
+            while time.perf_counter() < end:
+                qt_app().processEvents()
+                time.sleep(0.001)
+
+        # open, annotate and export each video in turn, as the open dialog and the export button do
+        old_waits = []
+        for i in range(videos):
+            start = time.perf_counter()
+            download(1, i)
+            old_waits.append(time.perf_counter() - start)
+            time.sleep(annotate_seconds)
+            _, seconds = timed(export, 1, i, f"labels {i}")
+            old_waits[-1] += seconds
+
+        # half the disk budget of the queue's depth, so prefetching waits on it as well
+        budget = int(1.5 * video_bytes)
+        panel = VideoQueuePanel(lambda item: f"labels {item.video_result_id}", None, depth, budget, download, export)
+        new_waits, most_prefetched = [], 0
+
+        def open_item(item):
+            # an item still downloading is waited for, as the window's usual open path would
+            if item.prefetched is None:
+                download(item.user_id, item.video_result_id)
+
+        panel.openRequested.connect(open_item)
+        panel.setQueue([(1, i) for i in range(videos)])
+        annotate(annotate_seconds)
+        for i in range(videos):
+            _, seconds = timed(panel.next)
+            new_waits.append(seconds)
+            most_prefetched = max(most_prefetched, panel.queue.prefetched_bytes())
+            annotate(annotate_seconds)
+            most_prefetched = max(most_prefetched, panel.queue.prefetched_bytes())
+        # the last video is exported by moving on from it
+        panel.next()
+        panel.waitForDone()
+        qt_app().processEvents()
+
+        print_result("queue switch waits", videos, sum(old_waits), sum(new_waits))
+        print(
+            f"{'':<24} slowest switch old={max(old_waits) * 1000:.0f}ms new={max(new_waits) * 1000:.0f}ms, "
+            f"at most {most_prefetched / video_bytes:.0f} videos prefetched ahead"
+        )
+    finally:
+        shutil.rmtree(root)
+
+
+BENCHMARKS = {
+    "conversion": (benchmark_conversion, [100_000]),
+    "labels": (benchmark_labels, [10_000, 100_000, 1_000_000]),
+    "upload": (benchmark_upload, [500]),
+    "s3_cache": (benchmark_s3_cache, [64]),
+    "progressive": (benchmark_progressive, [256]),
+    "extraction": (benchmark_extraction, [1000]),
+    "frame_server": (benchmark_frame_server, [600]),
+    "seek_index": (benchmark_seek_index, [600]),
+    "proxy": (benchmark_proxy, [300]),
+    "table_load": (benchmark_table_load, [1000, 10_000, 50_000]),
+    "export": (benchmark_export, [10_000, 100_000]),
+    "autosave": (benchmark_autosave, [1000, 10_000, 100_000]),
+    "batch": (benchmark_batch, [50]),
+    "startup": (benchmark_startup, [5]),
+    "rules": (benchmark_rules, [100, 1000]),
+    "position_updates": (benchmark_position_updates, [1000]),
+    "sessions": (benchmark_sessions, [50, 100]),
+    "queue": (benchmark_queue, [10]),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("benchmarks", nargs="*", help=f"Benchmarks to run, one of {', '.join(BENCHMARKS)}")
+    parser.add_argument("--rows", type=int, nargs="+", help="Override the default row counts")
+    args = parser.parse_args()
+
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    for name in args.benchmarks or list(BENCHMARKS):
+        func, default_rows = BENCHMARKS[name]
+        print(f"# {name}: {func.__doc__}")
+        for rows in args.rows or default_rows:
+            func(rows)
+
+
+if __name__ == "__main__":
+    main()
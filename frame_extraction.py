@@ -0,0 +1,266 @@
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from lazy_module import LazyModule
+from seek_index import load_seek_index
+
+
+cv2 = LazyModule("cv2")
+
+# frame files are named pattern.format(first_index + frame number)
+FrameNaming = namedtuple("FrameNaming", ["pattern", "first_index"])
+FRAME_NAMING = FrameNaming("{}.jpg", 0)
+
+# gaps shorter than this are decoded through rather than seeked over
+SEEK_THRESHOLD_FRAMES = 120
+
+# how often a parallel extraction checks whether it was cancelled while its chunks decode
+CANCEL_POLL_SECONDS = 0.1
+
+
+class ExtractionCancelled(Exception):
+    pass
+
+
+def frame_filename(naming, frame_num):
+    return naming.pattern.format(naming.first_index + frame_num)
+
+
+def frame_naming_from_names(names, frame_count):
+    """The naming of frames 0 to frame_count - 1 written with these file names, or None if they don't follow a
+    '<prefix><index><suffix>' pattern"""
+    matches = [re.fullmatch(r"(.*?)(\d+)(\D*)", name) for name in names]
+    if len(names) != frame_count or not all(matches):
+        return None
+    affixes = {(match.group(1), match.group(3)) for match in matches}
+    indices = sorted(int(match.group(2)) for match in matches)
+    if len(affixes) != 1 or indices != list(range(indices[0], indices[0] + frame_count)):
+        return None
+
+    digits = [match.group(2) for match in matches]
+    padded = any(len(index) > 1 and index.startswith("0") for index in digits)
+    if padded and len({len(index) for index in digits}) != 1:
+        return None
+    prefix, suffix = (affix.replace("{", "{{").replace("}", "}}") for affix in affixes.pop())
+    index_format = f"{{:0{len(digits[0])}d}}" if padded else "{}"
+    return FrameNaming(prefix + index_format + suffix, indices[0])
+
+
+@lru_cache(maxsize=1)
+def vid_to_frames_naming(probe_frames=3):
+    """How atlas_utils' vid_to_frames names the frames it writes, learned by running it on a tiny clip, or None if
+    that can't be worked out. Frames for generate_report are only written here once this is known"""
+    from atlas_utils.vid_utils import vid_to_frames
+
+    root = tempfile.mkdtemp()
+    try:
+        video_path = os.path.join(root, "probe.mp4")
+        writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (32, 32))
+        for i in range(probe_frames):
+            writer.write(np.full((32, 32, 3), i * 60, dtype=np.uint8))
+        writer.release()
+        frames_dir = os.path.join(root, "frames")
+        vid_to_frames(video_path, frames_dir)
+        names = sorted(os.listdir(frames_dir)) if os.path.isdir(frames_dir) else []
+    except Exception as e:
+        print(f"Could not work out how vid_to_frames names frames: {e}")
+        return None
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return frame_naming_from_names(names, probe_frames)
+
+
+ExtractionStats = namedtuple(
+    "ExtractionStats",
+    ["frames_written", "frames_skipped", "seconds", "bytes_written", "full_frames", "full_bytes", "full_seconds"],
+)
+
+
+def labelled_frame_ranges(labels_df, frame_count, padding=0):
+    """Returns the sorted, merged (start, end) frame ranges covered by the labels, end inclusive"""
+    ranges = sorted(
+        (max(0, int(start) - padding), min(frame_count - 1, int(end) + padding))
+        for start, end in zip(labels_df["start_frame"], labels_df["end_frame"])
+    )
+
+    merged = []
+    for start, end in ranges:
+        if end < start:
+            continue
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def extract_frame_ranges(video_path, output_dir, ranges, step=1, scale=1.0, naming=FRAME_NAMING, cancelled=None):
+    """Decodes only the given frame ranges of a video to image files, skipping frames already on disk. Setting the
+    cancelled event stops it before the next frame, raising ExtractionCancelled"""
+    os.makedirs(output_dir, exist_ok=True)
+    capture = cv2.VideoCapture(video_path)
+    frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    frames_written = frames_skipped = bytes_written = 0
+    start_time = time.perf_counter()
+    position = None
+    try:
+        for start, end in ranges:
+            wanted = list(range(start, end + 1, step))
+            paths = {frame_num: os.path.join(output_dir, frame_filename(naming, frame_num)) for frame_num in wanted}
+            missing = [frame_num for frame_num in wanted if not os.path.exists(paths[frame_num])]
+            frames_skipped += len(wanted) - len(missing)
+            if not missing:
+                continue
+
+            # seeking lands on the nearest keyframe and decodes forward, so only seek over long gaps
+            if position is None or missing[0] < position or missing[0] - position > SEEK_THRESHOLD_FRAMES:
+                capture.set(cv2.CAP_PROP_POS_FRAMES, missing[0])
+                position = missing[0]
+
+            missing = set(missing)
+            while position <= end:
+                if cancelled is not None and cancelled.is_set():
+                    raise ExtractionCancelled(f"Extraction of {video_path} cancelled after {frames_written} frames")
+                if position not in missing:
+                    capture.grab()
+                    position += 1
+                    continue
+
+                ok, frame = capture.read()
+                if not ok:
+                    position = None
+                    break
+                if scale != 1.0:
+                    frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                cv2.imwrite(paths[position], frame)
+                bytes_written += os.path.getsize(paths[position])
+                frames_written += 1
+                position += 1
+    finally:
+        capture.release()
+
+    seconds = time.perf_counter() - start_time
+    # estimate what writing every frame would have cost from the frames we did write
+    full_bytes = bytes_written / frames_written * frame_count if frames_written else 0
+    full_seconds = seconds / frames_written * frame_count if frames_written else 0
+    return ExtractionStats(frames_written, frames_skipped, seconds, bytes_written, frame_count, full_bytes, full_seconds)
+
+
+def extract_labelled_frames(
+    video_path, output_dir, labels_df, padding=0, step=1, scale=1.0, naming=FRAME_NAMING, cancelled=None
+):
+    """Decodes only the frames inside the labelled start_frame..end_frame ranges"""
+    capture = cv2.VideoCapture(video_path)
+    frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+
+    ranges = labelled_frame_ranges(labels_df, frame_count, padding=padding)
+    return extract_frame_ranges(
+        video_path, output_dir, ranges, step=step, scale=scale, naming=naming, cancelled=cancelled
+    )
+
+
+def format_extraction_stats(stats):
+    saved_bytes = max(0, stats.full_bytes - stats.bytes_written)
+    saved_seconds = max(0, stats.full_seconds - stats.seconds)
+    return (
+        f"wrote {stats.frames_written} of {stats.full_frames} frames ({stats.frames_skipped} already on disk) "
+        f"in {stats.seconds:.1f}s, saving ~{saved_bytes / 1024**2:.0f} MB and ~{saved_seconds:.1f}s"
+    )
+
+
+def split_into_chunks(frame_count, chunks, keyframes=None):
+    """Splits [0, frame_count) into roughly equal (start, end) ranges, end inclusive, starting on keyframes if known"""
+    bounds = [round(i * frame_count / chunks) for i in range(chunks)]
+    if keyframes is not None and len(keyframes):
+        keyframes = np.asarray(sorted(keyframes))
+        bounds = [int(keyframes[max(0, np.searchsorted(keyframes, bound, side="right") - 1)]) for bound in bounds]
+    bounds = sorted(set(bounds) | {0})
+    return [(start, end - 1) for start, end in zip(bounds, bounds[1:] + [frame_count]) if end > start]
+
+
+# set in each worker process, the parent sets it to stop the chunks being decoded
+_stop_event = None
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _decode_chunk(video_path, start, end, scale):
+    capture = cv2.VideoCapture(video_path)
+    try:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+        for frame_num in range(start, end + 1):
+            if _stop_event is not None and _stop_event.is_set():
+                return
+            ok, frame = capture.read()
+            if not ok:
+                return
+            if scale != 1.0:
+                frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            yield frame_num, frame
+    finally:
+        capture.release()
+
+
+def _extract_chunk_to_files(video_path, output_dir, start, end, scale, naming):
+    written = 0
+    for frame_num, frame in _decode_chunk(video_path, start, end, scale):
+        cv2.imwrite(os.path.join(output_dir, frame_filename(naming, frame_num)), frame)
+        written += 1
+    return written
+
+
+def extract_video_parallel(
+    video_path, output_dir, workers=None, scale=1.0, keyframes=None, naming=FRAME_NAMING, cancelled=None
+):
+    """Decodes every frame of a video in a process pool, one chunk per worker, to one image file per frame like
+    vid_to_frames. Chunks start on keyframes if given, or if the video's seek index is already saved; the index is
+    never built here, as that is a full pass over the video before any worker starts. Returns the number of frames
+    written. Setting the cancelled event stops every worker before its next frame, raising ExtractionCancelled"""
+    workers = workers or os.cpu_count()
+
+    capture = cv2.VideoCapture(video_path)
+    frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+
+    if keyframes is None:
+        index = load_seek_index(video_path)
+        # without one, chunks start wherever they fall, which costs each worker a longer seek
+        keyframes = index.keyframes if index is not None else None
+
+    os.makedirs(output_dir, exist_ok=True)
+    chunks = split_into_chunks(frame_count, workers, keyframes=keyframes)
+    # spawn rather than fork, this can run from a thread of the Qt app
+    mp_context = multiprocessing.get_context("spawn")
+    # a threading.Event can't reach the workers, so cancelling is passed on through a process one
+    stop_event = mp_context.Event() if cancelled is not None else None
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=mp_context, initializer=_init_worker, initargs=(stop_event,)
+    ) as executor:
+        futures = [
+            executor.submit(_extract_chunk_to_files, video_path, output_dir, start, end, scale, naming)
+            for start, end in chunks
+        ]
+        pending = set(futures)
+        while pending:
+            if cancelled is not None and cancelled.is_set():
+                stop_event.set()
+            _, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+        frames_written = sum(future.result() for future in futures)
+
+    if cancelled is not None and cancelled.is_set():
+        raise ExtractionCancelled(f"Extraction of {video_path} cancelled after {frames_written} frames")
+    return frames_written
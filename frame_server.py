@@ -0,0 +1,164 @@
+from collections import OrderedDict, deque
+import threading
+import time
+
+import numpy as np
+
+from frame_extraction import SEEK_THRESHOLD_FRAMES
+from lazy_module import LazyModule
+
+
+cv2 = LazyModule("cv2")
+
+FRAME_CACHE_MB = 512
+PREFETCH_AHEAD = 60
+PREFETCH_BEHIND = 30
+LATENCY_SAMPLES = 500
+
+
+class FrameServer:
+    """Decodes the frames around the playhead with OpenCV on a background thread and keeps them, as RGB arrays, in an
+    LRU cache capped at max_mb so stepping and scrubbing near the playhead doesn't have to seek and decode"""
+
+    def __init__(self, video_path, max_mb=FRAME_CACHE_MB, ahead=PREFETCH_AHEAD, behind=PREFETCH_BEHIND, seek_index=None):
+        self.video_path = video_path
+        # set once the video's SeekIndex is built, to seek only when that is fewer decodes
+        self.seek_index = seek_index
+        self.max_bytes = int(max_mb * 1024**2)
+        self.capture = cv2.VideoCapture(video_path)
+        if not self.capture.isOpened():
+            raise IOError(f"Could not open {video_path}")
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS)
+        width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        # shrink the prefetch window so it fits in the cache, otherwise it would evict itself
+        capacity = max(1, self.max_bytes // max(1, width * height * 3))
+        self.ahead = min(ahead, capacity * 2 // 3)
+        self.behind = min(behind, max(0, capacity - self.ahead - 1))
+
+        self.frames = OrderedDict()
+        self.cached_bytes = 0
+        self.position = None
+        self.playhead = 0
+        self.hits = 0
+        self.misses = 0
+        self.decode_seconds = deque(maxlen=LATENCY_SAMPLES)
+        self.closed = False
+        # the capture is shared by the prefetch thread and cache misses on the caller's thread
+        self.capture_lock = threading.Lock()
+        self.lock = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def get(self, frame_num):
+        """Returns the RGB frame, decoding it on this thread if it isn't cached"""
+        frame_num = max(0, min(frame_num, self.frame_count - 1))
+        with self.lock:
+            frame = self.frames.get(frame_num)
+            if frame is not None:
+                self.frames.move_to_end(frame_num)
+                self.hits += 1
+                return frame
+            self.misses += 1
+
+        with self.capture_lock:
+            return self._decode(frame_num)
+
+    def set_playhead(self, frame_num):
+        """Moves the prefetch window to be around the given frame"""
+        with self.lock:
+            self.playhead = max(0, min(frame_num, self.frame_count - 1))
+            self.lock.notify()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.lock.notify()
+        self.thread.join()
+        with self.capture_lock:
+            self.capture.release()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            latencies = np.array(self.decode_seconds) * 1000
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "cached_frames": len(self.frames),
+                "cached_mb": self.cached_bytes / 1024**2,
+                "decode_ms_mean": float(latencies.mean()) if latencies.size else 0.0,
+                "decode_ms_p95": float(np.percentile(latencies, 95)) if latencies.size else 0.0,
+            }
+
+    def format_stats(self):
+        stats = self.stats()
+        return (
+            f"{stats['hit_rate']:.0%} hit rate ({stats['hits']} hits, {stats['misses']} misses), "
+            f"{stats['cached_frames']} frames / {stats['cached_mb']:.0f} MB cached, "
+            f"decode {stats['decode_ms_mean']:.1f}ms mean / {stats['decode_ms_p95']:.1f}ms p95"
+        )
+
+    def _store(self, frame_num, frame):
+        with self.lock:
+            if frame_num in self.frames:
+                return
+            self.frames[frame_num] = frame
+            self.cached_bytes += frame.nbytes
+            while self.cached_bytes > self.max_bytes and len(self.frames) > 1:
+                _, evicted = self.frames.popitem(last=False)
+                self.cached_bytes -= evicted.nbytes
+
+    def _decode(self, frame_num):
+        """Decodes up to and including frame_num, caching every frame decoded on the way. Needs capture_lock"""
+        if self.seek_index is not None:
+            seek = self.seek_index.should_seek(self.position, frame_num)
+        else:
+            # seeking lands on the nearest keyframe and decodes forward, so only seek backwards or over long gaps
+            seek = self.position is None or frame_num < self.position or frame_num - self.position > SEEK_THRESHOLD_FRAMES
+        if seek:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
+            self.position = frame_num
+
+        frame = None
+        while self.position <= frame_num:
+            start = time.perf_counter()
+            ok, bgr = self.capture.read()
+            if not ok:
+                self.position = None
+                break
+            frame = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+            with self.lock:
+                self.decode_seconds.append(time.perf_counter() - start)
+            self._store(self.position, frame)
+            self.position += 1
+        return frame
+
+    def _wanted(self, playhead):
+        """The uncached frames of the window around the playhead, forwards from it first then the frames behind it"""
+        ahead = range(playhead, min(self.frame_count, playhead + self.ahead + 1))
+        behind = range(max(0, playhead - self.behind), playhead)
+        return [frame_num for frame_num in list(ahead) + list(behind) if frame_num not in self.frames]
+
+    def _run(self):
+        while True:
+            with self.lock:
+                wanted = self._wanted(self.playhead)
+                while not wanted and not self.closed:
+                    self.lock.wait()
+                    wanted = self._wanted(self.playhead)
+                if self.closed:
+                    return
+                playhead = self.playhead
+
+            with self.capture_lock:
+                # one frame per pass so a moved playhead or a cache miss on the UI thread isn't kept waiting
+                if playhead != self.playhead or wanted[0] in self.frames:
+                    continue
+                if self._decode(wanted[0]) is None:
+                    # the container overstated the frame count, stop prefetching past the last readable frame
+                    with self.lock:
+                        self.frame_count = min(self.frame_count, wanted[0])
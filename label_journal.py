@@ -0,0 +1,209 @@
+import json
+import os
+import shutil
+import uuid
+
+from label_table import LABEL_COLUMNS
+from s3_cache import FileLock
+
+
+JOURNAL_VERSION = 1
+AUTOSAVE_DIR = os.environ.get(
+    "ATLAS_AUTOSAVE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "atlas_labelling_tool", "autosave")
+)
+# every window autosaves into its own session directory, locked for as long as the window is open
+SESSION_PREFIX = "session-"
+LOCK_NAME = "lock"
+JOURNAL_NAME = "labels.journal.jsonl"
+SNAPSHOT_NAME = "labels.snapshot.json"
+# the journal is folded into the snapshot once it has as many entries as the table has rows (and at least this many),
+# so rewriting the snapshot costs O(1) per edit amortised
+JOURNAL_COMPACT_MIN_ENTRIES = 1000
+
+
+class LabelJournal:
+    """Autosaves the label table as a snapshot plus an append-only JSONL journal of every row insert, row removal and
+    cell edit since, so a crash loses at most the edit being written. Each edit appends one line whatever the table's
+    size. Each instance writes to a session directory of its own, so windows open side by side don't share files"""
+
+    def __init__(self, directory=AUTOSAVE_DIR, compact_min_entries=JOURNAL_COMPACT_MIN_ENTRIES):
+        self.directory = directory
+        self.session_dir = os.path.join(directory, f"{SESSION_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:8]}")
+        os.makedirs(self.session_dir)
+        self.lock = FileLock(os.path.join(self.session_dir, LOCK_NAME), blocking=False)
+        self.lock.acquire()
+        self.journal_path = os.path.join(self.session_dir, JOURNAL_NAME)
+        self.snapshot_path = os.path.join(self.session_dir, SNAPSHOT_NAME)
+        self.compact_min_entries = compact_min_entries
+        self.model = None
+        self.video = ""
+        self.generation = 0
+        self.entries = 0
+        self.journal = None
+        self.recovered = None
+
+    def recover(self):
+        """Replays the most recent session left behind by a window that crashed, which attach() then deletes whether
+        or not its table was restored. Returns the table as a list of rows of LABEL_COLUMNS strings and the path of the
+        video it was labelling"""
+        for session_dir in self._sessions_newest_first():
+            lock = FileLock(os.path.join(session_dir, LOCK_NAME), blocking=False)
+            if not lock.acquire():
+                # another window's live session
+                continue
+            rows, video = self._read_session(session_dir)
+            if rows or video:
+                self.recovered = (session_dir, lock)
+                return rows, video
+            self._remove_session(session_dir, lock)
+        return [], ""
+
+    def _sessions_newest_first(self):
+        sessions = []
+        for name in os.listdir(self.directory):
+            session_dir = os.path.join(self.directory, name)
+            snapshot_path = os.path.join(session_dir, SNAPSHOT_NAME)
+            # a session without a snapshot is one that is still starting up
+            if name.startswith(SESSION_PREFIX) and session_dir != self.session_dir and os.path.isfile(snapshot_path):
+                paths = [snapshot_path, os.path.join(session_dir, JOURNAL_NAME)]
+                sessions.append((max(os.path.getmtime(path) for path in paths if os.path.exists(path)), session_dir))
+        return [session_dir for _, session_dir in sorted(sessions, reverse=True)]
+
+    def _read_session(self, session_dir):
+        rows, video, generation = [], "", None
+        try:
+            with open(os.path.join(session_dir, SNAPSHOT_NAME)) as f:
+                snapshot = json.load(f)
+            if snapshot["version"] == JOURNAL_VERSION and snapshot["columns"] == LABEL_COLUMNS:
+                rows, video, generation = snapshot["rows"], snapshot["video"], snapshot["generation"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        try:
+            with open(os.path.join(session_dir, JOURNAL_NAME)) as f:
+                lines = f.readlines()
+        except OSError:
+            lines = []
+        # a journal that didn't start from this snapshot was already folded into it before a crash cut compaction short
+        entries = self._read_entries(lines)
+        if entries and entries[0] == {"op": "start", "generation": generation}:
+            for entry in entries[1:]:
+                video = self._apply(rows, entry) or video
+        return rows, video
+
+    @staticmethod
+    def _remove_session(session_dir, lock):
+        # the lock file goes last, it can't be deleted while held on Windows
+        for name in os.listdir(session_dir):
+            if name != LOCK_NAME:
+                path = os.path.join(session_dir, name)
+                shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+        lock.release()
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+    @staticmethod
+    def _read_entries(lines):
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # the line being written when the app died
+                break
+        return entries
+
+    @staticmethod
+    def _apply(rows, entry):
+        """Applies a journal entry to rows, returning the video of a video entry"""
+        op = entry["op"]
+        if op == "insert":
+            rows[entry["row"] : entry["row"]] = entry["values"]
+        elif op == "remove":
+            del rows[entry["row"] : entry["row"] + entry["count"]]
+        elif op == "set":
+            rows[entry["row"]][entry["column"]] = entry["value"]
+        elif op == "video":
+            return entry["video"]
+
+    def attach(self, model):
+        """Journals every change made to a LabelTableModel from now on, starting from a snapshot of it as it is"""
+        self.model = model
+        self.compact()
+        if self.recovered is not None:
+            self._remove_session(*self.recovered)
+            self.recovered = None
+        model.rowsInserted.connect(self.rows_inserted)
+        model.rowsRemoved.connect(self.rows_removed)
+        model.dataChanged.connect(self.data_changed)
+        # a reset replaces the whole table, which costs as much as snapshotting it
+        model.modelReset.connect(self.compact)
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def release(self):
+        """Closes the journal and unlocks the session, and any recovered one not yet attached, leaving them for the
+        next window to recover as a crash would"""
+        self.close()
+        self.lock.release()
+        if self.recovered is not None:
+            self.recovered[1].release()
+            self.recovered = None
+
+    def discard(self):
+        """Closes the journal and deletes the session, for a window that closed cleanly"""
+        self.close()
+        self._remove_session(self.session_dir, self.lock)
+        if self.recovered is not None:
+            self.recovered[1].release()
+            self.recovered = None
+
+    def set_video(self, video):
+        if video != self.video:
+            self.video = video
+            self._write({"op": "video", "video": video})
+
+    def rows_inserted(self, parent, first, last):
+        values = [self.model.rowValues(row) for row in range(first, last + 1)]
+        self._write({"op": "insert", "row": first, "values": values})
+
+    def rows_removed(self, parent, first, last):
+        self._write({"op": "remove", "row": first, "count": last - first + 1})
+
+    def data_changed(self, top_left, bottom_right, roles=()):
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            for column in range(top_left.column(), bottom_right.column() + 1):
+                value = self.model.columns[column][row]
+                self._write({"op": "set", "row": row, "column": column, "value": value})
+
+    def _write(self, entry):
+        if self.journal is None:
+            return
+        # flushed so the edit reaches the OS before the next one, which is what survives the app crashing
+        self.journal.write(json.dumps(entry) + "\n")
+        self.journal.flush()
+        self.entries += 1
+        if self.entries >= max(self.compact_min_entries, self.model.rowCount()):
+            self.compact()
+
+    def compact(self):
+        """Writes the whole table to a new snapshot and starts an empty journal on top of it"""
+        self.close()
+        self.generation += 1
+        snapshot = {
+            "version": JOURNAL_VERSION,
+            "generation": self.generation,
+            "video": self.video,
+            "columns": LABEL_COLUMNS,
+            "rows": self.model.toRows(),
+        }
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.part"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.snapshot_path)
+
+        self.journal = open(self.journal_path, "w")
+        self.entries = 0
+        self._write({"op": "start", "generation": self.generation})
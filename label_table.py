@@ -0,0 +1,131 @@
+import numpy as np
+
+from lazy_module import LazyModule
+from time_conversion import frame_nums_to_precise_times
+
+
+pd = LazyModule("pandas")
+
+LABEL_COLUMNS = [
+    "start_time",
+    "end_time",
+    "exercise",
+    "orientation",
+    "min_reps",
+    "reps",
+    "rule",
+    "is_valid",
+    "reps_to_judge",
+    "notes",
+]
+
+
+def empty_label_table():
+    return pd.DataFrame({name: pd.Series([], dtype=object) for name in LABEL_COLUMNS})
+
+
+def _strings(column):
+    # str() of every value like the cells always held, pandas' astype(str) keeps missing values missing
+    return column.to_numpy(dtype=object).astype(str).astype(object)
+
+
+def _is_valid_strings(labels_df, known_values):
+    if "is_valid" not in labels_df.columns:
+        return "N/A"
+    return np.where(labels_df["is_valid"].isin(known_values), _strings(labels_df["is_valid"]), "N/A").astype(object)
+
+
+def csv_labels_to_table(labels_df, fps):
+    """Converts labels read from a saveToCsv export to the label table's string columns in one vectorised pass"""
+    if len(labels_df) == 0:
+        return empty_label_table()
+
+    return pd.DataFrame(
+        {
+            "start_time": frame_nums_to_precise_times(labels_df["start_frame"].astype(int), fps),
+            "end_time": frame_nums_to_precise_times(labels_df["end_frame"].astype(int), fps),
+            "exercise": _strings(labels_df["exercise"]),
+            "orientation": _strings(labels_df["orientation"]),
+            "min_reps": _strings(labels_df["min_reps"]),
+            "reps": _strings(labels_df["reps"]),
+            "rule": _strings(labels_df["rule"]),
+            "is_valid": _is_valid_strings(labels_df, [True, False, "N/A"]),
+            "reps_to_judge": _strings(labels_df["reps_to_judge"]),
+            "notes": _strings(labels_df["notes"]),
+        }
+    )
+
+
+def api_labels_to_table(labels, fps):
+    """Converts labels fetched from the API to the label table's string columns in one vectorised pass"""
+    if len(labels) == 0:
+        return empty_label_table()
+
+    # object columns keep each value as fetched, a single null would otherwise turn a whole int column to float
+    labels_df = pd.DataFrame(labels, dtype=object)
+    return pd.DataFrame(
+        {
+            "start_time": frame_nums_to_precise_times(labels_df["start_frame"].astype(int), fps),
+            "end_time": frame_nums_to_precise_times(labels_df["end_frame"].astype(int), fps),
+            "exercise": _strings(labels_df["exercise"].fillna("")),
+            "orientation": _strings(labels_df["view"].fillna("")),
+            "min_reps": _strings(labels_df["min_reps"]),
+            "reps": _strings(labels_df["reps"]),
+            "rule": _strings(labels_df["rules"].fillna("")),
+            "is_valid": _is_valid_strings(labels_df, ["True", "False", "N/A"]),
+            "reps_to_judge": _strings(labels_df["reps_to_judge"].fillna("")),
+            "notes": _strings(labels_df["notes"].fillna("")),
+        }
+    )
+
+
+# what pd.read_csv reads as missing, exports used to round trip through a CSV file so their types came from it
+NA_STRINGS = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+TRUE_STRINGS = ["True", "TRUE", "true"]
+FALSE_STRINGS = ["False", "FALSE", "false"]
+
+
+def _infer_column(column):
+    """Types a column of cell strings the way pd.read_csv would"""
+    values = column.where(~column.isin(NA_STRINGS), np.nan)
+    present = values.dropna()
+    if present.empty:
+        return values.astype(float)
+
+    if present.isin(TRUE_STRINGS + FALSE_STRINGS).all():
+        booleans = values.map(lambda value: value in TRUE_STRINGS, na_action="ignore")
+        return booleans.astype(bool) if len(present) == len(values) else booleans.astype(object)
+
+    try:
+        # fails fast on the first cell that isn't a number
+        return pd.to_numeric(values)
+    except (ValueError, TypeError):
+        # infer_objects gives text the same dtype read_csv does, object or pandas' string dtype depending on the version
+        return values.infer_objects()
+
+
+def table_to_labels_df(table_df):
+    """Types the label table's cells like a CSV export read back with pd.read_csv, without the file. Rows that were
+    added but never filled in are dropped"""
+    table_df = table_df[(table_df.to_numpy() != "").any(axis=1)].reset_index(drop=True)
+    return pd.DataFrame({name: _infer_column(table_df[name]) for name in LABEL_COLUMNS})
@@ -0,0 +1,141 @@
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+import numpy as np
+
+from label_table import LABEL_COLUMNS
+from lazy_module import LazyModule
+
+
+pd = LazyModule("pandas")
+
+INITIAL_CAPACITY = 64
+
+
+class LabelTableModel(QAbstractTableModel):
+    """The label table, kept as one string array per column that grows by doubling so appends are amortised O(1)"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = 0
+        self.columns = self.emptyColumns(INITIAL_CAPACITY)
+
+    @staticmethod
+    def emptyColumns(capacity):
+        columns = [np.empty(capacity, dtype=object) for _ in LABEL_COLUMNS]
+        for column in columns:
+            column.fill("")
+        return columns
+
+    def reserve(self, rows):
+        capacity = len(self.columns[0])
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        columns = self.emptyColumns(capacity)
+        for new, old in zip(columns, self.columns):
+            new[: self.rows] = old[: self.rows]
+        self.columns = columns
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(LABEL_COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        return self.columns[index.column()][index.row()]
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        self.columns[index.column()][index.row()] = str(value)
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return LABEL_COLUMNS[section]
+        return str(section + 1)
+
+    def flags(self, index):
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable
+
+    def insertRows(self, row, count, parent=QModelIndex()):
+        self.beginInsertRows(parent, row, row + count - 1)
+        self.reserve(self.rows + count)
+        for column in self.columns:
+            column[row + count : self.rows + count] = column[row : self.rows]
+            column[row : row + count] = ""
+        self.rows += count
+        self.endInsertRows()
+        return True
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        self.beginRemoveRows(parent, row, row + count - 1)
+        for column in self.columns:
+            column[row : self.rows - count] = column[row + count : self.rows]
+            column[self.rows - count : self.rows] = ""
+        self.rows -= count
+        self.endRemoveRows()
+        return True
+
+    def appendRow(self, values):
+        """Appends a row of cell strings, missing trailing cells are left empty"""
+        self.beginInsertRows(QModelIndex(), self.rows, self.rows)
+        self.reserve(self.rows + 1)
+        for column, value in zip(self.columns, values):
+            column[self.rows] = value
+        self.rows += 1
+        self.endInsertRows()
+
+    def appendRows(self, labels_df):
+        """Appends every row of a DataFrame with LABEL_COLUMNS string columns in one insert"""
+        if len(labels_df) == 0:
+            return
+        start = self.rows
+        self.beginInsertRows(QModelIndex(), start, start + len(labels_df) - 1)
+        self.reserve(start + len(labels_df))
+        for column, name in zip(self.columns, LABEL_COLUMNS):
+            column[start : start + len(labels_df)] = labels_df[name].to_numpy(dtype=object)
+        self.rows += len(labels_df)
+        self.endInsertRows()
+
+    def setRows(self, labels_df):
+        """Replaces the whole table with the rows of a DataFrame with LABEL_COLUMNS string columns, in one reset"""
+        self.beginResetModel()
+        self.rows = 0
+        self.columns = self.emptyColumns(max(INITIAL_CAPACITY, len(labels_df)))
+        for column, name in zip(self.columns, LABEL_COLUMNS):
+            column[: len(labels_df)] = labels_df[name].to_numpy(dtype=object)
+        self.rows = len(labels_df)
+        self.endResetModel()
+
+    def removeRowsAt(self, rows):
+        """Removes the given rows, one contiguous block at a time from the bottom up"""
+        rows = sorted(set(rows), reverse=True)
+        while rows:
+            end = start = rows.pop(0)
+            while rows and rows[0] == start - 1:
+                start = rows.pop(0)
+            self.removeRows(start, end - start + 1)
+
+    def clear(self):
+        self.beginResetModel()
+        self.rows = 0
+        self.columns = self.emptyColumns(INITIAL_CAPACITY)
+        self.endResetModel()
+
+    def rowValues(self, row):
+        return [column[row] for column in self.columns]
+
+    def toRows(self):
+        """The table as a list of rows of cell strings"""
+        return np.stack([column[: self.rows] for column in self.columns], axis=1).tolist()
+
+    def toDataFrame(self):
+        """A copy of the table as a DataFrame of strings, one column per label field"""
+        return pd.DataFrame({name: column[: self.rows].copy() for name, column in zip(LABEL_COLUMNS, self.columns)})
@@ -0,0 +1,25 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    """Stands in for a module and imports it the first time one of its attributes is used, so slow imports the window
+    doesn't need to open are paid for on first use instead of at startup"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            # the first use can come from a worker thread as well as the UI thread
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded yet"
+        return f"<lazy module {self._name!r}, {state}>"
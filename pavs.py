@@ -1,3 +1,6 @@
+# first, so the imports below are timed
+from startup_timing import format_startup_times, mark_startup
+
 from PyQt5.QtWidgets import (
     QMainWindow,
     QApplication,
@@ -11,9 +14,8 @@ from PyQt5.QtWidgets import (
     QSlider,
     QStyle,
     QWidget,
-    QTableWidget,
+    QTableView,
     QVBoxLayout,
-    QTableWidgetItem,
     QHBoxLayout,
     QFormLayout,
     QShortcut,
@@ -21,44 +23,103 @@ from PyQt5.QtWidgets import (
     QDialogButtonBox,
     QMessageBox,
     QRadioButton,
+    QProgressDialog,
+    QStackedWidget,
 )
 from PyQt5.QtMultimedia import QMediaContent, QMediaPlayer
 from PyQt5.QtMultimediaWidgets import QVideoWidget
-from PyQt5 import QtCore, Qt
-from PyQt5.QtCore import Qt, QUrl, QDir, QTime
-from PyQt5.QtGui import QKeySequence, QStandardItemModel, QIntValidator
+from PyQt5 import QtCore
+from PyQt5.QtCore import Qt, QUrl, QDir, QTimer, QThreadPool
+from PyQt5.QtGui import QKeySequence, QStandardItemModel, QIntValidator, QImage, QPixmap
 import os
-import csv
 import sys
 import argparse
-import pandas as pd
+import logging
 import tempfile
-import shutil
-import traceback
+import threading
+
+mark_startup("Qt imports")
+
 from utils import (
-    convert_time_to_frame_num_df,
-    add_labels_column,
-    send_labels_to_api,
+    build_labels_df,
+    sync_labels_to_api,
     download_file_from_s3,
     get_labels_from_api,
+    get_video_filename_from_api,
     get_video_fps,
-    convert_frame_num_to_time,
-    upload_file_to_s3,
+    get_video_metadata,
+    get_s3_download_progress,
+    stream_file_from_s3,
+)
+from time_conversion import (
+    frame_num_to_position,
+    frame_nums_to_precise_times,
+    position_to_frame_num,
+    times_to_frame_nums,
+    times_to_seconds,
 )
+from frame_server import FRAME_CACHE_MB, FrameServer
+from label_journal import LabelJournal
+from lazy_module import LazyModule
+from label_table import LABEL_COLUMNS, api_labels_to_table, csv_labels_to_table
+from label_table_model import LabelTableModel
+from position_updates import PositionUpdates, format_position
+from proxy_video import get_proxy
+from seek_index import get_seek_index
+from report_pipeline import ReportJob
+from rules_index import RulesIndex
+from video_queue import VideoQueuePanel, read_queue_file
+from workers import Worker
+
+pd = LazyModule("pandas")
+
+mark_startup("annotator imports")
+
+# stats for diagnosing performance, shown with --verbose
+log = logging.getLogger("pavs")
 
-from atlas_utils.evaluation_framework.report_generation.form_error.calculate_form_error import form_threshold_dict
-from atlas_utils.evaluation_framework.generate_report import generate_report
-from atlas_utils.vid_utils import vid_to_frames
-from atlas_utils.tools import get_video_filename_from_api
-from atlas_utils.evaluation_framework.report_generation.utils import add_is_valid_values_to_df
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--classes_label_path", type=str)
+    parser.add_argument("--stream_video", action="store_true", help="Start playing S3 videos before they finish downloading")
+    parser.add_argument(
+        "--frame_server", action="store_true", help="Step and scrub through frames decoded ahead of time with OpenCV"
+    )
+    parser.add_argument("--frame_cache_mb", type=int, default=FRAME_CACHE_MB, help="Memory cap of the frame server")
+    parser.add_argument("--proxy", action="store_true", help="Play and scrub a low resolution copy of high resolution videos")
+    parser.add_argument(
+        "--report_labelled_frames",
+        action="store_true",
+        help="Extract only the labelled frames for reports, for reports that don't use frames outside the labels",
+    )
+    parser.add_argument("--queue", type=str, help="CSV of user ID, video result ID pairs to annotate one after another")
+    parser.add_argument(
+        "--startup_timing", action="store_true", help="Print how long each stage of startup took and exit once the window is up"
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="Print playback, frame server, API session and report stage statistics"
+    )
     args = parser.parse_args()
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG, format="%(name)s: %(message)s")
 
     App = QApplication(sys.argv)
-    window = Window(args.classes_label_path)
+    mark_startup("QApplication")
+    frame_cache_mb = args.frame_cache_mb if args.frame_server else 0
+    window = Window(args.classes_label_path, args.stream_video, frame_cache_mb, args.proxy, args.report_labelled_frames)
+    mark_startup("window")
+    if args.queue:
+        window.queuePanel.setQueue(read_queue_file(args.queue))
+    if args.startup_timing:
+
+        def printStartupTimes():
+            mark_startup("first paint")
+            print(format_startup_times())
+            App.quit()
+
+        # runs once the event loop has shown the window
+        QTimer.singleShot(0, printStartupTimes)
     sys.exit(App.exec())
 
 
@@ -167,13 +228,19 @@ class OpenVideoInputDialog(QDialog):
 
 
 class Window(QMainWindow):
-    def __init__(self, classes_label_path):
+    def __init__(
+        self, classes_label_path, stream_video=False, frame_cache_mb=0, use_proxy=False, report_labelled_frames=False
+    ):
         super().__init__()
 
         self.title = "Exercise Video Annotator"
         self.classes_label_path = classes_label_path
-        self.full_video_filename = ""
+        self.stream_video = stream_video
+        self.frame_cache_mb = frame_cache_mb
+        self.use_proxy = use_proxy
+        self.report_labelled_frames = report_labelled_frames
         self.InitWindow()
+        self.recoverLabels()
 
     def InitWindow(self):
         self.setWindowTitle(self.title)
@@ -185,8 +252,6 @@ class Window(QMainWindow):
 
     def UiComponents(self):
 
-        self.rowNo = 1
-        self.colNo = 0
         self.fName = ""
         self.fName2 = ""
         self.video_file_path = ""
@@ -194,20 +259,53 @@ class Window(QMainWindow):
         self.userId = -1
         self.videoResultId = -1
         self.tmpDir = os.path.join(tempfile.gettempdir(), "atlas_labelling_tool")
+        self.threadPool = QThreadPool.globalInstance()
+        self.reportPool = QThreadPool(self)
+        self.reportPool.setMaxThreadCount(1)
+        # a transcode keeps its thread for the length of the video, so proxies get their own and never hold up the
+        # frame server and seek index workers on the global pool
+        self.proxyPool = QThreadPool(self)
+        self.proxyPool.setMaxThreadCount(1)
+        self.reportJobs = []
+        self.reportCount = 0
+        self.openVideoWorkers = []
+        self.openVideoProgress = None
+        self.openVideoProgressTimer = None
+        self.openVideoState = {}
+        self.rangedDownload = None
+        self.streamAttached = False
+        self.streamBuffering = False
+        self.streamTimer = QTimer(self)
+        self.streamTimer.timeout.connect(self.updateStream)
+        self.frameServer = None
+        self.seekIndex = None
+        self.seekIndexWorker = None
+        self.proxyWorker = None
+        self.proxyCancelled = None
+        self.labelJournal = None
+        self.rulesIndex = None
+        self.queueItem = None
 
         self.model = QStandardItemModel()
 
         self.mediaPlayer = QMediaPlayer(None, QMediaPlayer.VideoSurface)
-        self.tableWidget = QTableWidget()
-        self.tableWidget.cellClicked.connect(self.checkTableFrame)
+        self.labelModel = LabelTableModel(self)
+        self.tableView = QTableView()
+        self.tableView.setModel(self.labelModel)
+        self.tableView.clicked.connect(self.checkTableFrame)
 
         self.videoWidget = QVideoWidget()
+        self.frameView = QLabel()
+        self.frameView.setAlignment(Qt.AlignCenter)
+        self.frameView.setMinimumSize(1, 1)
+        self.frameView.setStyleSheet("background-color: black")
+        self.videoStack = QStackedWidget()
+        self.videoStack.addWidget(self.videoWidget)
+        self.videoStack.addWidget(self.frameView)
         self.frameID = 0
 
         self.repCount = 0
 
-        self.insertBaseRow()
-
         openButton = QPushButton("Open...")
         openButton.clicked.connect(self.openFile)
 
@@ -246,6 +344,15 @@ class Window(QMainWindow):
         self.reportButton = QPushButton("Generate report")
         self.reportButton.clicked.connect(self.generateReport)
 
+        self.cancelReportButton = QPushButton("Cancel reports")
+        self.cancelReportButton.setEnabled(False)
+        self.cancelReportButton.clicked.connect(self.cancelReports)
+
+        self.queuePanel = VideoQueuePanel(self.queuedLabels, self)
+        self.queuePanel.openRequested.connect(self.openQueuedItem)
+        self.queueButton = QPushButton("Queue")
+        self.queueButton.clicked.connect(self.queuePanel.show)
+
         self.startTime = QLineEdit()
         self.startTime.setPlaceholderText("Start Time")
 
@@ -276,6 +383,7 @@ class Window(QMainWindow):
             self.iLabel.activated[str].connect(self.style_choice)
 
             self.rules = QComboBox(self)
+            self.rules.activated[str].connect(self.style_choice)
             self.iLabel.currentIndexChanged.connect(self.update_rules)
             self.orientation.currentIndexChanged.connect(self.update_rules)
         else:
@@ -292,8 +400,6 @@ class Window(QMainWindow):
 
         self.positionSlider = QSlider(Qt.Horizontal)
         self.positionSlider.setRange(0, 100)
-        self.positionSlider.sliderMoved.connect(self.setPosition)
-        self.positionSlider.sliderMoved.connect(self.handleLabel)
         self.positionSlider.setSingleStep(2)
         self.positionSlider.setPageStep(20)
         self.positionSlider.setAttribute(Qt.WA_TranslucentBackground, True)
@@ -301,6 +407,9 @@ class Window(QMainWindow):
         self.errorLabel = QLabel()
         self.errorLabel.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Maximum)
 
+        self.reportStatus = QLabel()
+        self.reportStatus.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Maximum)
+
         # Main plotBox
         plotBox = QHBoxLayout()
 
@@ -317,9 +426,10 @@ class Window(QMainWindow):
 
         # Left Layout{
         layout = QVBoxLayout()
-        layout.addWidget(self.videoWidget, 1)
+        layout.addWidget(self.videoStack, 1)
         layout.addLayout(controlLayout)
         layout.addWidget(self.errorLabel)
+        layout.addWidget(self.reportStatus)
 
         plotBox.addLayout(layout, 1)
         # }
@@ -343,9 +453,11 @@ class Window(QMainWindow):
         feats.addWidget(self.exportToDbButton)
         feats.addWidget(self.importButton)
         feats.addWidget(self.reportButton)
+        feats.addWidget(self.cancelReportButton)
+        feats.addWidget(self.queueButton)
 
         layout2 = QVBoxLayout()
-        layout2.addWidget(self.tableWidget)
+        layout2.addWidget(self.tableView)
         layout2.addLayout(inputFields, 1)
         layout2.addLayout(feats, 2)
         # }
@@ -353,6 +465,8 @@ class Window(QMainWindow):
         plotBox.addLayout(layout2, 2)
 
         wid.setLayout(plotBox)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.queuePanel)
+        self.queuePanel.hide()
 
         self.shortcut = QShortcut(QKeySequence("["), self)
         self.shortcut.activated.connect(self.addStartTime)
@@ -372,6 +486,8 @@ class Window(QMainWindow):
         self.shortcut.activated.connect(self.increase_rep_count)
         self.shortcut = QShortcut(QKeySequence("D"), self)
         self.shortcut.activated.connect(self.decrease_rep_count)
+        self.shortcut = QShortcut(QKeySequence("N"), self)
+        self.shortcut.activated.connect(self.queuePanel.next)
 
         self.shortcut = QShortcut(QKeySequence(Qt.Key_Return), self)
         self.shortcut.activated.connect(self.next)
@@ -390,8 +506,9 @@ class Window(QMainWindow):
 
         self.mediaPlayer.setVideoOutput(self.videoWidget)
         self.mediaPlayer.stateChanged.connect(self.mediaStateChanged)
-        self.mediaPlayer.positionChanged.connect(self.positionChanged)
-        self.mediaPlayer.positionChanged.connect(self.handleLabel)
+        # refreshes the slider and time label at display rate, and seeks while the slider is dragged
+        self.positionUpdates = PositionUpdates(self.positionSlider, self.lbl, self.setPosition, self)
+        self.mediaPlayer.positionChanged.connect(self.positionUpdates.positionChanged)
         self.mediaPlayer.durationChanged.connect(self.durationChanged)
         self.mediaPlayer.error.connect(self.handleError)
 
@@ -409,48 +526,387 @@ class Window(QMainWindow):
             self.userId = int(user_id) if user_id != "" else -1
             self.videoResultId = int(video_result_id) if video_result_id != "" else -1
             self.video_file_path = video_filepath
-            filename = ""
+            self.queueItem = None
+            self.cancelOpenVideo()
 
             if self.video_file_path == "":
-                try:
-                    if full_video_radio_button.isChecked():
-                        filename = get_video_filename_from_api(self.userId, self.videoResultId)
-                    elif annotated_video_radio_button.isChecked():
-                        filename = "annotated_video.mp4"
-
-                    self.video_file_path = download_file_from_s3(self.userId, self.videoResultId, filename)
-                    fps = get_video_fps(self.video_file_path)
-                    self.populateRowsFromApi(self.userId, self.videoResultId, fps)
-                except:
-                    showErrorDialog("Failed to download video from S3. Check that the video exists and try again.")
-
-            self.mediaPlayer.setMedia(QMediaContent(QUrl.fromLocalFile(self.video_file_path)))
-            self.playButton.setEnabled(True)
-
-    def populateRowsFromApi(self, user_id, video_result_id, fps):
-        self.clearTable()
-        labels = get_labels_from_api(user_id, video_result_id)
-        self.colNo = 0
-        for label in labels:
-            self.addValueToCurrentCell(convert_frame_num_to_time(label["start_frame"], fps))
-            self.addValueToCurrentCell(convert_frame_num_to_time(label["end_frame"], fps))
-            self.addValueToCurrentCell(label["exercise"])
-            self.addValueToCurrentCell(label["view"])
-            self.addValueToCurrentCell(str(label["min_reps"]))
-            self.addValueToCurrentCell(str(label["reps"]))
-            self.addValueToCurrentCell(label["rules"])
-
-            is_valid = (
-                str(label["is_valid"])
-                if "is_valid" in label and label["is_valid"] in ["True", "False", "N/A"]
-                else "N/A"
-            )
-
-            self.addValueToCurrentCell(is_valid)
-            self.addValueToCurrentCell(label["reps_to_judge"])
-            self.addValueToCurrentCell(label["notes"])
-            self.colNo = 0
-            self.rowNo += 1
+                full_video = full_video_radio_button.isChecked()
+                self.startOpenVideoFromS3(self.userId, self.videoResultId, full_video)
+                return
+
+            if os.path.isfile(self.video_file_path):
+                # probe once on load so conversions, imports and exports hit the cache
+                get_video_metadata(self.video_file_path)
+            self.setVideo(self.video_file_path)
+
+    def openQueuedItem(self, item):
+        """Opens a video from the queue panel, from disk and with no waiting if it has been prefetched"""
+        self.userId = item.user_id
+        self.videoResultId = item.video_result_id
+        self.queueItem = item
+        self.cancelOpenVideo()
+
+        prefetched = item.prefetched
+        # the S3 cache may have evicted it since
+        if prefetched is None or not os.path.isfile(prefetched.video_file_path):
+            self.startOpenVideoFromS3(item.user_id, item.video_result_id, self.queuePanel.fullVideo.isChecked())
+            return
+        self.setVideo(prefetched.video_file_path)
+        self.populateRows(prefetched.labels, prefetched.fps)
+        item.loaded = True
+
+    def queuedLabels(self, item):
+        """The table to export for a queue item moved on from, None unless it still holds that item's labels"""
+        if item is not self.queueItem or not item.loaded:
+            return None
+        return self.exportLabels()
+
+    def recoverLabels(self):
+        """Offers to restore the table autosaved by a window that crashed, and autosaves every change to the table from
+        now on"""
+        try:
+            journal = LabelJournal()
+            rows, video_file_path = journal.recover()
+            restore = bool(rows or video_file_path) and self.askToRecover(len(rows), video_file_path)
+            if restore:
+                print(f"Recovered {len(rows)} autosaved label rows")
+                self.loadTable(pd.DataFrame(rows, columns=LABEL_COLUMNS))
+                journal.set_video(video_file_path)
+            # attaching deletes the recovered session, so one that wasn't restored isn't offered again
+            journal.attach(self.labelModel)
+        except OSError as e:
+            print(f"Could not autosave labels: {e}")
+            return
+        self.labelJournal = journal
+        if restore and video_file_path and os.path.isfile(video_file_path):
+            self.setVideo(video_file_path)
+
+    def askToRecover(self, row_count, video_file_path):
+        video = os.path.basename(video_file_path) if video_file_path else "no video"
+        answer = QMessageBox.question(
+            self,
+            "Recover labels",
+            f"The annotator didn't close properly last time. Restore its {row_count} autosaved label rows ({video})?",
+        )
+        return answer == QMessageBox.Yes
+
+    def setVideo(self, video_file_path):
+        self.video_file_path = video_file_path
+        if self.labelJournal is not None:
+            self.labelJournal.set_video(video_file_path)
+        self.mediaPlayer.setMedia(QMediaContent(QUrl.fromLocalFile(self.video_file_path)))
+        self.playButton.setEnabled(True)
+        # a streaming video is only decodable once it has finished downloading
+        self.prepareVideo(video_file_path if self.rangedDownload is None else None)
+
+    def prepareVideo(self, video_file_path):
+        """Starts the frame server, seek index and proxy of a video that is fully on disk, or stops them for None"""
+        self.openFrameServer(video_file_path)
+        self.loadSeekIndex(video_file_path)
+        self.loadProxy(video_file_path)
+
+    def loadSeekIndex(self, video_file_path):
+        """Loads or builds the keyframe and frame time index of the video on the thread pool"""
+        self.seekIndex = None
+        if self.seekIndexWorker is not None:
+            self.seekIndexWorker.cancel()
+            self.seekIndexWorker = None
+        if video_file_path is None or not os.path.isfile(video_file_path):
+            return
+
+        self.seekIndexWorker = Worker(get_seek_index, video_file_path)
+        self.seekIndexWorker.signals.result.connect(self.seekIndexLoaded)
+        self.seekIndexWorker.signals.error.connect(self.seekIndexFailed)
+        self.threadPool.start(self.seekIndexWorker)
+
+    def seekIndexLoaded(self, index):
+        if self.seekIndexWorker is None or self.sender() is not self.seekIndexWorker.signals:
+            return
+        self.seekIndexWorker = None
+        self.seekIndex = index
+        # a frame server decoding the proxy has the proxy's keyframes
+        if self.frameServer is not None and self.frameServer.video_path == self.video_file_path:
+            self.frameServer.seek_index = index
+
+    def seekIndexFailed(self, error):
+        if self.seekIndexWorker is None or self.sender() is not self.seekIndexWorker.signals:
+            return
+        self.seekIndexWorker = None
+        # seeking still works without the index, just by the fps
+        print("Failed to build the seek index\n" + error)
+
+    def loadProxy(self, video_file_path):
+        """Transcodes or loads a low resolution proxy of the video on the proxy pool, to play in its place"""
+        self.cancelProxy()
+        if not self.use_proxy or video_file_path is None or not os.path.isfile(video_file_path):
+            return
+
+        self.proxyCancelled = threading.Event()
+        self.proxyWorker = Worker(self.prepareProxy, video_file_path, self.proxyCancelled)
+        self.proxyWorker.signals.result.connect(self.proxyLoaded)
+        self.proxyWorker.signals.error.connect(self.proxyFailed)
+        self.proxyPool.start(self.proxyWorker)
+
+    def cancelProxy(self):
+        """Stops the proxy being transcoded, if any, so the next one starts straight away"""
+        if self.proxyWorker is not None:
+            self.proxyWorker.cancel()
+            self.proxyCancelled.set()
+            self.proxyWorker = None
+            self.proxyCancelled = None
+
+    def prepareProxy(self, video_file_path, cancelled):
+        proxy_path = get_proxy(video_file_path, cancelled=cancelled)
+        return proxy_path, get_seek_index(proxy_path)
+
+    def proxyLoaded(self, result):
+        if self.proxyWorker is None or self.sender() is not self.proxyWorker.signals:
+            return
+        self.proxyWorker = None
+        self.proxyCancelled = None
+        proxy_path, proxy_index = result
+        if proxy_path == self.video_file_path:
+            return
+
+        # only the player and the frame server switch to the proxy, it has the same frames at the same times so
+        # positions, frame numbers and exported labels all stay on the source's timeline
+        position = self.mediaPlayer.position()
+        playing = self.mediaPlayer.state() == QMediaPlayer.PlayingState
+        self.mediaPlayer.setMedia(QMediaContent(QUrl.fromLocalFile(proxy_path)))
+        self.mediaPlayer.setPosition(position)
+        if playing:
+            self.mediaPlayer.play()
+        self.openFrameServer(proxy_path)
+        if self.frameServer is not None:
+            self.frameServer.seek_index = proxy_index
+
+    def proxyFailed(self, error):
+        if self.proxyWorker is None or self.sender() is not self.proxyWorker.signals:
+            return
+        self.proxyWorker = None
+        self.proxyCancelled = None
+        print("Playing the source video, its proxy failed\n" + error)
+
+    def openFrameServer(self, video_file_path):
+        self.closeFrameServer()
+        if not self.frame_cache_mb or video_file_path is None:
+            return
+        try:
+            self.frameServer = FrameServer(video_file_path, max_mb=self.frame_cache_mb)
+        except IOError as e:
+            print(f"Frame server disabled: {e}")
+
+    def closeFrameServer(self):
+        self.videoStack.setCurrentWidget(self.videoWidget)
+        if self.frameServer is not None:
+            log.debug(f"Frame server for {self.frameServer.video_path}: {self.frameServer.format_stats()}")
+            self.frameServer.close()
+            self.frameServer = None
+
+    def showFrame(self, frame_num):
+        """Draws a frame from the frame server over the video while paused, so steps don't wait on the player's seek"""
+        if self.frameServer is None or self.mediaPlayer.state() == QMediaPlayer.PlayingState:
+            return
+        frame = self.frameServer.get(frame_num)
+        self.frameServer.set_playhead(frame_num)
+        if frame is None:
+            return
+        height, width, _ = frame.shape
+        image = QImage(frame.data, width, height, frame.strides[0], QImage.Format_RGB888)
+        pixmap = QPixmap.fromImage(image).scaled(self.frameView.size(), Qt.KeepAspectRatio, Qt.FastTransformation)
+        self.frameView.setPixmap(pixmap)
+        self.videoStack.setCurrentWidget(self.frameView)
+
+    def startOpenVideoFromS3(self, user_id, video_result_id, full_video):
+        """Downloads the video and fetches its labels on the thread pool, in parallel"""
+        self.prepareVideo(None)
+        self.openVideoState = {"filename": "", "video": None, "labels": None, "fps": None, "populated": False, "pending": 2}
+
+        self.openVideoProgress = QProgressDialog("Downloading video...", "Cancel", 0, 0, self)
+        self.openVideoProgress.setWindowTitle("Opening video")
+        self.openVideoProgress.setMinimumDuration(0)
+        self.openVideoProgress.canceled.connect(self.cancelOpenVideo)
+        self.openVideoProgress.show()
+
+        self.openVideoProgressTimer = QTimer(self)
+        self.openVideoProgressTimer.timeout.connect(self.updateOpenVideoProgress)
+        self.openVideoProgressTimer.start(250)
+
+        videoWorker = Worker(self.downloadVideo, self.openVideoState, user_id, video_result_id, full_video)
+        videoWorker.signals.result.connect(self.videoDownloaded)
+        videoWorker.signals.error.connect(self.videoDownloadFailed)
+        videoWorker.signals.partial.connect(self.videoStreamStarted)
+        self.openVideoState["signals"] = videoWorker.signals
+        labelsWorker = Worker(get_labels_from_api, user_id, video_result_id)
+        labelsWorker.signals.result.connect(self.labelsFetched)
+        labelsWorker.signals.error.connect(self.labelsFetchFailed)
+
+        self.openVideoWorkers = [videoWorker, labelsWorker]
+        for worker in self.openVideoWorkers:
+            self.threadPool.start(worker)
+
+    def downloadVideo(self, state, user_id, video_result_id, full_video):
+        filename = get_video_filename_from_api(user_id, video_result_id) if full_video else "annotated_video.mp4"
+        state["filename"] = filename
+        if self.stream_video:
+            on_started = state["signals"].partial.emit
+            video_file_path = stream_file_from_s3(user_id, video_result_id, filename, on_started=on_started)
+        else:
+            video_file_path = download_file_from_s3(user_id, video_result_id, filename)
+        return video_file_path, get_video_fps(video_file_path)
+
+    def updateOpenVideoProgress(self):
+        filename = self.openVideoState["filename"]
+        if filename:
+            if self.rangedDownload is not None:
+                downloaded = self.rangedDownload.downloaded_bytes()
+            else:
+                downloaded = get_s3_download_progress(self.userId, self.videoResultId, filename)
+            self.openVideoProgress.setLabelText(f"Downloading {filename}... {downloaded / 1024**2:.0f} MB")
+
+    def isCurrentOpenVideoWorker(self):
+        # a result can already be queued when its worker is cancelled
+        return any(self.sender() is worker.signals for worker in self.openVideoWorkers)
+
+    def videoDownloaded(self, result):
+        if not self.isCurrentOpenVideoWorker():
+            return
+        self.openVideoState["video"] = result
+        self.openVideoState["fps"] = result[1]
+        if self.streamAttached:
+            # the player already has the file open where it was downloaded
+            self.video_file_path = result[0]
+            if self.labelJournal is not None:
+                self.labelJournal.set_video(result[0])
+            self.prepareVideo(result[0])
+        else:
+            self.stopStream()
+            self.setVideo(result[0])
+        self.openVideoStepFinished()
+
+    def videoDownloadFailed(self, error):
+        if not self.isCurrentOpenVideoWorker():
+            return
+        self.stopStream()
+        self.openVideoStepFinished()
+        showErrorDialog("Failed to download video from S3. Check that the video exists and try again.")
+
+    def labelsFetched(self, labels):
+        if not self.isCurrentOpenVideoWorker():
+            return
+        self.openVideoState["labels"] = labels
+        self.populateOpenVideoRows()
+        self.openVideoStepFinished()
+
+    def labelsFetchFailed(self, error):
+        if not self.isCurrentOpenVideoWorker():
+            return
+        self.openVideoStepFinished()
+        showErrorDialog("Failed to fetch labels from the API.\n\n" + error)
+
+    def openVideoStepFinished(self):
+        self.openVideoState["pending"] -= 1
+        if self.openVideoState["pending"] > 0:
+            if self.openVideoProgress is not None:
+                self.openVideoProgress.setLabelText("Fetching labels...")
+            return
+
+        self.finishOpenVideoProgress()
+        self.populateOpenVideoRows()
+
+    def populateOpenVideoRows(self):
+        state = self.openVideoState
+        if state["labels"] is not None and state["fps"] is not None and not state["populated"]:
+            state["populated"] = True
+            self.populateRows(state["labels"], state["fps"])
+            if self.queueItem is not None:
+                self.queueItem.loaded = True
+
+    def videoStreamStarted(self, download):
+        if not self.isCurrentOpenVideoWorker():
+            download.cancel()
+            return
+        self.rangedDownload = download
+        self.streamAttached = False
+        self.streamBuffering = False
+        self.streamTimer.start(250)
+
+    def updateStream(self):
+        """Attaches a streaming video once playable, keeps the download ahead of the playhead and buffers if it isn't"""
+        download = self.rangedDownload
+        if download is None:
+            self.streamTimer.stop()
+            return
+
+        if not self.streamAttached:
+            if download.is_ready():
+                self.streamAttached = True
+                self.setVideo(download.local_fp)
+                self.finishOpenVideoProgress()
+                # probed once, the file changes with every chunk streamed in so its metadata cache key keeps missing
+                self.openVideoState["streamMetadata"] = (download.local_fp, get_video_metadata(download.local_fp))
+                self.openVideoState["fps"] = self.openVideoState["streamMetadata"][1].fps
+                self.populateOpenVideoRows()
+            return
+
+        duration = self.mediaPlayer.duration()
+        if duration > 0:
+            fraction = self.mediaPlayer.position() / duration
+            download.focus_fraction(fraction)
+            offset = download.media_offset(fraction)
+            available = download.is_available(offset, offset + download.chunk_size)
+            if not available and self.mediaPlayer.state() == QMediaPlayer.PlayingState:
+                self.mediaPlayer.pause()
+                self.streamBuffering = True
+                self.errorLabel.setText("Buffering...")
+                self.errorLabel.setStyleSheet("")
+            elif available and self.streamBuffering:
+                self.streamBuffering = False
+                self.errorLabel.clear()
+                self.mediaPlayer.play()
+
+        if download.is_complete():
+            self.rangedDownload = None
+            self.streamTimer.stop()
+
+    def cancelOpenVideo(self):
+        # plain downloads that are already running finish into the S3 cache, their results are dropped
+        for worker in self.openVideoWorkers:
+            worker.cancel()
+        self.openVideoWorkers = []
+        self.finishOpenVideoProgress()
+        self.stopStream()
+
+    def stopStream(self):
+        """Cancels the ranged download of a streaming video, if any, and stops following it"""
+        if self.rangedDownload is not None:
+            self.rangedDownload.cancel()
+            self.rangedDownload = None
+        self.streamTimer.stop()
+        self.streamAttached = False
+
+    def finishOpenVideoProgress(self):
+        if self.openVideoProgressTimer is not None:
+            self.openVideoProgressTimer.stop()
+            self.openVideoProgressTimer = None
+        if self.openVideoProgress is not None:
+            self.openVideoProgress.canceled.disconnect(self.cancelOpenVideo)
+            self.openVideoProgress.close()
+            self.openVideoProgress = None
+
+    def populateRows(self, labels, fps):
+        self.loadTable(api_labels_to_table(labels, fps))
+
+    def loadTable(self, table_df):
+        """Replaces the table in a single model reset, with sorting and repaints held off until it is loaded"""
+        sorting = self.tableView.isSortingEnabled()
+        self.tableView.setSortingEnabled(False)
+        self.tableView.setUpdatesEnabled(False)
+        try:
+            self.labelModel.setRows(table_df)
+        finally:
+            self.tableView.setUpdatesEnabled(True)
+            self.tableView.setSortingEnabled(sorting)
 
     def play(self):
         if self.mediaPlayer.state() == QMediaPlayer.PlayingState:
@@ -458,77 +914,98 @@ class Window(QMainWindow):
         else:
             self.mediaPlayer.play()
 
-    def _play_video(self):
-        if self.is_playing_video and self.video_fps:
-            frame_idx = min(self.render_frame_idx + 1, self.frame_count)
-            print(frame_idx)
-
-            if frame_idx == self.frame_count:
-                self.on_play_video_clicked()
-            else:
-                self.target_frame_idx = frame_idx
-
     def style_choice(self, text):
         self.dropDownName = text
         QApplication.setStyle(QStyleFactory.create(text))
 
     def addStartTime(self):
-        self.startTime.setText(self.lbl.text())
+        self.startTime.setText(self.currentFrameTime())
 
     def addEndTime(self):
-        self.endTime.setText(self.lbl.text())
+        self.endTime.setText(self.currentFrameTime())
+
+    def videoMetadata(self):
+        stream_metadata = self.openVideoState.get("streamMetadata")
+        if stream_metadata is not None and stream_metadata[0] == self.video_file_path:
+            return stream_metadata[1]
+        if self.video_file_path and os.path.isfile(self.video_file_path):
+            return get_video_metadata(self.video_file_path)
+        return None
+
+    def positionToFrame(self, position):
+        if self.seekIndex is not None:
+            return self.seekIndex.position_to_frame(position)
+        return int(position_to_frame_num(position, self.videoMetadata().fps))
+
+    def frameToPosition(self, frame_num):
+        if self.seekIndex is not None:
+            # the index knows each frame's real display time, which drifts from frame / fps in variable frame rate videos
+            return self.seekIndex.frame_to_position(frame_num)
+        return int(frame_num_to_position(frame_num, self.videoMetadata().fps))
+
+    def currentFrame(self):
+        return self.positionToFrame(self.mediaPlayer.position())
+
+    def currentFrameTime(self):
+        """The playhead as a H:MM:SS.mmm time that converts back to the exact frame on export"""
+        if self.videoMetadata() is None:
+            return self.lbl.text()
+        return frame_nums_to_precise_times([self.currentFrame()], self.videoMetadata().fps)[0]
+
+    def seekToFrame(self, frame_num):
+        frame_count = len(self.seekIndex) if self.seekIndex is not None else self.videoMetadata().frame_count
+        frame_num = max(0, frame_num)
+        if frame_count > 0:
+            frame_num = min(frame_num, frame_count - 1)
+        self.mediaPlayer.setPosition(self.frameToPosition(frame_num))
+        self.showFrame(frame_num)
+
+    def stepFrames(self, frames):
+        if self.videoMetadata() is None:
+            # without the video's fps fall back to ~60ms per frame
+            self.mediaPlayer.setPosition(self.mediaPlayer.position() + frames * 60)
+            return
+        self.seekToFrame(self.currentFrame() + frames)
 
     def addRepCount(self):
         self.repCount.setText(self.lbl.text())
 
-    def adjustableAddValueToCurrentCell(self, column_row):
+    def adjustableValue(self, column_row):
         if self.classes_label_path:
-            self.addValueToCurrentCell(column_row.currentText())
-        else:
-            self.addValueToCurrentCell(column_row.text())
+            return column_row.currentText()
+        return column_row.text()
 
     def next(self):
-        self.addValueToCurrentCell(self.startTime.text())
-        self.addValueToCurrentCell(self.endTime.text())
-        self.adjustableAddValueToCurrentCell(self.iLabel)
-        self.addValueToCurrentCell(self.orientation.currentText())
-        self.addValueToCurrentCell(self.minReps.text())
-        self.addValueToCurrentCell(self.maxReps.text())
-        self.adjustableAddValueToCurrentCell(self.rules)
-        self.addValueToCurrentCell(self.isValid.currentText())
-        self.addValueToCurrentCell(self.repsToJudge.text())
-        self.colNo = 0
-        self.rowNo += 1
+        self.labelModel.appendRow(
+            [
+                self.startTime.text(),
+                self.endTime.text(),
+                self.adjustableValue(self.iLabel),
+                self.orientation.currentText(),
+                self.minReps.text(),
+                self.maxReps.text(),
+                self.adjustableValue(self.rules),
+                self.isValid.currentText(),
+                self.repsToJudge.text(),
+            ]
+        )
+        self.tableView.scrollToBottom()
         self.repCount = 0
 
     def delete(self):
-        index_list = []
-        for model_index in self.tableWidget.selectionModel().selectedRows():
-            index = QtCore.QPersistentModelIndex(model_index)
-            index_list.append(index)
-
-        self.rowNo = self.rowNo - len(index_list)
-
-        for index in index_list:
-            self.tableWidget.removeRow(index.row())
+        rows = [model_index.row() for model_index in self.tableView.selectionModel().selectedRows()]
+        self.labelModel.removeRowsAt(rows)
 
     def clearTable(self):
-        while self.tableWidget.rowCount() > 0:
-            self.tableWidget.removeRow(0)
-        self.insertBaseRow()
+        self.labelModel.clear()
 
     def copyRow(self):
-        columnCount = self.tableWidget.columnCount()
-        for j in range(columnCount):
-            if not self.tableWidget.item(self.rowNo - 1, j) is None:
-                self.tableWidget.setItem(
-                    self.rowNo, j, QTableWidgetItem(self.tableWidget.item(self.rowNo - 1, j).text())
-                )
-        self.rowNo += 1
+        rowCount = self.labelModel.rowCount()
+        if rowCount > 0:
+            self.labelModel.appendRow(self.labelModel.rowValues(rowCount - 1))
 
     def addRow(self):
-        rowCount = self.tableWidget.rowCount()
-        self.tableWidget.insertRow(rowCount)
+        self.labelModel.appendRow([])
 
     def increase_playback(self):
         original_position = self.mediaPlayer.position()
@@ -554,27 +1031,12 @@ class Window(QMainWindow):
             self.repCount -= 1
         self.update_rep_count()
 
-    def saveToCsv(self, filepath):
-        with open(filepath, "w") as stream:
-            print("saving", filepath)
-            writer = csv.writer(stream)
-            for row in range(self.tableWidget.rowCount()):
-                rowdata = []
-                for column in range(self.tableWidget.columnCount()):
-                    item = self.tableWidget.item(row, column)
-                    if item is not None and item != "":
-                        rowdata.append(item.text())
-                    else:
-                        break
-                writer.writerow(rowdata)
+    def exportLabels(self):
+        return build_labels_df(self.labelModel.toDataFrame(), self.video_file_path)
 
-        labels_df = pd.read_csv(filepath)
-        if self.video_file_path:
-            labels_df = convert_time_to_frame_num_df(labels_df, self.video_file_path)
-            labels_df = labels_df.drop(["start_time", "end_time"], axis=1)
-
-        labels_df = add_labels_column(labels_df)
-        labels_df = add_is_valid_values_to_df(labels_df)
+    def saveToCsv(self, filepath):
+        print("saving", filepath)
+        labels_df = self.exportLabels()
         labels_df.to_csv(filepath)
         return labels_df
 
@@ -587,125 +1049,125 @@ class Window(QMainWindow):
         if path:
             self.saveToCsv(path)
 
+    def askForIds(self):
+        dialog = ExportDBInputDialog()
+        if not dialog.exec():
+            return False
+
+        uid, vrid = dialog.getInputs()
+        if uid == "" or vrid == "":
+            showDialog("Both user ID and video result ID are required.", success=False)
+            return False
+
+        self.userId = int(uid)
+        self.videoResultId = int(vrid)
+        return True
+
     def exportDb(self):
         if self.userId < 0 or self.videoResultId < 0:
-            dialog = ExportDBInputDialog()
-            if dialog.exec():
-                uid, vrid = dialog.getInputs()
-                if uid == "" or vrid == "":
-                    showDialog("Both user ID and video result ID are required.", success=False)
-                    return
-
-                self.userId = int(uid)
-                self.videoResultId = int(vrid)
+            if not self.askForIds():
+                return
         self.exportAndSendLabelsToDb(self.userId, self.videoResultId)
 
     def exportAndSendLabelsToDb(self, user_id, video_result_id):
-        tmp_dir = os.path.join(self.tmpDir, str(video_result_id))
-        temp_csv_fp = os.path.join(tmp_dir, "full_video_labels.csv")
-        os.makedirs(tmp_dir, exist_ok=True)
-
-        labels_df = self.saveToCsv(temp_csv_fp)
-        errors = send_labels_to_api(user_id, video_result_id, labels_df)
+        labels_df = self.exportLabels()
+        errors = sync_labels_to_api(user_id, video_result_id, labels_df)
         if errors != "":
             showDialog(errors, success=False)
         else:
             showDialog("Labels uploaded successfully!")
 
-    def addValueToCurrentCell(self, value):
-        self.tableWidget.setItem(self.rowNo, self.colNo, QTableWidgetItem(value))
-        self.colNo += 1
-
     def importCSV(self):
         path, _ = QFileDialog.getOpenFileName(self, "Save File", QDir.homePath(), "CSV Files(*.csv *.txt)")
 
         if path:
-            self.clearTable()
             label_df = pd.read_csv(path)
-            fps = get_video_fps(self.video_file_path)
-            self.colNo = 0
-            for _, label_row in label_df.iterrows():
-                self.addValueToCurrentCell(convert_frame_num_to_time(int(label_row["start_frame"]), fps))
-                self.addValueToCurrentCell(convert_frame_num_to_time(int(label_row["end_frame"]), fps))
-                self.addValueToCurrentCell(str(label_row["exercise"]))
-                self.addValueToCurrentCell(str(label_row["orientation"]))
-                self.addValueToCurrentCell(str(label_row["min_reps"]))
-                self.addValueToCurrentCell(str(label_row["reps"]))
-                self.addValueToCurrentCell(str(label_row["rule"]))
-
-                is_valid = (
-                    str(label_row["is_valid"])
-                    if "is_valid" in label_df.columns and label_row["is_valid"] in [True, False, "N/A"]
-                    else "N/A"
-                )
-                self.addValueToCurrentCell(is_valid)
-
-                self.addValueToCurrentCell(str(label_row["reps_to_judge"]))
-                self.addValueToCurrentCell(str(label_row["notes"]))
-                self.colNo = 0
-                self.rowNo += 1
+            fps = self.videoMetadata().fps
+            self.loadTable(csv_labels_to_table(label_df, fps))
 
     def generateReport(self):
-        shutil.rmtree(self.tmpDir, ignore_errors=True)
+        """Queues a report for the current table. Reports run one at a time on a background thread"""
+        if (self.userId < 0 or self.videoResultId < 0) and not self.askForIds():
+            return
+
+        self.reportCount += 1
+        # tmpDir is shared with the other windows, so each report gets a directory no one else can pick
         os.makedirs(self.tmpDir, exist_ok=True)
-        self.reportButton.setDisabled(True)
-        try:
-            if self.userId < 0 or self.videoResultId < 0:
-                self.exportDb()
-            else:
-                self.exportAndSendLabelsToDb(self.userId, self.videoResultId)
-
-            tmp_dir = os.path.join(self.tmpDir, str(self.videoResultId))
-            self.setupGenerateReport(self.userId, self.videoResultId, tmp_dir)
-
-            pdf_fp = generate_report(
-                self.tmpDir, str(self.videoResultId), self.full_video_filename, output_pdf_dir=self.tmpDir
-            )
-            upload_file_to_s3(self.userId, self.videoResultId, pdf_fp)
-            showDialog(f"Report generated at: {pdf_fp} and uploaded to S3!")
-        except Exception:
-            showDialog(str(traceback.format_exc()), success=False)
-        finally:
-            self.reportButton.setDisabled(False)
-
-    def setupGenerateReport(self, user_id, video_result_id, output_dir):
-        self.full_video_filename = get_video_filename_from_api(user_id, video_result_id)
-        video_path = os.path.join(output_dir, self.full_video_filename)
-        video_frames_path = os.path.join(output_dir, "full_video_frames")
-        download_file_from_s3(user_id, video_result_id, self.full_video_filename, video_path)
-        download_file_from_s3(
-            user_id, video_result_id, "pose_results.json", os.path.join(output_dir, "pose_results.json")
+        work_dir = tempfile.mkdtemp(dir=self.tmpDir, prefix="report_")
+        os.makedirs(os.path.join(work_dir, str(self.videoResultId)))
+
+        # snapshot the table now so annotation can carry on while the report runs. generate_report reads the labels
+        # from this file
+        labels_df = self.saveToCsv(os.path.join(work_dir, str(self.videoResultId), "full_video_labels.csv"))
+        job = ReportJob(
+            self.reportCount, self.userId, self.videoResultId, labels_df, work_dir, self.report_labelled_frames
         )
 
-        vid_to_frames(video_path, video_frames_path)
-
-    def insertBaseRow(self):
-        self.tableWidget.setColumnCount(10)  # , Start Time, End Time, TimeStamp
-        self.tableWidget.setRowCount(500)
-        self.rowNo = 1
-        self.colNo = 0
-        self.tableWidget.setItem(0, 0, QTableWidgetItem("start_time"))
-        self.tableWidget.setItem(0, 1, QTableWidgetItem("end_time"))
-        self.tableWidget.setItem(0, 2, QTableWidgetItem("exercise"))
-        self.tableWidget.setItem(0, 3, QTableWidgetItem("orientation"))
-        self.tableWidget.setItem(0, 4, QTableWidgetItem("min_reps"))
-        self.tableWidget.setItem(0, 5, QTableWidgetItem("reps"))
-        self.tableWidget.setItem(0, 6, QTableWidgetItem("rule"))
-        self.tableWidget.setItem(0, 7, QTableWidgetItem("is_valid"))
-        self.tableWidget.setItem(0, 8, QTableWidgetItem("reps_to_judge"))
-        self.tableWidget.setItem(0, 9, QTableWidgetItem("notes"))
-
-    def checkTableFrame(self, row, column):
-        if (row > 0) and (column < 2):
-            item = self.tableWidget.item(row, column)
-            if item != (None and ""):
+        worker = Worker(job.run)
+        worker.kwargs["on_stage"] = worker.signals.progress.emit
+        worker.signals.progress.connect(self.reportStageStarted)
+        worker.signals.result.connect(self.reportFinished)
+        worker.signals.error.connect(self.reportFailed)
+        self.reportJobs.append((worker.signals, job))
+        self.reportPool.start(worker)
+        self.updateReportStatus()
+
+    def reportJobForSender(self):
+        for signals, job in self.reportJobs:
+            if self.sender() is signals:
+                return job
+
+    def reportStageStarted(self, stage):
+        self.updateReportStatus()
+
+    def reportFinished(self, result):
+        job = self.reportJobForSender()
+        self.removeReportJob(job)
+        pdf_fp, label_errors = result
+        if label_errors != "":
+            showDialog(label_errors, success=False)
+        showDialog(f"Report generated at: {pdf_fp} and uploaded to S3!\n\n{job.format_timings()}")
+
+    def reportFailed(self, error):
+        job = self.reportJobForSender()
+        self.removeReportJob(job)
+        if not job.cancelled.is_set():
+            showDialog(error, success=False)
+
+    def removeReportJob(self, job):
+        self.reportJobs = [(signals, queued_job) for signals, queued_job in self.reportJobs if queued_job is not job]
+        self.updateReportStatus()
+
+    def cancelReports(self):
+        for _, job in self.reportJobs:
+            job.cancel()
+        self.updateReportStatus()
+
+    def updateReportStatus(self):
+        self.cancelReportButton.setEnabled(len(self.reportJobs) > 0)
+        if not self.reportJobs:
+            self.reportStatus.clear()
+            return
+
+        job = self.reportJobs[0][1]
+        status = f"Report for video result {job.video_result_id}: {job.current_stage}"
+        if job.cancelled.is_set():
+            status += " (cancelling)"
+        if len(self.reportJobs) > 1:
+            status += f", {len(self.reportJobs) - 1} more queued"
+        self.reportStatus.setText(status)
+
+    def checkTableFrame(self, index):
+        if index.column() < 2:
+            text = index.data()
+            if text:
                 try:
-                    itemFrame = item.text()
-                    itemFrame = itemFrame.split(":")
-                    frameTime = int(itemFrame[2]) + int(itemFrame[1]) * 60 + int(itemFrame[0]) * 3600
-                    elblFrames = self.elbl.text().split(":")
-                    elblFrameTime = int(elblFrames[2]) + int(elblFrames[1]) * 60 + int(elblFrames[0]) * 3600
-                    self.mediaPlayer.setPosition(frameTime * 1000 + 1 * 60)
+                    metadata = self.videoMetadata()
+                    if metadata is not None:
+                        self.seekToFrame(int(times_to_frame_nums([text], metadata.fps)[0]))
+                    else:
+                        frameTime = times_to_seconds([text])[0]
+                        self.mediaPlayer.setPosition(int(frameTime * 1000) + 1 * 60)
                 except:
                     self.errorLabel.setText("Some Video Error - Please Recheck Video Imported!")
                     self.errorLabel.setStyleSheet("color: red")
@@ -713,20 +1175,23 @@ class Window(QMainWindow):
     def mediaStateChanged(self, state):
         if self.mediaPlayer.state() == QMediaPlayer.PlayingState:
             self.playButton.setIcon(self.style().standardIcon(QStyle.SP_MediaPause))
+            self.videoStack.setCurrentWidget(self.videoWidget)
         else:
             self.playButton.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
-
-    def positionChanged(self, position):
-        self.positionSlider.setValue(position)
+            if self.frameServer is not None and self.videoMetadata() is not None:
+                # start decoding around where playback stopped before the first step
+                self.frameServer.set_playhead(self.currentFrame())
 
     def durationChanged(self, duration):
         self.positionSlider.setRange(0, duration)
-        mtime = QTime(0, 0, 0, 0)
-        mtime = mtime.addMSecs(self.mediaPlayer.duration())
-        self.elbl.setText(mtime.toString())
+        self.elbl.setText(format_position(self.mediaPlayer.duration() // 1000))
 
     def setPosition(self, position):
         self.mediaPlayer.setPosition(position)
+        if self.frameServer is not None:
+            self.showFrame(self.positionToFrame(position))
+        if self.rangedDownload is not None:
+            self.updateStream()
 
     def handleError(self):
         self.playButton.setEnabled(False)
@@ -734,16 +1199,16 @@ class Window(QMainWindow):
         self.errorLabel.setStyleSheet("color: red")
 
     def forwardSlider(self):
-        self.mediaPlayer.setPosition(self.mediaPlayer.position() + 1 * 60)
+        self.stepFrames(1)
 
     def forwardSlider10(self):
-        self.mediaPlayer.setPosition(self.mediaPlayer.position() + 10 * 60)
+        self.stepFrames(10)
 
     def backSlider(self):
-        self.mediaPlayer.setPosition(self.mediaPlayer.position() - 1 * 60)
+        self.stepFrames(-1)
 
     def backSlider10(self):
-        self.mediaPlayer.setPosition(self.mediaPlayer.position() - 10 * 60)
+        self.stepFrames(-10)
 
     def volumeUp(self):
         self.mediaPlayer.setVolume(self.mediaPlayer.volume() + 10)
@@ -759,13 +1224,6 @@ class Window(QMainWindow):
         else:
             event.ignore()
 
-    ##################### update Label ##################################
-    def handleLabel(self):
-        self.lbl.clear()
-        mtime = QTime(0, 0, 0, 0)
-        self.time = mtime.addMSecs(self.mediaPlayer.position())
-        self.lbl.setText(self.time.toString())
-
     def dropEvent(self, event):
         f = str(event.mimeData().urls()[0].toLocalFile())
         self.loadFilm(f)
@@ -776,22 +1234,38 @@ class Window(QMainWindow):
     def clickExit(self):
         sys.exit()
 
+    def closeEvent(self, event):
+        log.debug(f"Playback UI: {self.positionUpdates.formatStats()}")
+        # only loaded once the API has been used, importing it here would load requests for nothing
+        if "api_sessions" in sys.modules:
+            from api_sessions import format_api_session_stats
+
+            log.debug(f"API sessions:\n{format_api_session_stats()}")
+        # closing waits for the proxy pool, which would otherwise sit out the rest of a transcode
+        self.cancelProxy()
+        if self.labelJournal is not None:
+            # only the sessions of windows that crashed are recovered
+            self.labelJournal.discard()
+            self.labelJournal = None
+        super().closeEvent(event)
+
     def update_playback_label(self):
         self.playbackIndicator.clear()
         self.playbackIndicator.setText("X" + str(self.mediaPlayer.playbackRate()))
 
     def update_rules(self):
-        exercise, orientation = self.iLabel.currentText().strip(), self.orientation.currentText().strip()
-
-        self.rules.clear()
-
-        if exercise in form_threshold_dict and orientation in form_threshold_dict[exercise]:
-            rules_list = list(form_threshold_dict[exercise][orientation].keys())
-            for rule in rules_list:
-                self.rules.addItem(rule.strip())
-
-        self.rules.addItem("N/A")
-        self.rules.activated[str].connect(self.style_choice)
+        if self.rulesIndex is None:
+            # built on the first rule lookup rather than at startup
+            from atlas_utils.evaluation_framework.report_generation.form_error.calculate_form_error import form_threshold_dict
+
+            exercises = [self.iLabel.itemText(i) for i in range(self.iLabel.count())]
+            orientations = [self.orientation.itemText(i) for i in range(self.orientation.count())]
+            self.rulesIndex = RulesIndex(exercises, orientations, form_threshold_dict, self)
+            self.rules.setModel(self.rulesIndex)
+
+        rulesRoot = self.rulesIndex.rulesRoot(self.iLabel.currentText(), self.orientation.currentText())
+        self.rules.setRootModelIndex(rulesRoot)
+        self.rules.setCurrentIndex(0)
 
     def update_rep_count(self):
         self.maxReps.setText(str(self.repCount))
@@ -0,0 +1,108 @@
+from functools import lru_cache
+
+from PyQt5.QtCore import QObject, QTimer
+
+
+# one refresh of the slider and time label per frame of a 60Hz display, however often the position changes
+UI_REFRESH_MS = 16
+# dragging the slider seeks at most this often, and always to where it is let go
+DRAG_SEEK_MS = 50
+
+
+@lru_cache(maxsize=4096)
+def format_position(seconds):
+    """HH:MM:SS, as QTime.toString formats a position"""
+    return f"{seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class PositionUpdates(QObject):
+    """Coalesces player position updates into timer-driven refreshes of the slider and time label, and slider drags
+    into throttled seeks followed by an exact seek on release, counting the callbacks that saves"""
+
+    def __init__(self, slider, label, seek, parent=None):
+        super().__init__(parent)
+        self.slider = slider
+        self.label = label
+        self.seek = seek
+        self.position = 0
+        self.pendingSeek = None
+        self.lastSeek = None
+        self.updates = 0
+        self.refreshes = 0
+        self.moves = 0
+        self.seeks = 0
+
+        self.refreshTimer = QTimer(self)
+        self.refreshTimer.setSingleShot(True)
+        self.refreshTimer.setInterval(UI_REFRESH_MS)
+        self.refreshTimer.timeout.connect(self.refresh)
+        self.seekTimer = QTimer(self)
+        self.seekTimer.setSingleShot(True)
+        self.seekTimer.setInterval(DRAG_SEEK_MS)
+        self.seekTimer.timeout.connect(self.seekPending)
+
+        slider.sliderMoved.connect(self.sliderMoved)
+        slider.sliderReleased.connect(self.sliderReleased)
+
+    def positionChanged(self, position):
+        self.updates += 1
+        self.position = position
+        self.scheduleRefresh()
+
+    def scheduleRefresh(self):
+        # updates until the timer fires only change what it shows
+        if not self.refreshTimer.isActive():
+            self.refreshTimer.start()
+
+    def refresh(self):
+        self.refreshes += 1
+        # the player lags behind a drag, moving the handle back to it would fight the user
+        if not self.slider.isSliderDown():
+            self.slider.setValue(self.position)
+        text = format_position(self.position // 1000)
+        if text != self.label.text():
+            self.label.setText(text)
+
+    def sliderMoved(self, position):
+        self.moves += 1
+        self.position = position
+        self.scheduleRefresh()
+        if self.seekTimer.isActive():
+            self.pendingSeek = position
+        else:
+            self.seekTo(position)
+
+    def seekPending(self):
+        if self.pendingSeek is not None:
+            self.seekTo(self.pendingSeek)
+
+    def sliderReleased(self):
+        self.seekTimer.stop()
+        self.pendingSeek = None
+        if self.slider.value() != self.lastSeek:
+            self.seekTo(self.slider.value())
+
+    def seekTo(self, position):
+        self.seeks += 1
+        self.lastSeek = position
+        self.pendingSeek = None
+        self.seekTimer.start()
+        self.seek(position)
+
+    def stats(self):
+        """saved counts the slider, label and seek callbacks that would have run had every update and move gone
+        straight to the two slots each was connected to, less the refreshes and seeks that ran instead"""
+        return {
+            "updates": self.updates,
+            "refreshes": self.refreshes,
+            "moves": self.moves,
+            "seeks": self.seeks,
+            "saved": 2 * (self.updates + self.moves) - self.refreshes - self.seeks,
+        }
+
+    def formatStats(self):
+        stats = self.stats()
+        return (
+            f"{stats['updates']} position updates in {stats['refreshes']} refreshes, {stats['moves']} slider moves in "
+            f"{stats['seeks']} seeks, {stats['saved']} callbacks saved"
+        )
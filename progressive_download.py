@@ -0,0 +1,188 @@
+import struct
+import threading
+
+from lazy_module import LazyModule
+
+
+requests = LazyModule("requests")
+
+CHUNK_SIZE = 4 * 1024**2
+READY_BYTES = 16 * 1024**2
+DOWNLOAD_WORKERS = 4
+CHUNK_RETRIES = 3
+
+
+class RangedDownload:
+    """Downloads a file in byte-range chunks into a preallocated local file, fetching the moov atom and the chunks
+    from the playhead onwards first so the file can be played while it downloads"""
+
+    def __init__(self, url, local_fp, chunk_size=CHUNK_SIZE, workers=DOWNLOAD_WORKERS, ready_bytes=READY_BYTES):
+        self.url = url
+        self.local_fp = local_fp
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.ready_bytes = ready_bytes
+        self.session = requests.Session()
+        self.size = None
+        self.chunk_count = 0
+        self.done = set()
+        self.in_flight = set()
+        self.priority = set()
+        self.focus_chunk = 0
+        self.boxes = {}
+        self.error = None
+        self.cancelled = False
+        self.lock = threading.RLock()
+        self.parse_lock = threading.Lock()
+        self.threads = []
+
+    def start(self):
+        response = self.session.get(self.url, headers={"Range": "bytes=0-0"})
+        response.raise_for_status()
+        if response.status_code == 206:
+            self.size = int(response.headers["Content-Range"].rsplit("/", 1)[1])
+        else:
+            self.size = int(response.headers["Content-Length"])
+        self.chunk_count = max(1, -(-self.size // self.chunk_size))
+
+        with open(self.local_fp, "wb") as f:
+            f.truncate(self.size)
+
+        for _ in range(min(self.workers, self.chunk_count)):
+            thread = threading.Thread(target=self._run, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def wait(self):
+        """Blocks until every chunk is downloaded, raising the first download error"""
+        for thread in self.threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+        if self.cancelled:
+            raise RuntimeError("Download cancelled")
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+
+    def focus(self, byte_offset):
+        """Moves the download front to the given byte, e.g. after a seek"""
+        with self.lock:
+            self.focus_chunk = min(max(0, byte_offset // self.chunk_size), self.chunk_count - 1)
+
+    def focus_fraction(self, fraction):
+        """Moves the download front to a fraction of the way through the media data"""
+        self.focus(self.media_offset(fraction))
+
+    def media_offset(self, fraction):
+        start, end = self.boxes.get("mdat", (0, self.size))
+        return int(start + min(max(fraction, 0.0), 1.0) * (end - start))
+
+    def downloaded_bytes(self):
+        with self.lock:
+            return min(len(self.done) * self.chunk_size, self.size or 0)
+
+    def is_complete(self):
+        with self.lock:
+            return len(self.done) == self.chunk_count
+
+    def is_available(self, start, end):
+        """Whether the bytes in [start, end) are on disk"""
+        end = min(end, self.size)
+        if end <= start:
+            return True
+        with self.lock:
+            return all(chunk in self.done for chunk in range(start // self.chunk_size, (end - 1) // self.chunk_size + 1))
+
+    def is_ready(self):
+        """Whether enough of the file is on disk to start playback"""
+        if self.is_complete():
+            return True
+        if "moov" not in self.boxes or not self.is_available(*self.boxes["moov"]):
+            return False
+        start, end = self.boxes.get("mdat", (0, self.size))
+        return self.is_available(start, min(end, start + self.ready_bytes))
+
+    def _next_chunk(self):
+        with self.lock:
+            if self.cancelled or self.error is not None:
+                return None
+
+            remaining = [chunk for chunk in range(self.chunk_count) if chunk not in self.done | self.in_flight]
+            if not remaining:
+                return None
+
+            # moov first, then forwards from the focus, then whatever is left behind it
+            chunk = min(
+                remaining,
+                key=lambda c: (c not in self.priority, c < self.focus_chunk, abs(c - self.focus_chunk)),
+            )
+            self.in_flight.add(chunk)
+            return chunk
+
+    def _run(self):
+        with open(self.local_fp, "r+b") as f:
+            while True:
+                chunk = self._next_chunk()
+                if chunk is None:
+                    return
+                try:
+                    data = self._fetch_chunk(chunk)
+                    f.seek(chunk * self.chunk_size)
+                    f.write(data)
+                    f.flush()
+                except Exception as e:
+                    with self.lock:
+                        self.error = self.error or e
+                        self.in_flight.discard(chunk)
+                    return
+
+                with self.lock:
+                    self.in_flight.discard(chunk)
+                    self.done.add(chunk)
+                with self.parse_lock:
+                    self._parse_boxes()
+
+    def _fetch_chunk(self, chunk):
+        start = chunk * self.chunk_size
+        end = min(start + self.chunk_size, self.size) - 1
+        for attempt in range(CHUNK_RETRIES + 1):
+            try:
+                response = self.session.get(self.url, headers={"Range": f"bytes={start}-{end}"})
+                if response.status_code == 206 and len(response.content) == end - start + 1:
+                    return response.content
+                if attempt == CHUNK_RETRIES:
+                    raise IOError(f"Bad response for bytes {start}-{end}: {response.status_code}")
+            except requests.RequestException:
+                if attempt == CHUNK_RETRIES:
+                    raise
+
+    def _parse_boxes(self):
+        """Walks the top level MP4 boxes that are on disk, prioritising the chunks that hold the moov atom"""
+        offset = max((end for _, end in self.boxes.values()), default=0)
+        with open(self.local_fp, "rb") as f:
+            while offset + 8 <= self.size and self.is_available(offset, offset + 16):
+                f.seek(offset)
+                header = f.read(16)
+                size, box_type = struct.unpack(">I4s", header[:8])
+                if size == 1:
+                    size = struct.unpack(">Q", header[8:16])[0]
+                elif size == 0:
+                    size = self.size - offset
+                if size < 8:
+                    # not an MP4, stream the file front to back
+                    return
+
+                box_type = box_type.decode("latin-1")
+                self.boxes[box_type] = (offset, offset + size)
+                if box_type == "moov":
+                    with self.lock:
+                        self.priority.update(range(offset // self.chunk_size, (offset + size - 1) // self.chunk_size + 1))
+                offset += size
+
+            # fetch the next box header early so a trailing moov atom is found quickly
+            if offset + 8 <= self.size:
+                with self.lock:
+                    self.priority.add(offset // self.chunk_size)
@@ -0,0 +1,109 @@
+import os
+import time
+
+import numpy as np
+
+from lazy_module import LazyModule
+from s3_cache import S3Cache
+from seek_index import get_seek_index
+
+
+cv2 = LazyModule("cv2")
+
+PROXY_HEIGHT = 540
+# OpenCV's MPEG-4 Part 2 encoder writes a keyframe every 12 frames, so any frame is at most 11 decodes away
+PROXY_FOURCC = "mp4v"
+PROXY_CACHE_DIR = os.environ.get(
+    "ATLAS_PROXY_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "atlas_labelling_tool", "proxies")
+)
+PROXY_CACHE_MAX_BYTES = int(float(os.environ.get("ATLAS_PROXY_CACHE_MAX_GB", 10)) * 1024**3)
+# a proxy frame may start at most this fraction of a frame away from its source frame, so the middle of a source
+# frame always falls inside the same proxy frame
+PROXY_MAX_DRIFT = 0.25
+
+proxy_cache = S3Cache(PROXY_CACHE_DIR, PROXY_CACHE_MAX_BYTES)
+
+
+class ProxyMisaligned(Exception):
+    pass
+
+
+class ProxyCancelled(Exception):
+    pass
+
+
+def proxy_cache_key(video_path, height=PROXY_HEIGHT):
+    """A cache key that changes whenever the source video does"""
+    stat = os.stat(video_path)
+    return os.path.join(os.path.abspath(video_path), f"proxy-{height}p-{stat.st_size}-{stat.st_mtime_ns}.mp4")
+
+
+def transcode_proxy(video_path, proxy_fp, height=PROXY_HEIGHT, cancelled=None):
+    """Writes every frame of a video, scaled down to the given height, to a short-GOP MP4. Returns the frames written.
+    Setting the cancelled event stops it before the next frame, raising ProxyCancelled with nothing left on disk"""
+    capture = cv2.VideoCapture(video_path)
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    scale = height / capture.get(cv2.CAP_PROP_FRAME_HEIGHT)
+    # the encoder needs even dimensions
+    size = (int(round(capture.get(cv2.CAP_PROP_FRAME_WIDTH) * scale / 2)) * 2, int(round(height / 2)) * 2)
+
+    # OpenCV picks the container from the extension, which the cache's temporary file name doesn't end in
+    tmp_fp = proxy_fp + ".mp4"
+    writer = cv2.VideoWriter(tmp_fp, cv2.VideoWriter_fourcc(*PROXY_FOURCC), fps, size)
+    frames_written = 0
+    try:
+        while True:
+            if cancelled is not None and cancelled.is_set():
+                break
+            ok, frame = capture.read()
+            if not ok:
+                break
+            writer.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+            frames_written += 1
+    finally:
+        capture.release()
+        writer.release()
+    if cancelled is not None and cancelled.is_set():
+        if os.path.exists(tmp_fp):
+            os.remove(tmp_fp)
+        raise ProxyCancelled(f"Proxy of {video_path} cancelled after {frames_written} frames")
+    os.replace(tmp_fp, proxy_fp)
+    return frames_written
+
+
+def check_proxy_alignment(video_path, proxy_path):
+    """Raises ProxyMisaligned unless the proxy has the same frames as the source at the same times"""
+    source = get_seek_index(video_path)
+    proxy = get_seek_index(proxy_path)
+    if len(source) != len(proxy):
+        raise ProxyMisaligned(f"Proxy of {video_path} has {len(proxy)} frames, the source has {len(source)}")
+
+    frame_ms = 1000 / source.fps
+    drift = np.abs(source.pts_ms - proxy.pts_ms)
+    if len(drift) and drift.max() > PROXY_MAX_DRIFT * frame_ms:
+        frame_num = int(drift.argmax())
+        raise ProxyMisaligned(
+            f"Frame {frame_num} of the proxy of {video_path} is shown at {proxy.pts_ms[frame_num]:.1f}ms, "
+            f"the source shows it at {source.pts_ms[frame_num]:.1f}ms"
+        )
+
+
+def get_proxy(video_path, height=PROXY_HEIGHT, cancelled=None):
+    """Returns the path of a low resolution proxy of the video with the same frames at the same times, transcoding
+    it into the proxy cache the first time. Videos no taller than the proxy are returned as they are. Setting the
+    cancelled event stops a transcode part way, leaving nothing in the cache"""
+    capture = cv2.VideoCapture(video_path)
+    source_height = capture.get(cv2.CAP_PROP_FRAME_HEIGHT)
+    capture.release()
+    if source_height <= height:
+        return video_path
+
+    key = proxy_cache_key(video_path, height)
+    start = time.perf_counter()
+    proxy_path = proxy_cache.fetch(key, lambda proxy_fp: transcode_proxy(video_path, proxy_fp, height, cancelled))
+    print(f"Proxy of {video_path} ready in {time.perf_counter() - start:.1f}s")
+
+    # a variable frame rate source can't be followed by the constant frame rate proxy. Its proxy stays cached as
+    # transcoding it again would give the same result, and checking it again is cheap once both are indexed
+    check_proxy_alignment(video_path, proxy_path)
+    return proxy_path
@@ -0,0 +1,149 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import logging
+import os
+import shutil
+import threading
+import time
+
+from frame_extraction import (
+    extract_labelled_frames,
+    extract_video_parallel,
+    format_extraction_stats,
+    vid_to_frames_naming,
+)
+from utils import download_file_from_s3, get_video_filename_from_api, sync_labels_to_api, upload_file_to_s3
+
+
+log = logging.getLogger(__name__)
+
+class ReportCancelled(Exception):
+    pass
+
+
+class ReportJob:
+    """Uploads the labels of a video result and generates its report, timing each stage. work_dir, with the video and
+    frames it holds, is deleted once the job ends however it ends. The report is moved to pdf_dir first, named after
+    work_dir so reports of the same video don't overwrite each other"""
+
+    def __init__(self, job_id, user_id, video_result_id, labels_df, work_dir, labelled_frames_only=False, pdf_dir=None):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.video_result_id = video_result_id
+        self.labels_df = labels_df
+        self.work_dir = work_dir
+        self.output_dir = os.path.join(work_dir, str(video_result_id))
+        self.pdf_dir = pdf_dir or os.path.dirname(os.path.abspath(work_dir))
+        self.labelled_frames_only = labelled_frames_only
+        self.extraction_stats = None
+        self.timings = {}
+        self.current_stage = "queued"
+        self.cancelled = threading.Event()
+        self.on_stage = None
+
+    def cancel(self):
+        """Stops the job before its next stage starts, or during frame extraction"""
+        self.cancelled.set()
+
+    @contextmanager
+    def stage(self, name):
+        if self.cancelled.is_set():
+            raise ReportCancelled(f"Report for video result {self.video_result_id} cancelled before {name}")
+        self.current_stage = name
+        if self.on_stage is not None:
+            self.on_stage(name)
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+            log.debug(f"report {self.job_id} (video result {self.video_result_id}): {name} took {self.timings[name]:.1f}s")
+
+    def timed(self, name, func, *args, **kwargs):
+        with self.stage(name):
+            return func(*args, **kwargs)
+
+    def run(self, on_stage=None):
+        """Runs every stage and returns (pdf filepath, label upload errors)"""
+        self.on_stage = on_stage
+        try:
+            return self.run_stages()
+        finally:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def run_stages(self):
+        from atlas_utils.evaluation_framework.generate_report import generate_report
+
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        full_video_filename = self.timed("fetch video name", get_video_filename_from_api, self.user_id, self.video_result_id)
+        video_path = os.path.join(self.output_dir, full_video_filename)
+        pose_path = os.path.join(self.output_dir, "pose_results.json")
+
+        # the label upload doesn't depend on the downloads, so they overlap
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            label_errors = executor.submit(
+                self.timed, "upload labels", sync_labels_to_api, self.user_id, self.video_result_id, self.labels_df
+            )
+            video = executor.submit(
+                self.timed,
+                "download video",
+                download_file_from_s3,
+                self.user_id,
+                self.video_result_id,
+                full_video_filename,
+                video_path,
+            )
+            pose = executor.submit(
+                self.timed,
+                "download pose results",
+                download_file_from_s3,
+                self.user_id,
+                self.video_result_id,
+                "pose_results.json",
+                pose_path,
+            )
+            label_errors, _, _ = label_errors.result(), video.result(), pose.result()
+
+        self.timed("extract frames", self.extract_frames, video_path, os.path.join(self.output_dir, "full_video_frames"))
+        pdf_fp = self.timed(
+            "generate report",
+            generate_report,
+            self.work_dir,
+            str(self.video_result_id),
+            full_video_filename,
+            output_pdf_dir=self.work_dir,
+        )
+        self.timed("upload report", upload_file_to_s3, self.user_id, self.video_result_id, pdf_fp)
+
+        os.makedirs(self.pdf_dir, exist_ok=True)
+        name, ext = os.path.splitext(os.path.basename(pdf_fp))
+        kept_pdf_fp = os.path.join(self.pdf_dir, f"{name}_{os.path.basename(os.path.normpath(self.work_dir))}{ext}")
+        shutil.move(pdf_fp, kept_pdf_fp)
+        return kept_pdf_fp, label_errors
+
+    def extract_frames(self, video_path, video_frames_path):
+        """Decodes every frame in parallel, or with labelled_frames_only just the labelled ones when the labels have
+        frame numbers. Both name frames as vid_to_frames does, and vid_to_frames itself runs if that isn't known"""
+        from atlas_utils.vid_utils import vid_to_frames
+
+        naming = vid_to_frames_naming()
+        if naming is None:
+            vid_to_frames(video_path, video_frames_path)
+            return
+        if not self.labelled_frames_only or not {"start_frame", "end_frame"} <= set(self.labels_df.columns):
+            extract_video_parallel(video_path, video_frames_path, naming=naming, cancelled=self.cancelled)
+            return
+
+        self.extraction_stats = extract_labelled_frames(
+            video_path, video_frames_path, self.labels_df, naming=naming, cancelled=self.cancelled
+        )
+        stats = format_extraction_stats(self.extraction_stats)
+        log.debug(f"report {self.job_id} (video result {self.video_result_id}): {stats}")
+
+    def format_timings(self):
+        lines = [f"{name}: {seconds:.1f}s" for name, seconds in self.timings.items()]
+        if self.extraction_stats is not None:
+            lines.append(f"frames: {format_extraction_stats(self.extraction_stats)}")
+        return "\n".join(lines)
@@ -0,0 +1,36 @@
+from PyQt5.QtGui import QStandardItem, QStandardItemModel
+
+
+NO_RULE = "N/A"
+
+
+def rules_for(form_thresholds, exercise, orientation):
+    """The rules of an exercise seen from an orientation, followed by N/A"""
+    rules = form_thresholds.get(exercise, {}).get(orientation, {})
+    return [rule.strip() for rule in rules] + [NO_RULE]
+
+
+class RulesIndex(QStandardItemModel):
+    """The rules of every exercise and orientation, built once as one item per pair with its rules as children. A combo
+    box showing this model switches between them with setRootModelIndex, without refilling anything"""
+
+    def __init__(self, exercises, orientations, form_thresholds, parent=None):
+        super().__init__(parent)
+        self.rows = {}
+        # exercises and orientations without rules share the item holding only N/A
+        self.noRulesRow = self.appendRules([NO_RULE])
+        for exercise in exercises:
+            for orientation in orientations:
+                rules = rules_for(form_thresholds, exercise.strip(), orientation.strip())
+                row = self.appendRules(rules) if len(rules) > 1 else self.noRulesRow
+                self.rows[(exercise.strip(), orientation.strip())] = row
+
+    def appendRules(self, rules):
+        item = QStandardItem()
+        item.appendRows([QStandardItem(rule) for rule in rules])
+        self.appendRow(item)
+        return self.rowCount() - 1
+
+    def rulesRoot(self, exercise, orientation):
+        """The index whose children are the rules of an exercise seen from an orientation"""
+        return self.index(self.rows.get((exercise.strip(), orientation.strip()), self.noRulesRow), 0)
@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# how often a blocking lock on Windows tries again while another window holds it
+LOCK_RETRY_SECONDS = 0.1
+
+
+class FileLock:
+    """An exclusive lock on a file, shared between threads and processes"""
+
+    _thread_locks = {}
+    _thread_locks_lock = threading.Lock()
+
+    def __init__(self, path, blocking=True):
+        self.path = path
+        self.blocking = blocking
+        self.file = None
+        with FileLock._thread_locks_lock:
+            self.thread_lock = FileLock._thread_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+    def acquire(self):
+        """Returns whether the lock was taken. A blocking acquire waits for as long as it takes, and raises OSError if
+        the file can't be locked at all"""
+        if not self.thread_lock.acquire(blocking=self.blocking):
+            return False
+
+        self.file = open(self.path, "a+")
+        try:
+            if fcntl:
+                fcntl.flock(self.file, fcntl.LOCK_EX | (0 if self.blocking else fcntl.LOCK_NB))
+            else:
+                self.lock_msvcrt()
+        except OSError:
+            self.file.close()
+            self.thread_lock.release()
+            if self.blocking:
+                raise
+            return False
+        return True
+
+    def lock_msvcrt(self):
+        # msvcrt locks the bytes from the current position, and LK_LOCK gives up after 10 tries a second apart, which
+        # a multi-GB download holding the lock outlasts
+        self.file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                if not self.blocking:
+                    raise
+                time.sleep(LOCK_RETRY_SECONDS)
+
+    def release(self):
+        if fcntl:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+        else:
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.file.close()
+        self.thread_lock.release()
+
+    def __enter__(self):
+        if not self.acquire():
+            raise OSError(f"Could not lock {self.path}")
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+def is_cached_file(path):
+    """Whether a file is an object held in an S3Cache, where anything saved beside it is removed along with it"""
+    meta = S3Cache.read_meta(os.path.dirname(os.path.abspath(path)))
+    return meta is not None and meta.get("filename") == os.path.basename(path)
+
+
+class S3Cache:
+    """A persistent, size-capped on-disk cache of S3 objects with LRU eviction, safe to share between windows"""
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def entry_dir(self, key):
+        return os.path.join(self.root, hashlib.sha256(key.encode()).hexdigest())
+
+    @staticmethod
+    def read_meta(entry_dir):
+        try:
+            with open(os.path.join(entry_dir, "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def write_meta(entry_dir, meta):
+        tmp_meta_path = os.path.join(entry_dir, "meta.json.part")
+        with open(tmp_meta_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta_path, os.path.join(entry_dir, "meta.json"))
+
+    def get(self, key, etag=None):
+        """Returns the local path of a cached object, or None if it is missing or its ETag doesn't match"""
+        entry_dir = self.entry_dir(key)
+        meta = self.read_meta(entry_dir)
+        if meta is None or meta["key"] != key or (etag is not None and meta["etag"] != etag):
+            return None
+
+        path = os.path.join(entry_dir, meta["filename"])
+        if not os.path.isfile(path):
+            return None
+
+        if etag is not None:
+            meta["validated"] = time.time()
+            self.write_meta(entry_dir, meta)
+        else:
+            # the meta file's mtime records the last access for LRU eviction
+            os.utime(os.path.join(entry_dir, "meta.json"))
+        return path
+
+    def validated_within(self, key, seconds):
+        """Whether a cached object's ETag was checked in the last given seconds, so it can be used without checking"""
+        meta = self.read_meta(self.entry_dir(key))
+        return meta is not None and meta["key"] == key and time.time() - meta.get("validated", 0) < seconds
+
+    def fetch(self, key, download, etag=None, in_place=False):
+        """Returns the local path of an object, calling download(local_fp) to fill the cache on a miss. download writes
+        to a temporary file renamed into place once it returns, or with in_place straight to the path returned, for
+        files opened while they download. Either way the object only counts as cached once download returns"""
+        entry_dir = self.entry_dir(key)
+        os.makedirs(entry_dir, exist_ok=True)
+
+        with FileLock(os.path.join(entry_dir, "lock")):
+            path = self.get(key, etag)
+            if path is not None:
+                self.hits += 1
+                return path
+
+            self.misses += 1
+            filename = os.path.basename(key)
+            path = os.path.join(entry_dir, filename)
+            if in_place:
+                # nothing of an older version can be read while the new one is written over it
+                self.remove_entry(entry_dir)
+                download_path = path
+            else:
+                download_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+            try:
+                download(download_path)
+                if not in_place:
+                    os.replace(download_path, path)
+            except BaseException:
+                self.remove_download(download_path)
+                raise
+
+            meta = {"key": key, "etag": etag, "filename": filename, "size": os.path.getsize(path)}
+            if etag is not None:
+                meta["validated"] = time.time()
+            self.write_meta(entry_dir, meta)
+
+        self.evict(keep=entry_dir)
+        return path
+
+    @staticmethod
+    def remove_download(download_path):
+        try:
+            os.remove(download_path)
+        except OSError:
+            # never written, or still open in a player on Windows. Without meta.json it isn't cached either way
+            pass
+
+    def downloaded_bytes(self, key):
+        """Returns how many bytes of an in-progress download to a temporary file have been written so far"""
+        entry_dir = self.entry_dir(key)
+        if not os.path.isdir(entry_dir):
+            return 0
+        return sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir) if name.endswith(".part"))
+
+    def invalidate(self, key):
+        entry_dir = self.entry_dir(key)
+        if os.path.isdir(entry_dir):
+            with FileLock(os.path.join(entry_dir, "lock")):
+                self.remove_entry(entry_dir)
+
+    def remove_entry(self, entry_dir):
+        # meta.json goes last, so an entry that couldn't be removed completely is still counted and evicted later
+        names = [name for name in os.listdir(entry_dir) if name != "lock"]
+        for name in sorted(names, key=lambda name: name == "meta.json"):
+            path = os.path.join(entry_dir, name)
+            shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+
+    def entries(self):
+        """Returns (last access time, size, entry dir) for every complete entry"""
+        if not os.path.isdir(self.root):
+            return []
+
+        entries = []
+        for name in os.listdir(self.root):
+            entry_dir = os.path.join(self.root, name)
+            meta = self.read_meta(entry_dir)
+            if meta is None:
+                continue
+            try:
+                last_access = os.path.getmtime(os.path.join(entry_dir, "meta.json"))
+            except OSError:
+                # evicted or invalidated by another window since it was read
+                continue
+            entries.append((last_access, meta["size"], entry_dir))
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """Removes least recently used entries until the cache fits in max_bytes"""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in entries:
+            if total <= self.max_bytes:
+                break
+            if entry_dir == keep:
+                continue
+
+            lock = FileLock(os.path.join(entry_dir, "lock"), blocking=False)
+            try:
+                # skip entries that are being downloaded
+                if not lock.acquire():
+                    continue
+                try:
+                    self.remove_entry(entry_dir)
+                finally:
+                    lock.release()
+            except OSError as e:
+                # on Windows a file another window has open can't be deleted, the entry is tried again next time
+                print(f"Could not evict {entry_dir} from the cache: {e}")
+                continue
+            total -= size
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "bytes": self.size(), "max_bytes": self.max_bytes}
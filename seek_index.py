@@ -0,0 +1,150 @@
+import os
+import time
+
+import numpy as np
+
+from lazy_module import LazyModule
+from s3_cache import S3Cache, is_cached_file
+
+
+cv2 = LazyModule("cv2")
+
+SEEK_INDEX_VERSION = 1
+SEEK_INDEX_SUFFIX = ".seekindex.npz"
+# indexes of videos outside the S3 and proxy caches go here rather than into the folders the videos are in
+SEEK_INDEX_CACHE_DIR = os.environ.get(
+    "ATLAS_SEEK_INDEX_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "atlas_labelling_tool", "seek_index")
+)
+SEEK_INDEX_CACHE_MAX_BYTES = int(float(os.environ.get("ATLAS_SEEK_INDEX_CACHE_MAX_GB", 1)) * 1024**3)
+
+# OpenCV seeks to a little before the target and decodes forward to it, so a seek costs about this many decodes on
+# top of the frames between the keyframe and the target
+SEEK_COST_FRAMES = 16
+
+seek_index_cache = S3Cache(SEEK_INDEX_CACHE_DIR, SEEK_INDEX_CACHE_MAX_BYTES)
+
+
+class SeekIndex:
+    """The keyframes and presentation time of every frame of a video, for landing on exact frames with few decodes"""
+
+    def __init__(self, keyframes, pts_ms, fps, size=None, mtime_ns=None):
+        self.keyframes = np.asarray(keyframes, dtype=np.int64)
+        self.pts_ms = np.asarray(pts_ms, dtype=float)
+        self.fps = fps
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def __len__(self):
+        return len(self.pts_ms)
+
+    @classmethod
+    def build(cls, video_path):
+        """Reads every packet of the video without decoding it, noting keyframes and presentation times"""
+        stat = os.stat(video_path)
+        capture = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+        try:
+            fps = capture.get(cv2.CAP_PROP_FPS)
+            if not capture.set(cv2.CAP_PROP_FORMAT, -1):
+                raise IOError(f"Could not read the packets of {video_path}")
+            pts_ms, is_keyframe = [], []
+            while capture.grab():
+                pts_ms.append(capture.get(cv2.CAP_PROP_POS_MSEC))
+                is_keyframe.append(bool(capture.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME)))
+        finally:
+            capture.release()
+
+        # packets come in decode order, which B-frames make differ from presentation order
+        pts_ms = np.asarray(pts_ms)
+        order = np.argsort(pts_ms, kind="stable")
+        keyframes = np.flatnonzero(np.asarray(is_keyframe, dtype=bool)[order])
+        return cls(keyframes, pts_ms[order], fps, stat.st_size, stat.st_mtime_ns)
+
+    @classmethod
+    def load(cls, video_path, index_path):
+        """Returns the index of a video saved at index_path, or None if there isn't one or the video has changed since"""
+        try:
+            with np.load(index_path) as data:
+                if int(data["version"]) != SEEK_INDEX_VERSION:
+                    return None
+                stat = os.stat(video_path)
+                if int(data["size"]) != stat.st_size or int(data["mtime_ns"]) != stat.st_mtime_ns:
+                    return None
+                return cls(data["keyframes"], data["pts_ms"], float(data["fps"]), stat.st_size, stat.st_mtime_ns)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, index_path):
+        tmp_path = f"{index_path}.{os.getpid()}.part"
+        # np.savez adds .npz to file names without it, but not to open files
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                version=SEEK_INDEX_VERSION,
+                keyframes=self.keyframes,
+                pts_ms=self.pts_ms,
+                fps=self.fps,
+                size=self.size,
+                mtime_ns=self.mtime_ns,
+            )
+        os.replace(tmp_path, index_path)
+
+    def keyframe_before(self, frame_num):
+        """The last keyframe at or before frame_num"""
+        i = np.searchsorted(self.keyframes, frame_num, side="right") - 1
+        return int(self.keyframes[max(0, i)]) if len(self.keyframes) else 0
+
+    def should_seek(self, position, frame_num):
+        """Whether seeking to frame_num takes fewer decodes than decoding forward from the frame at position"""
+        if position is None or frame_num < position:
+            return True
+        return frame_num - position > frame_num - self.keyframe_before(frame_num) + SEEK_COST_FRAMES
+
+    def frame_to_position(self, frame_num):
+        """The millisecond position halfway through a frame's display time"""
+        frame_num = min(max(0, frame_num), len(self) - 1)
+        start = self.pts_ms[frame_num]
+        end = self.pts_ms[frame_num + 1] if frame_num + 1 < len(self) else start + 1000 / self.fps
+        return int(round((start + end) / 2))
+
+    def position_to_frame(self, position):
+        """The frame on screen at a millisecond position"""
+        return max(0, int(np.searchsorted(self.pts_ms, position, side="right")) - 1)
+
+
+def seek_index_cache_key(video_path):
+    """A cache key that changes whenever the video does"""
+    stat = os.stat(video_path)
+    return os.path.join(os.path.abspath(video_path), f"seekindex-{stat.st_size}-{stat.st_mtime_ns}.npz")
+
+
+def load_seek_index(video_path):
+    """Returns the saved index of a video, or None if it hasn't been indexed since it last changed"""
+    if is_cached_file(video_path):
+        return SeekIndex.load(video_path, video_path + SEEK_INDEX_SUFFIX)
+    index_path = seek_index_cache.get(seek_index_cache_key(video_path))
+    return SeekIndex.load(video_path, index_path) if index_path is not None else None
+
+
+def save_seek_index(video_path, index):
+    """Saves the index beside a video held in an S3Cache, so it is evicted with it, or in the seek index cache for
+    any other video, which leaves the user's folders untouched and works on read-only media"""
+    if is_cached_file(video_path):
+        index.save(video_path + SEEK_INDEX_SUFFIX)
+    else:
+        seek_index_cache.fetch(seek_index_cache_key(video_path), index.save)
+
+
+def get_seek_index(video_path):
+    """Loads the saved seek index of a video, building and saving it first if it is missing or stale"""
+    index = load_seek_index(video_path)
+    if index is not None:
+        return index
+
+    start = time.perf_counter()
+    index = SeekIndex.build(video_path)
+    try:
+        save_seek_index(video_path, index)
+    except OSError as e:
+        print(f"Could not save the seek index of {video_path}: {e}")
+    print(f"Built the seek index of {video_path} ({len(index)} frames) in {time.perf_counter() - start:.1f}s")
+    return index
@@ -0,0 +1,39 @@
+import sys
+import time
+
+
+# modules the window opens without, loaded the first time a video, report, upload, import or rule lookup needs them
+DEFERRED_MODULES = [
+    "cv2",
+    "pandas",
+    "requests",
+    "boto3",
+    "PyQt5.Qt",
+    "atlas_utils.tools",
+    "atlas_utils.aws_utils",
+    "atlas_utils.vid_utils",
+    "atlas_utils.evaluation_framework.generate_report",
+    "atlas_utils.evaluation_framework.report_generation.utils",
+    "atlas_utils.evaluation_framework.report_generation.form_error.calculate_form_error",
+]
+
+_marks = [("start", time.perf_counter())]
+
+
+def mark_startup(stage):
+    """Notes that a stage of startup has just finished"""
+    _marks.append((stage, time.perf_counter()))
+
+
+def loaded_deferred_modules():
+    return [name for name in DEFERRED_MODULES if name in sys.modules]
+
+
+def format_startup_times():
+    stages = [f"{stage} {(end - start) * 1000:.0f}ms" for (_, start), (stage, end) in zip(_marks, _marks[1:])]
+    total = (_marks[-1][1] - _marks[0][1]) * 1000
+    loaded = loaded_deferred_modules()
+    return (
+        f"startup took {total:.0f}ms: {', '.join(stages)}\n"
+        f"deferred modules loaded during startup: {', '.join(loaded) if loaded else 'none'}"
+    )
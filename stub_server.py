@@ -0,0 +1,188 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import os
+import threading
+import time
+
+
+class LabelApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out as separate writes, which Nagle's algorithm would hold back for a delayed ACK on
+    # every reused connection
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def send_json(self, status, body=None):
+        payload = json.dumps(body if body is not None else {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def handle_request(self, method):
+        time.sleep(self.server.latency)
+        self.server.count_request(method, self.path)
+        body = self.read_json()
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        labels = self.server.labels
+
+        if parts == ["login"] and method == "POST":
+            return self.send_json(200, {"token": self.server.issue_token()})
+        if self.server.require_auth and not self.server.valid_token(self.headers.get("Authorization")):
+            return self.send_json(401, {"errors": {"token": "Invalid or expired token"}})
+
+        if parts[:1] == ["video_result"] and method == "GET":
+            return self.send_json(200, {"id": int(parts[1])})
+        if parts[:1] != ["video_label"]:
+            return self.send_json(404)
+
+        with self.server.lock:
+            if len(parts) == 1 and method == "GET":
+                video_result_id = body.get("video_result_id")
+                return self.send_json(200, [l for l in labels.values() if l["video_result_id"] == video_result_id])
+            if len(parts) == 1 and method == "POST":
+                if any(l["name"] == body["name"] for l in labels.values()):
+                    return self.send_json(400, {"errors": {"name": "Label already exists"}})
+                label = dict(body, id=next(self.server.ids))
+                labels[label["id"]] = label
+                return self.send_json(201, label)
+            if parts[1:] == ["by_name"] and method == "GET":
+                for label in labels.values():
+                    if label["name"] == body.get("name"):
+                        return self.send_json(200, label)
+                return self.send_json(404)
+
+            label_id = int(parts[1])
+            if label_id not in labels:
+                return self.send_json(404)
+            if method == "PUT":
+                labels[label_id].update(body)
+                return self.send_json(200, labels[label_id])
+            if method == "DELETE":
+                del labels[label_id]
+                return self.send_json(200)
+        return self.send_json(405)
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def do_PUT(self):
+        self.handle_request("PUT")
+
+    def do_DELETE(self):
+        self.handle_request("DELETE")
+
+
+class RangeFileHandler(BaseHTTPRequestHandler):
+    """Serves the files under server.root with support for byte-range requests, like S3 does"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        self.server.count_request("GET", self.path)
+        path = os.path.join(self.server.root, self.path.split("?")[0].lstrip("/"))
+        if not os.path.isfile(path):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        range_header = self.headers.get("Range")
+        if range_header:
+            first, last = range_header.split("=", 1)[1].split("-")
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start + 1)
+
+        self.send_response(206 if range_header else 200)
+        if range_header:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubServer(ThreadingHTTPServer):
+    """Serves a stand-in API on localhost from a background thread, sleeping `latency` seconds per request. With
+    require_auth, label API requests need an "Authorization: Bearer <token>" header with a token from POST /login"""
+
+    daemon_threads = True
+
+    def __init__(self, handler=LabelApiHandler, latency=0.0, root=None, require_auth=False):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.latency = latency
+        self.root = root
+        self.require_auth = require_auth
+        self.tokens = set()
+        self.logins = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.labels = {}
+        self.ids = itertools.count(1)
+        self.request_counts = {}
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count_request(self, method, path):
+        with self.lock:
+            self.request_counts[method] = self.request_counts.get(method, 0) + 1
+
+    def issue_token(self):
+        with self.lock:
+            self.logins += 1
+            token = f"token-{self.logins}"
+            self.tokens.add(token)
+        return token
+
+    def valid_token(self, authorization):
+        with self.lock:
+            return authorization is not None and authorization.removeprefix("Bearer ") in self.tokens
+
+    def expire_tokens(self):
+        """Makes every token issued so far invalid, as if they had all expired"""
+        with self.lock:
+            self.tokens.clear()
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+def stub_login(server, username=None):
+    """Logs in to a stub server, as atlas_utils' get_session logs in to the label API"""
+    import requests
+
+    session = requests.Session()
+    token = session.post(f"{server}/login").json()["token"]
+    session.headers["Authorization"] = f"Bearer {token}"
+    return session
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# the modules live at the top of the repo rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_video(tmp_path):
+    """Writes an mp4 under tmp_path whose frames all differ, so a wrong frame never compares equal"""
+    import cv2
+
+    def make_video(frames, width=64, height=48, fps=30, name="video.mp4"):
+        path = str(tmp_path / name)
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+        rng = np.random.default_rng(0)
+        noise = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        for i in range(frames):
+            writer.write(np.roll(noise, i * 4, axis=1))
+        writer.release()
+        return path
+
+    return make_video
+
+
+@pytest.fixture(scope="session")
+def qt_app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture(autouse=True)
+def seek_index_cache(tmp_path_factory, monkeypatch):
+    """An empty seek index cache for each test, outside the user's home directory and the test's tmp_path"""
+    import seek_index
+    from s3_cache import S3Cache
+
+    cache = S3Cache(str(tmp_path_factory.mktemp("seek_index_cache")), seek_index.SEEK_INDEX_CACHE_MAX_BYTES)
+    monkeypatch.setattr(seek_index, "seek_index_cache", cache)
+    return cache
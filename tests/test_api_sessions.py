@@ -0,0 +1,30 @@
+import pandas as pd
+
+from api_sessions import ApiSession
+from stub_server import StubServer, stub_login
+from utils import add_labels_column, fetch_labels, upload_labels
+
+
+def test_session_logs_in_again_after_a_401_and_retries():
+    labels_df = pd.DataFrame({"exercise": ["squat", "lunge"], "start_frame": [0, 30], "end_frame": [30, 60]})
+    labels_df = add_labels_column(labels_df)
+    with StubServer(require_auth=True) as server:
+        session = ApiSession(server.url, login=stub_login)
+        assert upload_labels(server.url, session, 1, labels_df) == ""
+        assert len(fetch_labels(server.url, session, 1)) == 2
+        server.expire_tokens()
+        assert len(fetch_labels(server.url, session, 1)) == 2
+        stats = session.stats()
+
+    assert server.logins == stats["logins"] == 2 and stats["unauthorized"] == 1, stats
+    # every request went over the session's pool of kept-alive connections
+    assert server.connections <= session.pool_size, server.connections
+
+
+def test_stale_login_is_renewed_before_the_request():
+    with StubServer(require_auth=True) as server:
+        session = ApiSession(server.url, max_age=0, login=stub_login)
+        fetch_labels(server.url, session, 1)
+        fetch_labels(server.url, session, 1)
+        stats = session.stats()
+    assert stats["logins"] == 2 and stats["unauthorized"] == 0, stats
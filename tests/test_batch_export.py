@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+from batch_export import BatchJob, jobs_from_manifest, run_jobs
+from label_table import LABEL_COLUMNS
+from utils import build_labels_df
+
+
+ROWS = [
+    ["0:00:01.017", "0:00:02.050", "squat", "front", "1", "5", "N/A", "True", "", "n"],
+    ["0:00:03.000", "0:00:04.500", "squat", "side", "2", "8", "knees", "N/A", "3", ""],
+    ["0:00:05.000", "0:00:06.000", "lunge", "side", "1", "4", "N/A", "False", "", "note"],
+]
+
+
+def test_exports_match_the_window_export(tmp_path, make_video):
+    video_path = make_video(5)
+    jobs = []
+    for i in range(3):
+        labels_path = str(tmp_path / f"video_{i}.csv")
+        pd.DataFrame(ROWS[i:] + ROWS[:i], columns=LABEL_COLUMNS).to_csv(labels_path, index=False)
+        jobs.append(BatchJob(labels_path, video_path, None, None, None))
+
+    assert run_jobs(jobs, str(tmp_path / "out"), workers=2) == []
+    for i, job in enumerate(jobs):
+        expected = build_labels_df(pd.read_csv(job.labels_path, dtype=str, keep_default_na=False), video_path)
+        expected.to_csv(tmp_path / "expected.csv")
+        assert (tmp_path / "expected.csv").read_text() == (tmp_path / "out" / f"video_{i}.csv").read_text()
+
+
+def test_failed_jobs_are_returned(tmp_path):
+    labels_path = str(tmp_path / "labels.csv")
+    pd.DataFrame(ROWS, columns=LABEL_COLUMNS).to_csv(labels_path, index=False)
+    # no video and no fps to convert its times with
+    job = BatchJob(labels_path, None, None, None, None)
+    assert run_jobs([job], str(tmp_path / "out"), workers=1) == [job]
+
+
+def test_manifest_paths_are_relative_to_it(tmp_path):
+    manifest = ["labels_path,video_path,fps,user_id,video_result_id", "a.csv,a.mp4,,1,2", "b.csv,,25,,"]
+    (tmp_path / "manifest.csv").write_text("\n".join(manifest) + "\n")
+    jobs = jobs_from_manifest(str(tmp_path / "manifest.csv"))
+    assert jobs == [
+        BatchJob(str(tmp_path / "a.csv"), str(tmp_path / "a.mp4"), None, 1, 2),
+        BatchJob(str(tmp_path / "b.csv"), None, 25.0, None, None),
+    ]
+
+
+def test_runs_without_qt():
+    modules = subprocess.run(
+        [sys.executable, "-c", "import sys, batch_export; print(' '.join(sys.modules))"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout.split()
+    assert not [module for module in modules if module.startswith("PyQt5")]
@@ -0,0 +1,108 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+import pandas as pd
+import pytest
+
+import frame_extraction
+from frame_extraction import (
+    ExtractionCancelled,
+    FrameNaming,
+    extract_labelled_frames,
+    extract_video_parallel,
+    frame_naming_from_names,
+    split_into_chunks,
+)
+from seek_index import get_seek_index, load_seek_index
+
+
+def decoded_frames(video_path):
+    capture = cv2.VideoCapture(video_path)
+    frames = []
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+def test_parallel_extraction_writes_every_frame(tmp_path, make_video):
+    video_path = make_video(40)
+    assert extract_video_parallel(video_path, str(tmp_path / "frames"), workers=2) == 40
+
+    for frame_num, frame in enumerate(decoded_frames(video_path)):
+        written = cv2.imread(str(tmp_path / "frames" / f"{frame_num}.jpg"))
+        assert written.shape == frame.shape
+
+
+def record_split_keyframes(monkeypatch):
+    """Records the keyframes extract_video_parallel splits its chunks on"""
+    used = []
+    split = frame_extraction.split_into_chunks
+
+    def recording_split(frame_count, chunks, keyframes=None):
+        used.append(keyframes)
+        return split(frame_count, chunks, keyframes)
+
+    monkeypatch.setattr(frame_extraction, "split_into_chunks", recording_split)
+    return used
+
+
+def test_chunks_start_on_saved_seek_index_keyframes(tmp_path, make_video, monkeypatch):
+    video_path = make_video(40)
+    used = record_split_keyframes(monkeypatch)
+    extract_video_parallel(video_path, str(tmp_path / "unindexed"), workers=3)
+    # indexing is a full pass over the video, so extraction doesn't wait for one
+    assert used == [None] and load_seek_index(video_path) is None
+
+    keyframes = get_seek_index(video_path).keyframes
+    assert all(start in keyframes for start, _ in split_into_chunks(40, 3, keyframes))
+    extract_video_parallel(video_path, str(tmp_path / "indexed"), workers=3)
+    assert np.array_equal(used[1], keyframes)
+
+
+def test_parallel_files_are_named_like_vid_to_frames(tmp_path, make_video):
+    video_path = make_video(12)
+    naming = FrameNaming("frame_{:04d}.jpg", 1)
+    extract_video_parallel(video_path, str(tmp_path / "frames"), workers=2, naming=naming)
+    assert sorted(os.listdir(tmp_path / "frames")) == [f"frame_{i:04d}.jpg" for i in range(1, 13)]
+
+
+def test_labelled_extraction_writes_only_labelled_frames(tmp_path, make_video):
+    video_path = make_video(30)
+    labels_df = pd.DataFrame({"start_frame": [2, 20, 4], "end_frame": [5, 22, 8]})
+    stats = extract_labelled_frames(video_path, str(tmp_path / "frames"), labels_df)
+    assert stats.frames_written == 10 and stats.full_frames == 30
+    assert sorted(os.listdir(tmp_path / "frames")) == sorted(f"{i}.jpg" for i in [*range(2, 9), 20, 21, 22])
+
+    again = extract_labelled_frames(video_path, str(tmp_path / "frames"), labels_df)
+    assert again.frames_written == 0 and again.frames_skipped == 10
+
+
+def test_cancelled_extractions_stop(tmp_path, make_video):
+    video_path = make_video(30)
+    cancelled = threading.Event()
+    cancelled.set()
+    labels_df = pd.DataFrame({"start_frame": [0], "end_frame": [29]})
+    with pytest.raises(ExtractionCancelled):
+        extract_labelled_frames(video_path, str(tmp_path / "labelled"), labels_df, cancelled=cancelled)
+    assert os.listdir(tmp_path / "labelled") == []
+
+    with pytest.raises(ExtractionCancelled, match="after 0 frames"):
+        extract_video_parallel(video_path, str(tmp_path / "frames"), workers=2, cancelled=cancelled)
+
+
+def test_frame_naming_from_names():
+    assert frame_naming_from_names(["0.jpg", "1.jpg", "2.jpg"], 3) == FrameNaming("{}.jpg", 0)
+    assert frame_naming_from_names(["img_001.png", "img_002.png", "img_003.png"], 3) == FrameNaming(
+        "img_{:03d}.png", 1
+    )
+    assert frame_naming_from_names(["{a}1.jpg", "{a}2.jpg"], 2) == FrameNaming("{{a}}{}.jpg", 1)
+    # gaps, mixed names and a missing frame can't be followed
+    assert frame_naming_from_names(["0.jpg", "2.jpg", "3.jpg"], 3) is None
+    assert frame_naming_from_names(["0.jpg", "b1.jpg"], 2) is None
+    assert frame_naming_from_names(["0.jpg", "1.jpg"], 3) is None
@@ -0,0 +1,54 @@
+import time
+
+import cv2
+import numpy as np
+
+from frame_server import FrameServer
+from seek_index import get_seek_index
+
+
+def expected_frame(video_path, frame_num):
+    capture = cv2.VideoCapture(video_path)
+    capture.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
+    _, frame = capture.read()
+    capture.release()
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+def test_steps_return_the_exact_frames(make_video):
+    video_path = make_video(90)
+    server = FrameServer(video_path, ahead=10, behind=5)
+    try:
+        frame_num = 45
+        server.set_playhead(frame_num)
+        for step in (1,) * 5 + (-1,) * 5 + (10, -10, 30):
+            frame_num += step
+            assert np.array_equal(server.get(frame_num), expected_frame(video_path, frame_num))
+            server.set_playhead(frame_num)
+    finally:
+        server.close()
+
+
+def test_prefetched_frames_are_hits(make_video):
+    video_path = make_video(60)
+    server = FrameServer(video_path, ahead=10, behind=5)
+    try:
+        server.set_playhead(20)
+        deadline = time.time() + 10
+        while server.stats()["cached_frames"] < 16 and time.time() < deadline:
+            time.sleep(0.01)
+        for frame_num in range(20, 30):
+            server.get(frame_num)
+        assert server.hits == 10
+    finally:
+        server.close()
+
+
+def test_cold_seeks_with_the_seek_index_return_the_exact_frames(make_video):
+    video_path = make_video(90)
+    server = FrameServer(video_path, ahead=0, behind=0, seek_index=get_seek_index(video_path))
+    try:
+        for frame_num in (70, 12, 13, 40, 89, 0):
+            assert np.array_equal(server.get(frame_num), expected_frame(video_path, frame_num))
+    finally:
+        server.close()
@@ -0,0 +1,102 @@
+import os
+
+from label_journal import LabelJournal
+from label_table_model import LabelTableModel
+
+
+ROW = ["0:00:01.017", "0:00:02.050", "squat", "front", "1", "5", "N/A", "True", "", "n"]
+
+
+def edit(model):
+    model.appendRow(ROW)
+    model.appendRow(ROW)
+    model.appendRow(model.rowValues(0))
+    model.setData(model.index(1, 2), "lunge")
+    model.removeRowsAt([0])
+
+
+def journalled_model(directory, compact_min_entries=1000):
+    model = LabelTableModel()
+    journal = LabelJournal(directory, compact_min_entries=compact_min_entries)
+    journal.set_video("video.mp4")
+    journal.attach(model)
+    return model, journal
+
+
+def test_recovers_the_table_and_video_of_a_crashed_window(qt_app, tmp_path):
+    model, journal = journalled_model(str(tmp_path))
+    edit(model)
+    journal.release()
+
+    recovering = LabelJournal(str(tmp_path))
+    assert recovering.recover() == (model.toRows(), "video.mp4")
+    recovering.release()
+
+
+def test_cleanly_closed_windows_leave_nothing_to_recover(qt_app, tmp_path):
+    model, journal = journalled_model(str(tmp_path))
+    edit(model)
+    journal.discard()
+    assert os.listdir(tmp_path) == []
+
+    recovering = LabelJournal(str(tmp_path))
+    assert recovering.recover() == ([], "")
+    recovering.discard()
+
+
+def test_a_session_not_restored_is_not_offered_again(qt_app, tmp_path):
+    model, journal = journalled_model(str(tmp_path))
+    edit(model)
+    journal.release()
+
+    declining = LabelJournal(str(tmp_path))
+    assert declining.recover()[0] == model.toRows()
+    declining.attach(LabelTableModel())
+    declining.release()
+
+    # only the declining window's own, empty session is left
+    recovering = LabelJournal(str(tmp_path))
+    assert recovering.recover() == ([], "")
+    recovering.discard()
+
+
+def test_recovers_across_compactions(qt_app, tmp_path):
+    model, journal = journalled_model(str(tmp_path), compact_min_entries=2)
+    for _ in range(5):
+        edit(model)
+    journal.release()
+
+    recovering = LabelJournal(str(tmp_path))
+    assert recovering.recover() == (model.toRows(), "video.mp4")
+    recovering.release()
+
+
+def test_partial_last_line_is_skipped(qt_app, tmp_path):
+    model, journal = journalled_model(str(tmp_path))
+    edit(model)
+    journal.release()
+    # the app dying mid-write leaves a partial last line
+    with open(journal.journal_path, "a") as f:
+        f.write('{"op": "set", "row": 0, "col')
+
+    recovering = LabelJournal(str(tmp_path))
+    assert recovering.recover()[0] == model.toRows()
+    recovering.release()
+
+
+def test_open_windows_keep_their_own_sessions(qt_app, tmp_path):
+    model, journal = journalled_model(str(tmp_path))
+    edit(model)
+
+    second = LabelJournal(str(tmp_path))
+    assert second.recover() == ([], "")
+    second.attach(LabelTableModel())
+    second.release()
+    journal.release()
+
+    # the next window adopts the session with rows, the other one was empty and is removed
+    third = LabelJournal(str(tmp_path))
+    assert third.recover() == (model.toRows(), "video.mp4")
+    third.attach(LabelTableModel())
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(third.session_dir)]
+    third.release()
@@ -0,0 +1,49 @@
+import pandas as pd
+
+from label_table import LABEL_COLUMNS, csv_labels_to_table
+from label_table_model import LabelTableModel
+from time_conversion import times_to_frame_nums
+
+
+def export_df():
+    return pd.DataFrame(
+        {
+            "start_frame": [30, 95, 1801],
+            "end_frame": [60, 130, 1900],
+            "exercise": ["squat", "lunge", "squat"],
+            "orientation": ["front", "side", "front"],
+            "min_reps": [1, 2, 1],
+            "reps": [5, 8, 3],
+            "rule": ["N/A", "knees", "N/A"],
+            "is_valid": [True, "maybe", False],
+            "reps_to_judge": [0, 3, 1],
+            "notes": ["note", "", "n"],
+        }
+    )
+
+
+def test_loaded_rows_hold_the_exported_values(qt_app):
+    labels_df = export_df()
+    model = LabelTableModel()
+    model.setRows(csv_labels_to_table(labels_df, 30.0))
+
+    assert model.rowCount() == 3 and model.columnCount() == len(LABEL_COLUMNS)
+    assert model.rowValues(1)[2:] == ["lunge", "side", "2", "8", "knees", "N/A", "3", ""]
+    assert model.rowValues(2)[7] == "False"
+    # times keep the exact frame rather than the whole second
+    table_df = model.toDataFrame()
+    assert (times_to_frame_nums(table_df["start_time"], 30.0) == labels_df["start_frame"]).all()
+    assert (times_to_frame_nums(table_df["end_time"], 30.0) == labels_df["end_frame"]).all()
+
+
+def test_edits_inserts_and_removals(qt_app):
+    model = LabelTableModel()
+    model.setRows(csv_labels_to_table(export_df(), 30.0))
+    model.appendRow(["0:00:01.017", "0:00:02.050", "plank"])
+    model.setData(model.index(0, 9), "edited")
+    model.removeRowsAt([1, 2])
+
+    assert model.rowCount() == 2
+    assert model.rowValues(0)[9] == "edited"
+    assert model.rowValues(1) == ["0:00:01.017", "0:00:02.050", "plank"] + [""] * 7
+    assert model.toRows() == [model.rowValues(0), model.rowValues(1)]
@@ -0,0 +1,48 @@
+import time
+
+from PyQt5.QtWidgets import QLabel, QSlider
+
+from position_updates import PositionUpdates, format_position
+
+
+def feed(app, handler, positions):
+    for position in positions:
+        handler(position)
+        time.sleep(0.001)
+        app.processEvents()
+    time.sleep(0.1)
+    app.processEvents()
+
+
+def position_ui(positions):
+    slider, label, seeks = QSlider(), QLabel(), []
+    slider.setRange(0, positions[-1])
+    return slider, label, seeks, PositionUpdates(slider, label, seeks.append)
+
+
+def test_playback_updates_are_coalesced_and_end_on_the_last_position(qt_app):
+    positions = [i * 10 for i in range(300)]
+    slider, label, seeks, updates = position_ui(positions)
+    feed(qt_app, updates.positionChanged, positions)
+
+    assert slider.value() == positions[-1]
+    assert label.text() == format_position(positions[-1] // 1000) == "00:00:02"
+    assert updates.refreshes < updates.updates // 2 and not seeks
+
+
+def test_drag_seeks_are_throttled_and_end_where_it_is_let_go(qt_app):
+    positions = [i * 10 for i in range(300)]
+    slider, label, seeks, updates = position_ui(positions)
+    slider.setSliderDown(True)
+    feed(qt_app, slider.setSliderPosition, positions)
+    slider.setSliderDown(False)
+
+    assert seeks[-1] == positions[-1]
+    assert updates.moves == len(positions) - 1 and len(seeks) < len(positions) // 10
+
+
+def test_format_position_matches_qtime():
+    from PyQt5.QtCore import QTime
+
+    for ms in (0, 999, 61_000, 3_599_999, 3_600_000, 86_399_000):
+        assert format_position(ms // 1000) == QTime(0, 0, 0, 0).addMSecs(ms).toString()
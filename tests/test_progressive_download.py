@@ -0,0 +1,64 @@
+import os
+
+import pytest
+import requests
+
+import utils
+from progressive_download import RangedDownload
+from s3_cache import S3Cache
+from stub_server import RangeFileHandler, StubServer
+
+
+@pytest.fixture
+def file_server(tmp_path, make_video):
+    video_path = make_video(60)
+    with StubServer(RangeFileHandler, root=os.path.dirname(video_path)) as server:
+        yield server, video_path
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_downloads_every_chunk_and_finds_the_mp4_boxes(tmp_path, file_server):
+    server, video_path = file_server
+    local_fp = str(tmp_path / "download.mp4")
+    download = RangedDownload(f"{server.url}/video.mp4", local_fp, chunk_size=4096, workers=3).start()
+    download.wait()
+
+    assert download.is_complete() and download.is_ready()
+    assert download.downloaded_bytes() == os.path.getsize(video_path)
+    assert read(local_fp) == read(video_path)
+    assert {"moov", "mdat"} <= set(download.boxes)
+
+
+def test_moov_then_chunks_from_the_focus_come_first():
+    download = RangedDownload("http://127.0.0.1/video.mp4", "unused.mp4")
+    download.chunk_count = 10
+    download.priority = {9}
+    download.focus(5 * download.chunk_size)
+    assert [download._next_chunk() for _ in range(10)] == [9, 5, 6, 7, 8, 4, 3, 2, 1, 0]
+
+
+def test_missing_files_fail_to_start(tmp_path, file_server):
+    server, _ = file_server
+    with pytest.raises(requests.HTTPError):
+        RangedDownload(f"{server.url}/missing.mp4", str(tmp_path / "download.mp4")).start()
+
+
+def test_streams_are_downloaded_where_they_are_cached(tmp_path, file_server, monkeypatch):
+    server, video_path = file_server
+    monkeypatch.setattr(utils, "s3_cache", S3Cache(str(tmp_path / "cache"), 1024**2))
+    monkeypatch.setattr(utils, "get_s3_etag", lambda aws_fp: "a")
+    started = []
+
+    path = utils.stream_file_from_s3(1, 2, "video.mp4", on_started=started.append, url=f"{server.url}/video.mp4")
+    # the player opens the file as it starts, so it must never be renamed
+    assert [download.local_fp for download in started] == [path]
+    assert read(path) == read(video_path)
+    assert sorted(os.listdir(os.path.dirname(path))) == ["lock", "meta.json", "video.mp4"]
+
+    with pytest.raises(requests.HTTPError):
+        utils.stream_file_from_s3(1, 2, "missing.mp4", url=f"{server.url}/missing.mp4")
+    assert utils.s3_cache.get("1/2/missing.mp4") is None
@@ -0,0 +1,31 @@
+import os
+import threading
+
+import pytest
+
+from proxy_video import ProxyCancelled, ProxyMisaligned, check_proxy_alignment, transcode_proxy
+from seek_index import get_seek_index
+
+
+def test_proxy_keeps_the_frames_and_times_of_the_source(tmp_path, make_video):
+    video_path = make_video(30, width=320, height=240)
+    proxy_path = str(tmp_path / "proxy.mp4")
+    assert transcode_proxy(video_path, proxy_path, height=120) == 30
+    check_proxy_alignment(video_path, proxy_path)
+    assert get_seek_index(proxy_path).fps == get_seek_index(video_path).fps
+
+
+def test_proxy_at_another_frame_rate_is_misaligned(tmp_path, make_video):
+    video_path = make_video(30, width=320, height=240)
+    other_path = make_video(30, width=160, height=120, fps=25, name="other.mp4")
+    with pytest.raises(ProxyMisaligned):
+        check_proxy_alignment(video_path, other_path)
+
+
+def test_cancelled_transcode_leaves_nothing_on_disk(tmp_path, make_video):
+    video_path = make_video(30, width=320, height=240)
+    cancelled = threading.Event()
+    cancelled.set()
+    with pytest.raises(ProxyCancelled):
+        transcode_proxy(video_path, str(tmp_path / "proxy.mp4"), height=120, cancelled=cancelled)
+    assert os.listdir(tmp_path) == ["video.mp4"]
@@ -0,0 +1,85 @@
+import functools
+import importlib
+import os
+import sys
+import types
+
+import pytest
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtWidgets import QComboBox, QWidget
+
+from label_journal import LabelJournal
+from rules_index import RulesIndex, rules_for
+
+
+FORM_THRESHOLDS = {
+    "squat": {"front": {"knees in ": 1, "depth": 2}, "side": {"back angle": 1}},
+    "lunge": {"side": {"knee over toe": 1}},
+}
+
+
+class StubMediaPlayer(QObject):
+    """Stands in for QMediaPlayer, so a Window can be made without a multimedia backend"""
+
+    PlayingState, PausedState, StoppedState = 1, 2, 0
+    VideoSurface = 1
+    stateChanged = pyqtSignal(int)
+    positionChanged = pyqtSignal("qint64")
+    durationChanged = pyqtSignal("qint64")
+    error = pyqtSignal(int)
+
+    def __init__(self, *args):
+        super().__init__()
+
+    def __getattr__(self, name):
+        return lambda *args: 0
+
+
+@pytest.fixture
+def window(qt_app, tmp_path, monkeypatch):
+    multimedia = types.ModuleType("PyQt5.QtMultimedia")
+    multimedia.QMediaPlayer = StubMediaPlayer
+    multimedia.QMediaContent = lambda *args: None
+    multimedia_widgets = types.ModuleType("PyQt5.QtMultimediaWidgets")
+    multimedia_widgets.QVideoWidget = QWidget
+    monkeypatch.setitem(sys.modules, "PyQt5.QtMultimedia", multimedia)
+    monkeypatch.setitem(sys.modules, "PyQt5.QtMultimediaWidgets", multimedia_widgets)
+    monkeypatch.delitem(sys.modules, "pavs", raising=False)
+    pavs = importlib.import_module("pavs")
+
+    from atlas_utils.evaluation_framework.report_generation.form_error import calculate_form_error
+
+    monkeypatch.setattr(calculate_form_error, "form_threshold_dict", FORM_THRESHOLDS)
+    monkeypatch.setattr(pavs, "LabelJournal", functools.partial(LabelJournal, str(tmp_path / "autosave")))
+    monkeypatch.setattr(pavs.Window, "style_choice", lambda self, text: self.styleChoices.append(text))
+
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    window = pavs.Window(os.path.join(repo_dir, "config", "classes.txt"))
+    window.styleChoices = []
+    yield window
+    window.close()
+    sys.modules.pop("pavs", None)
+
+
+def test_switching_roots_shows_each_views_rules(qt_app):
+    index = RulesIndex(["squat", "lunge", "plank "], ["front", "side"], FORM_THRESHOLDS)
+    rules = QComboBox()
+    rules.setModel(index)
+    for exercise, orientation in [("squat", "front"), ("lunge", "side"), ("lunge", "front"), ("plank", "side")]:
+        rules.setRootModelIndex(index.rulesRoot(exercise, orientation))
+        rules.setCurrentIndex(0)
+        items = [rules.itemText(i) for i in range(rules.count())]
+        assert items == rules_for(FORM_THRESHOLDS, exercise, orientation)
+    assert rules_for(FORM_THRESHOLDS, "squat", "front") == ["knees in", "depth", "N/A"]
+
+
+def test_rules_activate_the_window_slot_once_however_often_they_are_updated(window):
+    window.update_rules()
+    for exercise in range(window.iLabel.count()):
+        window.iLabel.setCurrentIndex(exercise)
+        for orientation in range(window.orientation.count()):
+            window.orientation.setCurrentIndex(orientation)
+            window.update_rules()
+
+    window.rules.activated[str].emit("N/A")
+    assert window.styleChoices == ["N/A"]
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from s3_cache import FileLock, S3Cache, is_cached_file
+
+
+def writer(data):
+    def download(local_fp):
+        with open(local_fp, "wb") as f:
+            f.write(data)
+
+    return download
+
+
+def test_fetch_downloads_once_and_evicts_least_recently_used(tmp_path):
+    cache = S3Cache(str(tmp_path / "cache"), max_bytes=3 * 1024)
+    keys = [f"1/2/video_{i}.mp4" for i in range(4)]
+    paths = [cache.fetch(key, writer(bytes([i]) * 1024)) for i, key in enumerate(keys)]
+    for key in keys[1:]:
+        cache.fetch(key, writer(b""))
+
+    assert cache.misses == 4 and cache.hits == 3, cache.stats()
+    assert cache.get(keys[0]) is None and not os.path.exists(paths[0])
+    with open(cache.get(keys[3]), "rb") as f:
+        assert f.read() == bytes([3]) * 1024
+    assert is_cached_file(paths[3]) and not is_cached_file(str(tmp_path / "video.mp4"))
+
+
+def test_failed_download_leaves_nothing_cached(tmp_path):
+    cache = S3Cache(str(tmp_path / "cache"), max_bytes=1024**2)
+
+    def download(local_fp):
+        writer(b"partial")(local_fp)
+        raise IOError("connection reset")
+
+    with pytest.raises(IOError):
+        cache.fetch("1/2/video.mp4", download)
+    assert cache.get("1/2/video.mp4") is None
+    assert os.listdir(cache.entry_dir("1/2/video.mp4")) == ["lock"]
+
+
+def test_etag_mismatch_is_a_miss(tmp_path):
+    cache = S3Cache(str(tmp_path / "cache"), max_bytes=1024**2)
+    cache.fetch("1/2/video.mp4", writer(b"old"), etag="a")
+    assert cache.get("1/2/video.mp4", etag="a") is not None
+    assert cache.get("1/2/video.mp4", etag="b") is None
+
+
+def test_non_blocking_lock_fails_while_held(tmp_path):
+    path = str(tmp_path / "lock")
+    with FileLock(path):
+        assert not FileLock(path, blocking=False).acquire()
+        with pytest.raises(OSError):
+            with FileLock(path, blocking=False):
+                pass
+    lock = FileLock(path, blocking=False)
+    assert lock.acquire()
+    lock.release()
+
+
+def test_checking_the_etag_marks_an_entry_validated(tmp_path):
+    cache = S3Cache(str(tmp_path / "cache"), max_bytes=1024**2)
+    cache.fetch("1/2/video.mp4", writer(b"old"))
+    assert not cache.validated_within("1/2/video.mp4", 60)
+    cache.fetch("1/2/video.mp4", writer(b"new"), etag="a")
+    assert cache.validated_within("1/2/video.mp4", 60) and not cache.validated_within("1/2/video.mp4", 0)
+
+
+def test_entries_that_cant_be_deleted_are_skipped(tmp_path, monkeypatch):
+    cache = S3Cache(str(tmp_path / "cache"), max_bytes=1024)
+    open_path = cache.fetch("1/2/open.mp4", writer(b"0" * 1024))
+    remove = os.remove
+
+    def remove_unless_open(path):
+        # what deleting a file another window's player has open does on Windows
+        if path == open_path:
+            raise PermissionError(f"{path} is being used by another process")
+        remove(path)
+
+    monkeypatch.setattr(os, "remove", remove_unless_open)
+    path = cache.fetch("1/2/next.mp4", writer(b"1" * 1024))
+    assert os.path.isfile(path) and cache.get("1/2/open.mp4") == open_path
+    monkeypatch.undo()
+    cache.evict()
+    assert cache.get("1/2/open.mp4") is None and cache.size() == 1024
@@ -0,0 +1,37 @@
+import os
+
+from seek_index import SEEK_INDEX_SUFFIX, get_seek_index, load_seek_index
+from s3_cache import S3Cache
+
+
+def test_index_has_every_frame_and_round_trips_positions(make_video):
+    video_path = make_video(60)
+    index = get_seek_index(video_path)
+    assert len(index) == 60 and index.keyframes[0] == 0
+    for frame_num in (0, 1, 29, 30, 59):
+        assert index.position_to_frame(index.frame_to_position(frame_num)) == frame_num
+        assert index.keyframe_before(frame_num) <= frame_num
+
+
+def test_local_videos_are_indexed_in_the_cache_not_beside_them(tmp_path, make_video, seek_index_cache):
+    video_path = make_video(30)
+    assert load_seek_index(video_path) is None
+    get_seek_index(video_path)
+    get_seek_index(video_path)
+    assert os.listdir(tmp_path) == ["video.mp4"]
+    # built and saved once, then loaded
+    assert seek_index_cache.misses == 1 and load_seek_index(video_path) is not None
+
+    # a changed video is indexed again
+    stat = os.stat(video_path)
+    os.utime(video_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert load_seek_index(video_path) is None
+
+
+def test_cached_videos_keep_their_index_beside_them(tmp_path, make_video):
+    source_path = make_video(30)
+    cache = S3Cache(str(tmp_path / "s3"), max_bytes=1024**3)
+    video_path = cache.fetch("1/2/video.mp4", lambda local_fp: os.link(source_path, local_fp))
+    get_seek_index(video_path)
+    assert os.path.isfile(video_path + SEEK_INDEX_SUFFIX)
+    assert load_seek_index(video_path) is not None
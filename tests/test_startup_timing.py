@@ -0,0 +1,23 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from startup_timing import DEFERRED_MODULES
+
+
+def test_pavs_imports_none_of_the_deferred_modules():
+    pytest.importorskip("PyQt5.QtMultimedia", exc_type=ImportError)
+    script = f"import json, sys, pavs; print(json.dumps([name for name in {DEFERRED_MODULES!r} if name in sys.modules]))"
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env={**os.environ, "QT_QPA_PLATFORM": "offscreen"},
+    ).stdout
+    # a module level import would bring one of them back into startup
+    assert json.loads(output.splitlines()[-1]) == []
@@ -0,0 +1,23 @@
+import numpy as np
+
+from time_conversion import frame_nums_to_precise_times, frame_nums_to_times, times_to_frame_nums
+from utils import convert_frame_num_to_time, convert_time_to_frame_num
+
+FRAMES = [0, 1, 14, 15, 29, 30, 899, 1800, 107999, 3 * 3600 * 30 - 1]
+
+
+def test_frame_nums_to_times_matches_per_row_conversion():
+    for fps in (25.0, 29.97, 30.0):
+        assert list(frame_nums_to_times(FRAMES, fps)) == [convert_frame_num_to_time(frame, fps) for frame in FRAMES]
+
+
+def test_times_to_frame_nums_matches_per_row_conversion():
+    times = ["0:00:00", "0:00:01", "0:00:01.500", "0:01:00", "1:02:03.040", "2:59:59"]
+    for fps in (25.0, 29.97, 30.0):
+        assert list(times_to_frame_nums(times, fps)) == [convert_time_to_frame_num(time, fps=fps) for time in times]
+
+
+def test_precise_times_convert_back_to_the_same_frames():
+    frames = np.arange(0, 5000, 7)
+    for fps in (23.976, 29.97, 30.0, 60.0):
+        assert (times_to_frame_nums(frame_nums_to_precise_times(frames, fps), fps) == frames).all()
@@ -0,0 +1,232 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+
+import utils
+from label_table import LABEL_COLUMNS
+from s3_cache import S3Cache
+from stub_server import LabelApiHandler, StubServer
+from utils import (
+    add_labels_column,
+    build_labels_df,
+    convert_time_to_frame_num_df,
+    diff_labels,
+    download_file_from_s3,
+    fetch_labels,
+    get_video_metadata,
+    get_video_metadata_cache_stats,
+    invalidate_video_metadata,
+    sync_labels,
+    upload_labels,
+)
+
+
+def labels_df():
+    return pd.DataFrame(
+        {
+            "exercise": ["squat", "squat", "lunge", "squat", "lunge", "squat"],
+            "start_frame": [0, 0, 30, 60, 90, 0],
+            "end_frame": [30, 30, 60, 90, 120, 30],
+        }
+    )
+
+
+def test_video_metadata_cache_is_shared_between_threads(tmp_path, monkeypatch):
+    probes = []
+
+    def probe(video_path):
+        probes.append(video_path)
+        return utils.VideoMetadata(30, 1, 0, "")
+
+    monkeypatch.setattr(utils, "_probe_video_metadata", probe)
+    paths = []
+    for i in range(20):
+        paths.append(str(tmp_path / f"video_{i}.mp4"))
+        open(paths[-1], "w").close()
+    invalidate_video_metadata()
+    before = get_video_metadata_cache_stats()
+
+    def use(i):
+        path = paths[i % len(paths)]
+        if i % 7 == 0:
+            invalidate_video_metadata(path)
+        return get_video_metadata(path).fps
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert set(executor.map(use, range(2000))) == {30}
+    stats = get_video_metadata_cache_stats()
+    assert stats["hits"] - before["hits"] + stats["misses"] - before["misses"] == 2000
+    assert stats["misses"] - before["misses"] == len(probes)
+
+
+def test_add_labels_column_counts_consecutive_start_frames_per_exercise():
+    df = add_labels_column(labels_df())
+    assert list(df["label"]) == ["squat_1", "squat_1", "lunge_1", "squat_2", "lunge_2", "squat_3"]
+
+
+def test_add_labels_column_skips_rows_without_an_exercise_and_drops_unnamed_columns():
+    df = labels_df()
+    df.loc[2, "exercise"] = None
+    df["Unnamed: 0"] = range(len(df))
+    df = add_labels_column(df)
+    assert "Unnamed: 0" not in df.columns
+    assert pd.isna(df.loc[2, "label"])
+    assert list(df["label"].drop(2)) == ["squat_1", "squat_1", "squat_2", "lunge_1", "squat_3"]
+
+
+def test_upload_labels_replaces_the_labels_of_a_video_result():
+    df = add_labels_column(labels_df())
+    with StubServer() as server:
+        session = requests.Session()
+        assert upload_labels(server.url, session, 1, df, max_workers=4) == ""
+        assert upload_labels(server.url, session, 1, df.iloc[:3], max_workers=4) == ""
+        fetched = fetch_labels(server.url, session, 1)
+    assert sorted(label["name"] for label in fetched) == ["lunge_1", "squat_1"]
+
+
+class NoDeleteHandler(LabelApiHandler):
+    def do_DELETE(self):
+        self.send_json(403)
+
+
+def test_upload_labels_stops_when_old_labels_cant_be_deleted():
+    df = add_labels_column(labels_df())
+    with StubServer() as server:
+        session = requests.Session()
+        assert upload_labels(server.url, session, 1, df.iloc[:3], max_workers=4) == ""
+        server.RequestHandlerClass = NoDeleteHandler
+        server.request_counts.clear()
+        # a new session, the open connections keep the handler they were made with
+        session = requests.Session()
+        errors = upload_labels(server.url, session, 1, df, max_workers=4)
+        assert sorted(errors.split("\n\n")) == ["Failed to delete label lunge_1", "Failed to delete label squat_1"]
+        assert "POST" not in server.request_counts
+        fetched = fetch_labels(server.url, session, 1)
+    assert sorted(label["name"] for label in fetched) == ["lunge_1", "squat_1"]
+
+
+def body(name, **fields):
+    label = {
+        "video_result_id": 1,
+        "name": name,
+        "exercise": "squat",
+        "view": "",
+        "reps": 5,
+        "min_reps": 0,
+        "notes": "",
+        "rules": "",
+        "reps_to_judge": 3.0,
+        "start_frame": 0,
+        "end_frame": 30,
+        "is_valid": "True",
+    }
+    label.update(fields)
+    return label
+
+
+def test_diff_labels_compares_the_values_of_label_fields():
+    # as the API might hand back what was posted
+    server_labels = [
+        body("squat_1", id=1, video_result_id="1", reps="5", start_frame=0.0, is_valid=True, reps_to_judge="3"),
+        body("squat_2", id=2, notes=None),
+    ]
+    diff = diff_labels(server_labels, [body("squat_1"), body("squat_2", reps=6)])
+    assert diff.unchanged == ["squat_1"] and diff.creates == [] and diff.deletes == []
+    assert [(label_id, fields) for label_id, _, fields in diff.updates] == [(2, ["reps"])]
+
+
+def test_diff_labels_matches_unnamed_rows_by_their_fields():
+    server_labels = [body("RANDOM1", id=1, exercise=""), body("RANDOM2", id=2, exercise="", end_frame=60)]
+    diff = diff_labels(server_labels, [body(None, exercise=""), body(None, exercise="", end_frame=90)])
+    assert diff.unchanged == ["RANDOM1"] and [label["id"] for label in diff.deletes] == [2]
+    assert len(diff.creates) == 1 and diff.creates[0]["end_frame"] == 90 and diff.creates[0]["name"] is not None
+
+
+def test_sync_labels_sends_only_the_changes():
+    df = labels_df()
+    df.loc[2, "exercise"] = None
+    df = add_labels_column(df)
+    with StubServer() as server:
+        session = requests.Session()
+        assert sync_labels(server.url, session, 1, df) == ""
+        names = sorted(label["name"] for label in fetch_labels(server.url, session, 1))
+        assert len(names) == 5
+
+        # nothing changed, unnamed rows included
+        server.request_counts.clear()
+        assert sync_labels(server.url, session, 1, df) == ""
+        assert set(server.request_counts) == {"GET"}
+        assert sorted(label["name"] for label in fetch_labels(server.url, session, 1)) == names
+
+        # rows 0 and 1 are both squat_1, the later one is uploaded
+        df.loc[1, "reps"] = 7
+        df = df.drop(index=4)
+        assert sync_labels(server.url, session, 1, df, dry_run=True).splitlines()[-1] == (
+            "0 to create, 1 to update, 1 to delete, 3 unchanged"
+        )
+        server.request_counts.clear()
+        assert sync_labels(server.url, session, 1, df) == ""
+        assert server.request_counts == {"GET": 2, "PUT": 1, "DELETE": 1}
+        reps = {label["name"]: label["reps"] for label in fetch_labels(server.url, session, 1)}
+    assert len(reps) == 4 and reps["squat_1"] == 7
+
+
+def export_through_csv(table_df, csv_path, video_path):
+    """The export as saveToCsv used to make it, writing the table out and reading it back to type its columns"""
+    from atlas_utils.evaluation_framework.report_generation.utils import add_is_valid_values_to_df
+
+    table_df[(table_df != "").any(axis=1)].to_csv(csv_path, index=False)
+    labels_df = convert_time_to_frame_num_df(pd.read_csv(csv_path), video_path)
+    labels_df = labels_df.drop(["start_time", "end_time"], axis=1)
+    return add_is_valid_values_to_df(add_labels_column(labels_df))
+
+
+def test_build_labels_df_matches_exporting_through_a_csv(tmp_path, make_video):
+    video_path = make_video(5)
+    table_df = pd.DataFrame(
+        [
+            ["0:00:01.017", "0:00:02.050", "squat", "front", "1", "5", "N/A", "True", "", "n"],
+            ["", "", "", "", "", "", "", "", "", ""],
+            ["0:00:03.000", "0:00:04.500", "squat", "side", "2", "8", "knees", "N/A", "3", ""],
+            ["0:00:05.000", "0:00:06.000", "lunge", "side", "1", "4", "N/A", "False", "", "note"],
+        ],
+        columns=LABEL_COLUMNS,
+    )
+
+    labels_df = build_labels_df(table_df, video_path)
+    pd.testing.assert_frame_equal(labels_df, export_through_csv(table_df, tmp_path / "labels.csv", video_path))
+    assert list(labels_df["label"]) == ["squat_1", "squat_2", "lunge_1"]
+
+
+def test_s3_downloads_are_checked_against_the_etag(tmp_path, monkeypatch):
+    import atlas_utils.aws_utils
+
+    objects = {"1/2/video.mp4": ("a", b"old")}
+    etag_checks = []
+
+    def get_s3_etag(aws_fp):
+        etag_checks.append(aws_fp)
+        return objects[aws_fp][0]
+
+    def aws_download_file(aws_fp, local_fp, bucket):
+        with open(local_fp, "wb") as f:
+            f.write(objects[aws_fp][1])
+
+    monkeypatch.setattr(utils, "s3_cache", S3Cache(str(tmp_path / "cache"), 1024**2))
+    monkeypatch.setattr(utils, "get_s3_etag", get_s3_etag)
+    monkeypatch.setattr(atlas_utils.aws_utils, "aws_download_file", aws_download_file)
+
+    def download():
+        with open(download_file_from_s3(1, 2, "video.mp4"), "rb") as f:
+            return f.read()
+
+    assert download() == b"old" and download() == b"old"
+    assert utils.s3_cache.misses == 1 and len(etag_checks) == 2
+    # re-uploaded
+    objects["1/2/video.mp4"] = ("b", b"new")
+    assert download() == b"new"
+
+    monkeypatch.setattr(utils, "S3_CACHE_REVALIDATE_SECONDS", 60)
+    objects["1/2/video.mp4"] = ("c", b"newer")
+    assert download() == b"new" and len(etag_checks) == 3
@@ -0,0 +1,64 @@
+import time
+
+from video_queue import EXPORTED, NOT_EXPORTED, PrefetchedVideo, VideoQueue, VideoQueuePanel, read_queue_file
+
+
+def test_read_queue_file_skips_headers_and_blank_lines(tmp_path):
+    path = tmp_path / "queue.csv"
+    path.write_text("user_id,video_result_id\n1, 10\n\n2,20,extra\nnot,numbers\n")
+    assert read_queue_file(str(path)) == [(1, 10), (2, 20)]
+
+
+def test_prefetches_within_the_depth_one_at_a_time_and_under_budget():
+    queue = VideoQueue([(1, i) for i in range(6)], depth=3, budget_bytes=150)
+    queue.move_to(0)
+    item = queue.next_to_prefetch()
+    assert item is queue.items[1]
+
+    item.status = "downloading"
+    assert queue.next_to_prefetch() is None
+    item.status, item.prefetched = "ready", PrefetchedVideo("1.mp4", 30.0, [], 100)
+    assert queue.next_to_prefetch() is queue.items[2]
+    queue.items[2].status, queue.items[2].prefetched = "ready", PrefetchedVideo("2.mp4", 30.0, [], 100)
+    # the third is within the depth, but the two ahead of it are over the budget
+    assert queue.prefetched_bytes() == 200 and queue.next_to_prefetch() is None
+
+    queue.move_to(1)
+    assert queue.prefetched_bytes() == 100 and queue.next_to_prefetch() is queue.items[3]
+    queue.move_to(4)
+    assert queue.next_to_prefetch() is queue.items[5]
+
+
+def wait_for(app, panel, condition, seconds=10):
+    deadline = time.time() + seconds
+    while not condition() and time.time() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+    panel.waitForDone()
+    app.processEvents()
+
+
+def test_opens_prefetched_videos_and_exports_the_ones_moved_on_from(qt_app):
+    def prefetch(user_id, video_result_id, full_video=False):
+        return PrefetchedVideo(f"{video_result_id}.mp4", 30.0, [{"video_result_id": video_result_id}], 1)
+
+    exported, opened = [], []
+
+    def export(user_id, video_result_id, labels):
+        exported.append((video_result_id, labels))
+        return ""
+
+    # the second video's table never loads, so it isn't exported
+    export_labels = lambda item: f"labels {item.video_result_id}" if item.video_result_id != 1 else None
+    panel = VideoQueuePanel(export_labels, None, 2, 10, prefetch, export)
+    panel.openRequested.connect(lambda item: opened.append(item.prefetched))
+    panel.setQueue([(1, i) for i in range(3)])
+
+    for _ in range(4):
+        wait_for(qt_app, panel, lambda: panel.prefetchWorker is None)
+        panel.next()
+    wait_for(qt_app, panel, lambda: len(exported) == 2)
+
+    assert [prefetched.labels for prefetched in opened] == [[{"video_result_id": i}] for i in range(3)]
+    assert exported == [(0, "labels 0"), (2, "labels 2")]
+    assert [item.status for item in panel.queue.items] == [EXPORTED, NOT_EXPORTED, EXPORTED]
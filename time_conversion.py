@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+import numpy as np
+
+
+SECONDS_PER_DAY = 24 * 3600
+TWO_DIGITS = np.array([f"{i:02d}" for i in range(60)])
+
+
+def times_to_seconds(times):
+    """Converts an array of HH:MM:SS(.mmm) strings to an array of seconds"""
+    times = np.asarray(times).astype(str)
+    if times.size == 0:
+        return np.zeros(0, dtype=float)
+
+    hours, _, rest = np.moveaxis(np.char.partition(times, ":"), -1, 0)
+    minutes, _, seconds = np.moveaxis(np.char.partition(rest, ":"), -1, 0)
+    try:
+        return hours.astype(float) * 3600 + minutes.astype(float) * 60 + seconds.astype(float)
+    except ValueError:
+        raise ValueError("Times must be formatted as HH:MM:SS")
+
+
+def times_to_frame_nums(times, fps):
+    """Converts an array of HH:MM:SS(.mmm) strings to an array of frame numbers"""
+    seconds = times_to_seconds(times)
+    return np.floor(fps * seconds).astype(np.int64)
+
+
+def frame_nums_to_times(frame_nums, fps):
+    """Converts an array of frame numbers to an array of H:MM:SS string timestamps"""
+    frame_nums = np.asarray(frame_nums)
+    # np.round rounds half to even, matching the builtin round
+    seconds = np.round(frame_nums / fps).astype(np.int64)
+    if seconds.size == 0:
+        return np.zeros(0, dtype=object)
+
+    hours = (seconds // 3600).astype(str)
+    minutes = TWO_DIGITS[seconds % 3600 // 60]
+    secs = TWO_DIGITS[seconds % 60]
+    times = np.char.add(np.char.add(hours, ":"), np.char.add(np.char.add(minutes, ":"), secs)).astype(object)
+
+    # timedelta formats negative and multi-day values with a day prefix
+    out_of_day = (seconds < 0) | (seconds >= SECONDS_PER_DAY)
+    for i in np.flatnonzero(out_of_day):
+        times[i] = str(timedelta(seconds=int(seconds[i])))
+    return times
+
+
+def frame_num_to_position(frame_num, fps):
+    """Returns the millisecond position in the middle of a frame, so seeking there shows exactly that frame"""
+    return np.round((np.asarray(frame_num) + 0.5) * 1000 / fps).astype(np.int64)
+
+
+def position_to_frame_num(position, fps):
+    """Returns the frame shown at a millisecond position"""
+    return np.floor(np.asarray(position) * fps / 1000).astype(np.int64)
+
+
+def frame_nums_to_precise_times(frame_nums, fps):
+    """Converts an array of frame numbers to H:MM:SS.mmm timestamps that convert back to the same frame numbers"""
+    positions = frame_num_to_position(frame_nums, fps)
+    if positions.size == 0:
+        return np.zeros(0, dtype=object)
+
+    times = frame_nums_to_times(positions // 1000, 1)
+    millis = np.char.zfill((positions % 1000).astype(str), 3)
+    return np.char.add(np.char.add(times.astype(str), "."), millis).astype(object)
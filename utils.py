@@ -1,30 +1,130 @@
-import cv2
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import os
-import pandas as pd
-import requests
 import string
 import random
-import tempfile
+import shutil
+import threading
+import time
 
-from atlas_utils.tools import get_server, get_session
-from atlas_utils.aws_utils import aws_download_file, aws_upload_file
-from atlas_utils.vid_utils import get_video_fps
-from atlas_utils.evaluation_framework.report_generation.form_error.calculate_form_error import form_threshold_dict
+from lazy_module import LazyModule
+from progressive_download import RangedDownload
+from s3_cache import S3Cache
+from label_table import table_to_labels_df
+from time_conversion import times_to_frame_nums
 
 
+# the window opens without these, they load the first time they're used
+cv2 = LazyModule("cv2")
+pd = LazyModule("pandas")
+requests = LazyModule("requests")
+
 admin_user = "vlad@atlasai.co.uk"
 
+UPLOAD_MAX_WORKERS = 8
+UPLOAD_RETRIES = 3
+UPLOAD_BACKOFF = 0.5
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+S3_BUCKET = "atlas-remote-internal"
+S3_CACHE_DIR = os.environ.get(
+    "ATLAS_S3_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "atlas_labelling_tool", "s3")
+)
+S3_CACHE_MAX_BYTES = int(float(os.environ.get("ATLAS_S3_CACHE_MAX_GB", 20)) * 1024**3)
+# cached objects are checked against their S3 ETag before use unless they were checked this recently
+S3_CACHE_REVALIDATE_SECONDS = float(os.environ.get("ATLAS_S3_CACHE_REVALIDATE_S", 0))
+
+s3_cache = S3Cache(S3_CACHE_DIR, S3_CACHE_MAX_BYTES)
+
+LabelDiff = namedtuple("LabelDiff", ["creates", "updates", "deletes", "unchanged"])
+# the fields a sync compares, name and video_result_id are what labels are matched by
+LABEL_INT_FIELDS = ["reps", "min_reps", "start_frame", "end_frame"]
+LABEL_TEXT_FIELDS = ["exercise", "view", "notes", "rules", "reps_to_judge", "is_valid"]
+
+VideoMetadata = namedtuple("VideoMetadata", ["fps", "frame_count", "duration", "codec"])
+
+# shared by the open video, report, queue and batch threads
+_video_metadata_cache = {}
+_video_metadata_cache_stats = {"hits": 0, "misses": 0}
+_video_metadata_cache_lock = threading.Lock()
+
+
+def _video_cache_key(video_path):
+    stat = os.stat(video_path)
+    return (os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+
+
+def _probe_video_metadata(video_path):
+    from atlas_utils.vid_utils import get_video_fps as probe_video_fps
+
+    fps = probe_video_fps(video_path)
+    capture = cv2.VideoCapture(video_path)
+    try:
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        fourcc = int(capture.get(cv2.CAP_PROP_FOURCC))
+    finally:
+        capture.release()
+    codec = "".join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)).strip("\x00")
+    duration = frame_count / fps if fps else 0.0
+    return VideoMetadata(fps, frame_count, duration, codec)
+
+
+def get_video_metadata(video_path):
+    """Returns the fps, frame count, duration and codec of a video, probing the file only once per version"""
+    key = _video_cache_key(video_path)
+    with _video_metadata_cache_lock:
+        metadata = _video_metadata_cache.get(key)
+        if metadata is not None:
+            _video_metadata_cache_stats["hits"] += 1
+            return metadata
+        _video_metadata_cache_stats["misses"] += 1
+
+    # probed without the lock so other videos aren't held up behind it
+    metadata = _probe_video_metadata(video_path)
+    with _video_metadata_cache_lock:
+        # drop entries for older versions of the same file
+        _drop_video_metadata(key[0])
+        _video_metadata_cache[key] = metadata
+    return metadata
+
+
+def get_video_fps(video_path):
+    """Returns the fps of a video from the metadata cache"""
+    return get_video_metadata(video_path).fps
+
+
+def _drop_video_metadata(path):
+    for key in [key for key in _video_metadata_cache if key[0] == path]:
+        del _video_metadata_cache[key]
+
+
+def invalidate_video_metadata(video_path=None):
+    """Drops cached metadata for the given video, or for every video if no path is given"""
+    with _video_metadata_cache_lock:
+        if video_path is None:
+            _video_metadata_cache.clear()
+        else:
+            _drop_video_metadata(os.path.abspath(video_path))
+
+
+def get_video_metadata_cache_stats():
+    """Returns the hit and miss counts of the video metadata cache"""
+    with _video_metadata_cache_lock:
+        return dict(_video_metadata_cache_stats)
+
 
 def convert_time_to_seconds(time_string):
-    date_time = datetime.strptime(time_string, "%H:%M:%S")
+    time_format = "%H:%M:%S.%f" if "." in time_string else "%H:%M:%S"
+    date_time = datetime.strptime(time_string, time_format)
     timedelta = date_time - datetime(1900, 1, 1)
     seconds = timedelta.total_seconds()
     return seconds
 
 
-def convert_time_to_frame_num(time_sting, video_path):
-    fps = get_video_fps(video_path)
+def convert_time_to_frame_num(time_sting, video_path=None, fps=None):
+    if fps is None:
+        fps = get_video_fps(video_path)
     seconds = convert_time_to_seconds(time_sting)
     frame_num = int(fps * seconds)
     return frame_num
@@ -37,28 +137,39 @@ def convert_frame_num_to_time(frame_number, fps):
 
 
 def convert_time_to_frame_num_df(df, video_path):
-    df["start_frame"] = df["start_time"].apply(lambda time: convert_time_to_frame_num(time, video_path))
-    df["end_frame"] = df["end_time"].apply(lambda time: convert_time_to_frame_num(time, video_path))
+    fps = get_video_fps(video_path)
+    df["start_frame"] = times_to_frame_nums(df["start_time"], fps)
+    df["end_frame"] = times_to_frame_nums(df["end_time"], fps)
     return df
 
 
 def add_labels_column(df):
-    unique_exercises = df["exercise"].unique()
-    for exercise in unique_exercises:
-        exercise_df = df[df["exercise"] == exercise]
-        start_time = ""
-        id = 0
-        for index, exercise_row in exercise_df.iterrows():
-            if start_time != exercise_row["start_frame"]:
-                start_time = exercise_row["start_frame"]
-                id += 1
-
-            df.loc[index, "label"] = exercise + "_" + str(id)
+    """Labels each row exercise_N, where N counts the distinct consecutive start frames of that exercise"""
+    has_exercise = df["exercise"].notna()
+    exercises = df.loc[has_exercise, "exercise"]
+    start_frames = df.loc[has_exercise, "start_frame"]
+
+    is_new_set = start_frames.groupby(exercises, sort=False).shift() != start_frames
+    set_ids = is_new_set.astype(int).groupby(exercises, sort=False).cumsum()
+    df.loc[has_exercise, "label"] = exercises.astype(str) + "_" + set_ids.astype(str)
 
     df = df.loc[:, ~df.columns.str.contains("^Unnamed")]
     return df
 
 
+def build_labels_df(table_df, video_path=None):
+    """Builds the labels DataFrame that is exported and uploaded from the label table's cells, in memory"""
+    from atlas_utils.evaluation_framework.report_generation.utils import add_is_valid_values_to_df
+
+    labels_df = table_to_labels_df(table_df)
+    if video_path:
+        labels_df = convert_time_to_frame_num_df(labels_df, video_path)
+        labels_df = labels_df.drop(["start_time", "end_time"], axis=1)
+
+    labels_df = add_labels_column(labels_df)
+    return add_is_valid_values_to_df(labels_df)
+
+
 def get_random_string(characters=16):
     """Generates a random string"""
     s = "".join(random.choices(string.ascii_uppercase + string.digits, k=characters))
@@ -75,91 +186,378 @@ def checked_value(dict, key, default_value):
         return default_value
 
 
-def delete_existing_labels(server, session, video_result_id):
-    response = session.get(f"{server}/video_label/", json={"video_result_id": video_result_id})
+def request_with_retries(session, method, url, retries=None, backoff=None, **kwargs):
+    """Sends a request, retrying with exponential backoff on connection errors and transient status codes"""
+    retries = UPLOAD_RETRIES if retries is None else retries
+    backoff = UPLOAD_BACKOFF if backoff is None else backoff
+    for attempt in range(retries + 1):
+        try:
+            response = session.request(method, url, **kwargs)
+            if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                return response
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+        time.sleep(backoff * 2**attempt)
+
+
+def share_session_across_workers(session, max_workers):
+    """Sizes the session's keep-alive connection pool so every worker can reuse a connection"""
+    if getattr(session, "pool_size", 0) >= max_workers:
+        # mounting a new adapter would drop the connections the session already has open
+        return session
+    adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.pool_size = max_workers
+    return session
+
+
+def delete_existing_labels(server, session, video_result_id, max_workers=None):
+    """Deletes every label of a video result using a pool of workers. Returns a list of error messages"""
+    max_workers = max_workers or UPLOAD_MAX_WORKERS
+    try:
+        response = request_with_retries(
+            session, "GET", f"{server}/video_label/", json={"video_result_id": video_result_id}
+        )
+    except requests.RequestException as e:
+        return [f"Failed to fetch the existing labels with error: {e}"]
+    if response.status_code != 200:
+        return [f"Failed to fetch the existing labels: {response.status_code}"]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(delete_label, server, session, label) for label in response.json()]
+        errors = [future.result() for future in futures]
+    return [error for error in errors if error is not None]
+
+
+def build_label_request_body(video_result_id, label_row, random_name=True):
+    """The API request body of a label row. Rows without a label get a random name, or None unless random_name"""
+    name = checked_value(label_row, "label", get_random_string() if random_name else None)
+    return {
+        "video_result_id": video_result_id,
+        "name": name,
+        "exercise": checked_value(label_row, "exercise", ""),
+        "view": checked_value(label_row, "orientation", ""),
+        "reps": int(checked_value(label_row, "reps", 0)),
+        "min_reps": int(checked_value(label_row, "min_reps", 0)),
+        "notes": checked_value(label_row, "notes", ""),
+        "rules": checked_value(label_row, "rule", ""),
+        "reps_to_judge": checked_value(label_row, "reps_to_judge", ""),
+        "start_frame": int(checked_value(label_row, "start_frame", 0)),
+        "end_frame": int(checked_value(label_row, "end_frame", 0)),
+        "is_valid": str(checked_value(label_row, "is_valid", "")),
+    }
+
+
+def upload_label(server, session, video_result_id, request_body):
+    """POSTs a label, falling back to a PUT if it already exists. Returns an error message or None"""
+    name = request_body["name"]
+    try:
+        # send a POST request
+        response = request_with_retries(session, "POST", f"{server}/video_label/", json=request_body)
+        if response.status_code == 201:
+            return None
+
+        # get video_label_id so we can PUT instead
+        response = request_with_retries(
+            session,
+            "GET",
+            f"{server}/video_label/by_name",
+            json={
+                "video_result_id": video_result_id,
+                "name": name,
+            },
+        )
+        if response.status_code != 200:
+            return f"Failed to find label with name '{name}'"
+
+        video_label_id = response.json()["id"]
+        response = request_with_retries(session, "PUT", f"{server}/video_label/{video_label_id}", json=request_body)
+        if response.status_code != 200:
+            return f"Failed to modify existing label {name} with error: {response.json()['errors']['name']}"
+    except requests.RequestException as e:
+        return f"Failed to upload label {name} with error: {e}"
+    return None
+
+
+def upload_labels(server, session, video_result_id, labels_df, max_workers=None):
+    """Replaces the labels of a video result using a pool of workers. Returns the joined error messages"""
+    max_workers = max_workers or UPLOAD_MAX_WORKERS
+    share_session_across_workers(session, max_workers)
 
-    for label in response.json():
-        session.delete(f"{server}/video_label/{label['id']}")
+    # Check VideoResult exists
+    response = request_with_retries(session, "GET", f"{server}/video_result/{video_result_id}")
+    if response.status_code != 200:
+        return f"Video result with ID {video_result_id} doesn't exist."
 
+    errors = delete_existing_labels(server, session, video_result_id, max_workers=max_workers)
+    if errors:
+        # uploading on top of labels that weren't deleted would leave them mixed in
+        return "\n\n".join(errors)
 
-def send_labels_to_api(user_id, video_result_id, labels_df):
-    errors = []
+    request_bodies = [build_label_request_body(video_result_id, label_row) for (_, label_row) in labels_df.iterrows()]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda body: upload_label(server, session, video_result_id, body), request_bodies)
+        errors = [error for error in results if error is not None]
+
+    # return errors to display to user
+    return "\n\n".join(errors)
 
-    server = get_server(user_id)
-    session = get_session(server, username=admin_user)
 
+def send_labels_to_api(user_id, video_result_id, labels_df, max_workers=None):
+    from api_sessions import get_api_session
+
+    session = get_api_session(user_id, username=admin_user)
+    server = session.server
+    return upload_labels(server, session, video_result_id, labels_df, max_workers=max_workers)
+
+
+def fetch_labels(server, session, video_result_id):
+    response = request_with_retries(session, "GET", f"{server}/video_label/", json={"video_result_id": video_result_id})
+    if response.status_code == 200:
+        return response.json()
+    return []
+
+
+def _normalized_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def normalized_label_fields(label):
+    """The fields of a label a sync compares, typed the same whether they come from a request body or the API"""
+    fields = {}
+    for key in LABEL_INT_FIELDS:
+        try:
+            fields[key] = int(float(label.get(key)))
+        except (TypeError, ValueError):
+            fields[key] = label.get(key)
+    for key in LABEL_TEXT_FIELDS:
+        fields[key] = _normalized_text(label.get(key))
+    return fields
+
+
+def diff_labels(server_labels, request_bodies):
+    """Works out the creates, updates and deletes that turn server_labels into request_bodies. Labels are matched by
+    name, and bodies without a name by their fields, so unnamed rows that haven't changed are left alone"""
+    # later rows win, as they did when every row was POSTed in order
+    wanted = {body["name"]: body for body in request_bodies if body["name"] is not None}
+
+    existing = {}
+    unmatched = []
+    for label in server_labels:
+        if label["name"] in wanted and label["name"] not in existing:
+            existing[label["name"]] = label
+        else:
+            unmatched.append(label)
+
+    creates, updates, unchanged = [], [], []
+    for name, body in wanted.items():
+        if name not in existing:
+            creates.append(body)
+            continue
+
+        label = existing[name]
+        label_fields = normalized_label_fields(label)
+        changed_fields = [key for key, value in normalized_label_fields(body).items() if label_fields[key] != value]
+        if changed_fields:
+            updates.append((label["id"], body, changed_fields))
+        else:
+            unchanged.append(name)
+
+    # an unnamed row is the server label left over with the same fields, or a new label
+    by_fields = {}
+    for label in unmatched:
+        by_fields.setdefault(tuple(normalized_label_fields(label).items()), []).append(label)
+    kept = set()
+    for body in request_bodies:
+        if body["name"] is not None:
+            continue
+        same_fields = by_fields.get(tuple(normalized_label_fields(body).items()))
+        if same_fields:
+            label = same_fields.pop(0)
+            kept.add(label["id"])
+            unchanged.append(label["name"])
+        else:
+            creates.append(dict(body, name=get_random_string()))
+
+    deletes = [label for label in unmatched if label["id"] not in kept]
+    return LabelDiff(creates, updates, deletes, unchanged)
+
+
+def format_label_diff(diff):
+    """Describes a LabelDiff for a dry run"""
+    lines = [f"Create {body['name']}" for body in diff.creates]
+    lines += [f"Update {body['name']} ({', '.join(fields)})" for _, body, fields in diff.updates]
+    lines += [f"Delete {label['name']}" for label in diff.deletes]
+    lines.append(
+        f"{len(diff.creates)} to create, {len(diff.updates)} to update, "
+        f"{len(diff.deletes)} to delete, {len(diff.unchanged)} unchanged"
+    )
+    return "\n".join(lines)
+
+
+def update_label(server, session, video_label_id, request_body):
+    name = request_body["name"]
+    try:
+        response = request_with_retries(session, "PUT", f"{server}/video_label/{video_label_id}", json=request_body)
+        if response.status_code != 200:
+            return f"Failed to modify existing label {name} with error: {response.json()['errors']['name']}"
+    except requests.RequestException as e:
+        return f"Failed to modify existing label {name} with error: {e}"
+    return None
+
+
+def delete_label(server, session, label):
+    try:
+        response = request_with_retries(session, "DELETE", f"{server}/video_label/{label['id']}")
+        if response.status_code not in (200, 204):
+            return f"Failed to delete label {label['name']}"
+    except requests.RequestException as e:
+        return f"Failed to delete label {label['name']} with error: {e}"
+    return None
+
+
+def apply_label_diff(server, session, video_result_id, diff, max_workers=None):
+    """Sends the requests of a LabelDiff using a pool of workers. Returns a list of error messages"""
+    max_workers = max_workers or UPLOAD_MAX_WORKERS
+    share_session_across_workers(session, max_workers)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(upload_label, server, session, video_result_id, body) for body in diff.creates]
+        futures += [executor.submit(update_label, server, session, id, body) for id, body, _ in diff.updates]
+        futures += [executor.submit(delete_label, server, session, label) for label in diff.deletes]
+        errors = [future.result() for future in futures]
+    return [error for error in errors if error is not None]
+
+
+def sync_labels(server, session, video_result_id, labels_df, dry_run=False, max_workers=None):
+    """Sends only the label changes needed to match labels_df. Returns the joined error messages, or the diff on a dry run"""
     # Check VideoResult exists
-    response = session.get(f"{server}/video_result/{video_result_id}")
+    response = request_with_retries(session, "GET", f"{server}/video_result/{video_result_id}")
     if response.status_code != 200:
         return f"Video result with ID {video_result_id} doesn't exist."
 
-    delete_existing_labels(server, session, video_result_id)
-
-    # iterate and post labels
-    for (_, label_row) in labels_df.iterrows():
-        name = checked_value(label_row, "label", get_random_string())
-        request_body = {
-            "video_result_id": video_result_id,
-            "name": name,
-            "exercise": checked_value(label_row, "exercise", ""),
-            "view": checked_value(label_row, "orientation", ""),
-            "reps": int(checked_value(label_row, "reps", 0)),
-            "min_reps": int(checked_value(label_row, "min_reps", 0)),
-            "notes": checked_value(label_row, "notes", ""),
-            "rules": checked_value(label_row, "rule", ""),
-            "reps_to_judge": checked_value(label_row, "reps_to_judge", ""),
-            "start_frame": int(checked_value(label_row, "start_frame", 0)),
-            "end_frame": int(checked_value(label_row, "end_frame", 0)),
-            "is_valid": str(checked_value(label_row, "is_valid", "")),
-        }
+    request_bodies = [
+        build_label_request_body(video_result_id, label_row, random_name=False)
+        for (_, label_row) in labels_df.iterrows()
+    ]
+    diff = diff_labels(fetch_labels(server, session, video_result_id), request_bodies)
+    if dry_run:
+        return format_label_diff(diff)
 
-        # send a POST request
-        response = session.post(f"{server}/video_label/", json=request_body)
-        if response.status_code != 201:
-            # get video_label_id so we can PUT instead
-            response = session.get(
-                f"{server}/video_label/by_name",
-                json={
-                    "video_result_id": video_result_id,
-                    "name": name,
-                },
-            )
-            if response.status_code == 200:
-                video_label_id = response.json()["id"]
-                response = session.put(f"{server}/video_label/{video_label_id}", json=request_body)
-                if response.status_code != 200:
-                    errors.append(
-                        f"Failed to modify existing label {name} with error: {response.json()['errors']['name']}"
-                    )
-            else:
-                errors.append(f"Failed to find label with name '{name}'")
     # return errors to display to user
-    return "\n\n".join(errors)
+    return "\n\n".join(apply_label_diff(server, session, video_result_id, diff, max_workers=max_workers))
+
+
+def sync_labels_to_api(user_id, video_result_id, labels_df, dry_run=False, max_workers=None):
+    from api_sessions import get_api_session
+
+    session = get_api_session(user_id, username=admin_user)
+    server = session.server
+    return sync_labels(server, session, video_result_id, labels_df, dry_run=dry_run, max_workers=max_workers)
+
+
+def get_s3_etag(aws_fp, bucket=S3_BUCKET):
+    """Returns the ETag of an S3 object"""
+    import boto3
+
+    return boto3.client("s3").head_object(Bucket=bucket, Key=aws_fp)["ETag"]
+
+
+def link_or_copy(src, dst):
+    if os.path.abspath(src) == os.path.abspath(dst):
+        return
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def etag_to_check(aws_fp):
+    """The ETag a cached copy of an S3 object has to match, or None to use any cached copy"""
+    if s3_cache.validated_within(aws_fp, S3_CACHE_REVALIDATE_SECONDS):
+        return None
+    try:
+        return get_s3_etag(aws_fp)
+    except Exception as e:
+        print(f"Could not check the ETag of {aws_fp}, using any cached copy: {e}")
+        return None
 
 
 def download_file_from_s3(user_id, video_result_id, filename, local_fp=""):
-    """Download file from S3 and put it in tmp dir. Returns filepath to local file"""
+    """Download file from S3 through the local cache. Returns filepath to local file"""
+    from atlas_utils.aws_utils import aws_download_file
+
     aws_fp = f"{user_id}/{video_result_id}/{filename}"
-    bucket = "atlas-remote-internal"
+    # an object re-uploaded since it was cached has a new ETag, which makes the cached copy a miss
+    etag = etag_to_check(aws_fp)
+    cached_fp = s3_cache.fetch(
+        aws_fp, lambda download_fp: aws_download_file(aws_fp, local_fp=download_fp, bucket=S3_BUCKET), etag=etag
+    )
     if local_fp == "":
-        local_fp = os.path.join(tempfile.gettempdir(), filename)
-    aws_download_file(aws_fp, local_fp=local_fp, bucket=bucket)
+        return cached_fp
+
+    link_or_copy(cached_fp, local_fp)
     return local_fp
 
 
+def get_s3_presigned_url(aws_fp, bucket=S3_BUCKET, expires_in=24 * 3600):
+    """Returns a temporary HTTP URL for an S3 object"""
+    import boto3
+
+    return boto3.client("s3").generate_presigned_url(
+        "get_object", Params={"Bucket": bucket, "Key": aws_fp}, ExpiresIn=expires_in
+    )
+
+
+def stream_file_from_s3(user_id, video_result_id, filename, on_started=None, url=None):
+    """Download file from S3 into the cache in byte-range chunks, calling on_started(download) so playback can begin
+    early. Returns filepath to local file"""
+    aws_fp = f"{user_id}/{video_result_id}/{filename}"
+    url = url or get_s3_presigned_url(aws_fp)
+
+    def download(local_fp):
+        ranged_download = RangedDownload(url, local_fp).start()
+        if on_started is not None:
+            on_started(ranged_download)
+        ranged_download.wait()
+
+    # the player opens the file while it downloads, so it is written where it stays
+    return s3_cache.fetch(aws_fp, download, etag=etag_to_check(aws_fp), in_place=True)
+
+
+def get_s3_download_progress(user_id, video_result_id, filename):
+    """Returns the number of bytes downloaded so far for a file being fetched into the S3 cache"""
+    return s3_cache.downloaded_bytes(f"{user_id}/{video_result_id}/{filename}")
+
+
 def upload_file_to_s3(user_id, video_result_id, filename):
     """Upload file to S3"""
+    from atlas_utils.aws_utils import aws_upload_file
+
     object_name = f"{user_id}/{video_result_id}/{os.path.basename(filename)}"
-    bucket = "atlas-remote-internal"
-    aws_upload_file(filename, bucket=bucket, object_name=object_name)
+    aws_upload_file(filename, bucket=S3_BUCKET, object_name=object_name)
+    s3_cache.invalidate(object_name)
 
 
 def get_labels_from_api(user_id, video_result_id):
     """Get labels for the given video_result_id from the API"""
-    server = get_server(user_id)
-    session = get_session(server)
+    from api_sessions import get_api_session
 
-    response = session.get(f"{server}/video_label/", json={"video_result_id": video_result_id})
-    if response.status_code == 200:
-        return response.json()
-    return []
+    session = get_api_session(user_id)
+    server = session.server
+    return fetch_labels(server, session, video_result_id)
+
+
+def get_video_filename_from_api(user_id, video_result_id):
+    """Get the filename of the full video of the given video_result_id from the API"""
+    from atlas_utils import tools
+
+    return tools.get_video_filename_from_api(user_id, video_result_id)
@@ -0,0 +1,284 @@
+import csv
+import os
+from collections import namedtuple
+
+from PyQt5.QtCore import QDir, QThreadPool, pyqtSignal
+from PyQt5.QtWidgets import (
+    QCheckBox,
+    QDockWidget,
+    QFileDialog,
+    QHBoxLayout,
+    QListWidget,
+    QPushButton,
+    QVBoxLayout,
+    QWidget,
+)
+
+from utils import (
+    download_file_from_s3,
+    get_labels_from_api,
+    get_video_filename_from_api,
+    get_video_fps,
+    s3_cache,
+    sync_labels_to_api,
+)
+from workers import Worker
+
+
+# videos downloaded ahead of the one being annotated
+QUEUE_PREFETCH_DEPTH = int(os.environ.get("ATLAS_QUEUE_PREFETCH_DEPTH", 3))
+# prefetching pauses while the videos downloaded ahead take up this much disk
+QUEUE_DISK_BUDGET_BYTES = int(float(os.environ.get("ATLAS_QUEUE_DISK_BUDGET_GB", 4)) * 1024**3)
+
+QUEUED = "queued"
+PREFETCHING = "downloading"
+READY = "ready"
+PREFETCH_FAILED = "download failed"
+OPEN = "annotating"
+EXPORTING = "exporting"
+EXPORTED = "exported"
+EXPORT_FAILED = "export failed"
+NOT_EXPORTED = "not exported"
+
+PrefetchedVideo = namedtuple("PrefetchedVideo", ["video_file_path", "fps", "labels", "size"])
+
+
+def read_queue_file(path):
+    """(user_id, video_result_id) pairs from a CSV with one pair per line, skipping a header and blank lines"""
+    pairs = []
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            values = [value.strip() for value in row if value.strip()]
+            if len(values) >= 2 and values[0].isdigit() and values[1].isdigit():
+                pairs.append((int(values[0]), int(values[1])))
+    return pairs
+
+
+def prefetch_video(user_id, video_result_id, full_video=False):
+    """Downloads a video into the S3 cache, probes it and fetches its labels, everything opening it needs"""
+    filename = get_video_filename_from_api(user_id, video_result_id) if full_video else "annotated_video.mp4"
+    video_file_path = download_file_from_s3(user_id, video_result_id, filename)
+    fps = get_video_fps(video_file_path)
+    labels = get_labels_from_api(user_id, video_result_id)
+    return PrefetchedVideo(video_file_path, fps, labels, os.path.getsize(video_file_path))
+
+
+class QueueItem:
+    def __init__(self, user_id, video_result_id):
+        self.user_id = user_id
+        self.video_result_id = video_result_id
+        self.status = QUEUED
+        self.prefetched = None
+        # set once the table holds the item's labels, so moving on never exports a table that failed to load
+        self.loaded = False
+        self.error = ""
+
+    def __str__(self):
+        return f"{self.user_id}/{self.video_result_id}  {self.status}"
+
+
+class VideoQueue:
+    """The items of a work queue and which one to prefetch next, within a prefetch depth and a disk budget"""
+
+    def __init__(self, pairs, depth=QUEUE_PREFETCH_DEPTH, budget_bytes=QUEUE_DISK_BUDGET_BYTES):
+        self.items = [QueueItem(user_id, video_result_id) for user_id, video_result_id in pairs]
+        self.current = -1
+        self.depth = depth
+        self.budget_bytes = budget_bytes
+
+    def current_item(self):
+        return self.items[self.current] if 0 <= self.current < len(self.items) else None
+
+    def move_to(self, index):
+        self.current = index
+        return self.current_item()
+
+    def prefetched_bytes(self):
+        """Disk taken by the videos downloaded ahead of the current one"""
+        return sum(item.prefetched.size for item in self.items[self.current + 1 :] if item.prefetched is not None)
+
+    def next_to_prefetch(self):
+        """The first queued item within the prefetch depth, one download at a time and only while under budget"""
+        ahead = self.items[self.current + 1 : self.current + 1 + self.depth]
+        if any(item.status == PREFETCHING for item in ahead) or self.prefetched_bytes() >= self.budget_bytes:
+            return None
+        return next((item for item in ahead if item.status == QUEUED), None)
+
+
+class VideoQueuePanel(QDockWidget):
+    """A queue of videos to annotate. The next ones and their labels are prefetched on a background thread so moving on
+    opens them straight from disk, and the labels of the video moved on from are exported in the background.
+    exportLabels(item) returns the table to export for an item, or None if it shouldn't be exported"""
+
+    openRequested = pyqtSignal(object)
+
+    def __init__(
+        self,
+        exportLabels,
+        parent=None,
+        depth=QUEUE_PREFETCH_DEPTH,
+        budget_bytes=QUEUE_DISK_BUDGET_BYTES,
+        prefetch=prefetch_video,
+        export=sync_labels_to_api,
+    ):
+        super().__init__("Queue", parent)
+        self.exportLabels = exportLabels
+        self.depth = depth
+        # a budget bigger than the S3 cache would have it evict videos prefetched for later
+        self.budget_bytes = min(budget_bytes, s3_cache.max_bytes // 2)
+        self.prefetch = prefetch
+        self.export = export
+        self.queue = VideoQueue([], depth, self.budget_bytes)
+        self.prefetchWorker = None
+        self.prefetchItem = None
+        self.exportItems = {}
+
+        # one download at a time keeps the next video first, exports go one at a time in queue order
+        self.prefetchPool = QThreadPool(self)
+        self.prefetchPool.setMaxThreadCount(1)
+        self.exportPool = QThreadPool(self)
+        self.exportPool.setMaxThreadCount(1)
+
+        self.list = QListWidget()
+        self.list.itemDoubleClicked.connect(lambda listItem: self.openAt(self.list.row(listItem)))
+        self.fullVideo = QCheckBox("Full videos")
+        loadButton = QPushButton("Load queue...")
+        loadButton.clicked.connect(self.loadQueue)
+        self.nextButton = QPushButton("Next video")
+        self.nextButton.setEnabled(False)
+        self.nextButton.clicked.connect(self.next)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(loadButton)
+        buttons.addWidget(self.nextButton)
+        layout = QVBoxLayout()
+        layout.addWidget(self.list)
+        layout.addWidget(self.fullVideo)
+        layout.addLayout(buttons)
+        widget = QWidget()
+        widget.setLayout(layout)
+        self.setWidget(widget)
+
+    def loadQueue(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Load Queue", QDir.homePath(), "CSV Files(*.csv *.txt)")
+        if path:
+            self.setQueue(read_queue_file(path))
+
+    def setQueue(self, pairs):
+        """Replaces the queue with (user_id, video_result_id) pairs and starts prefetching the first of them"""
+        if self.prefetchWorker is not None:
+            self.prefetchWorker.cancel()
+            self.prefetchWorker = None
+        self.queue = VideoQueue(pairs, self.depth, self.budget_bytes)
+        self.list.clear()
+        self.list.addItems([str(item) for item in self.queue.items])
+        self.nextButton.setEnabled(bool(pairs))
+        self.show()
+        self.prefetchNext()
+
+    def updateItem(self, item):
+        row = self.queue.items.index(item) if item in self.queue.items else -1
+        if row >= 0:
+            self.list.item(row).setText(str(item))
+
+    def currentItem(self):
+        return self.queue.current_item()
+
+    def next(self):
+        """Moves on to the next item, or exports the last one once it is done"""
+        if self.queue.current + 1 < len(self.queue.items):
+            self.openAt(self.queue.current + 1)
+            return
+        current = self.queue.current_item()
+        if current is not None and current.status == OPEN:
+            self.exportItem(current)
+
+    def openAt(self, index):
+        """Exports the video being annotated and opens the item at index, from disk if it has been prefetched"""
+        if not 0 <= index < len(self.queue.items) or index == self.queue.current:
+            return
+        current = self.queue.current_item()
+        if current is not None and current.status == OPEN:
+            self.exportItem(current)
+
+        item = self.queue.move_to(index)
+        if item is self.prefetchItem and self.prefetchWorker is not None:
+            # its download finishes into the S3 cache, where opening it picks it up
+            self.prefetchWorker.cancel()
+            self.prefetchWorker = None
+        item.status = OPEN
+        item.loaded = False
+        self.updateItem(item)
+        self.list.setCurrentRow(index)
+        self.openRequested.emit(item)
+        item.prefetched = None
+        self.prefetchNext()
+
+    def prefetchNext(self):
+        item = self.queue.next_to_prefetch()
+        if item is None or self.prefetchWorker is not None:
+            return
+        item.status = PREFETCHING
+        self.updateItem(item)
+        self.prefetchItem = item
+        self.prefetchWorker = Worker(self.prefetch, item.user_id, item.video_result_id, self.fullVideo.isChecked())
+        self.prefetchWorker.signals.result.connect(self.prefetchFinished)
+        self.prefetchWorker.signals.error.connect(self.prefetchFailed)
+        self.prefetchPool.start(self.prefetchWorker)
+
+    def isCurrentPrefetchWorker(self):
+        # a result can already be queued when its worker is cancelled
+        return self.prefetchWorker is not None and self.sender() is self.prefetchWorker.signals
+
+    def prefetchFinished(self, prefetched):
+        if not self.isCurrentPrefetchWorker():
+            return
+        self.prefetchWorker = None
+        self.prefetchItem.prefetched = prefetched
+        self.prefetchItem.status = READY
+        self.updateItem(self.prefetchItem)
+        self.prefetchNext()
+
+    def prefetchFailed(self, error):
+        if not self.isCurrentPrefetchWorker():
+            return
+        self.prefetchWorker = None
+        # opening it goes through the usual download and reports the error then
+        self.prefetchItem.status = PREFETCH_FAILED
+        self.prefetchItem.error = error
+        self.updateItem(self.prefetchItem)
+        print(f"Failed to prefetch {self.prefetchItem.user_id}/{self.prefetchItem.video_result_id}:\n{error}")
+        self.prefetchNext()
+
+    def exportItem(self, item):
+        labels_df = self.exportLabels(item)
+        if labels_df is None:
+            item.status = NOT_EXPORTED
+            self.updateItem(item)
+            return
+        item.status = EXPORTING
+        self.updateItem(item)
+        worker = Worker(self.export, item.user_id, item.video_result_id, labels_df)
+        worker.signals.result.connect(self.exportFinished)
+        worker.signals.error.connect(self.exportFailed)
+        self.exportItems[worker.signals] = item
+        self.exportPool.start(worker)
+
+    def exportFinished(self, errors):
+        item = self.exportItems.pop(self.sender())
+        item.status = EXPORTED if errors == "" else EXPORT_FAILED
+        item.error = errors
+        self.updateItem(item)
+        if errors:
+            print(f"Failed to export labels of {item.user_id}/{item.video_result_id}:\n{errors}")
+
+    def exportFailed(self, error):
+        item = self.exportItems.pop(self.sender())
+        item.status = EXPORT_FAILED
+        item.error = error
+        self.updateItem(item)
+        print(f"Failed to export labels of {item.user_id}/{item.video_result_id}:\n{error}")
+
+    def waitForDone(self):
+        self.prefetchPool.waitForDone()
+        self.exportPool.waitForDone()
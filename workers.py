@@ -0,0 +1,38 @@
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+import traceback
+
+
+class WorkerSignals(QObject):
+    progress = pyqtSignal(str)
+    partial = pyqtSignal(object)
+    result = pyqtSignal(object)
+    error = pyqtSignal(str)
+    finished = pyqtSignal()
+
+
+class Worker(QRunnable):
+    """Runs fn(*args, **kwargs) on a QThreadPool thread and reports back through Qt signals"""
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self.cancelled = False
+
+    def cancel(self):
+        """Drops the result once fn returns. fn can poll self.cancelled to stop early"""
+        self.cancelled = True
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception:
+            if not self.cancelled:
+                self.signals.error.emit(traceback.format_exc())
+        else:
+            if not self.cancelled:
+                self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()